@@ -19,6 +19,76 @@ class Settings(BaseSettings):
     DATABASE_URL: str = ""
     REDIS_URL: str = "redis://redis:6379/0"
 
+    # Forecasting
+    HISTORY_STORE_DIR: str = "./data/history"  # One Parquet dataset per symbol
+    HISTORY_CACHE_SIZE: int = 256          # Symbols kept in memory
+    HISTORY_CACHE_MAX_MB: int = 256        # Approximate memory budget for cached histories
+    HISTORY_HARD_TTL: int = 21600          # 6 Hours: past this a request waits for fresh history
+    HISTORY_BATCH_CHUNK: int = 50          # Symbols per multi-symbol Alpaca/Yahoo bars request
+    HISTORY_CLOSE_DTYPE: str = "float64"   # "float32" halves cached close memory
+    MOVERS_HARD_TTL: int = 1800            # 30 Minutes: past this a request waits for a fresh scrape
+    PRICE_CACHE_SIZE: int = 5000
+    MODEL_CACHE_DIR: str = "./data/models"
+    MODEL_CACHE_SIZE: int = 64
+    FORECAST_WORKERS: int = 2              # 0 = fit inline (no process pool)
+    FORECAST_MAX_PENDING: int = 16         # Queued + running fits before callers wait
+    FORECAST_MAX_TASKS_PER_CHILD: int = 50 # Recycle workers to cap Stan memory growth
+    FORECAST_QUEUE_TIMEOUT: float = 10.0   # Seconds to wait for a slot before 503
+    FORECAST_CACHE_SIZE: int = 512
+    FORECAST_CACHE_TTL: int = 900          # 15 Minutes
+    TECHNICALS_CACHE_SIZE: int = 512       # Symbols whose indicator state is kept in memory
+    FORECAST_MAX_HORIZON: int = 90         # Every fit forecasts this far; shorter horizons are slices
+    BATCH_MAX_SYMBOLS: int = 100
+    FAST_ALIGN_MAX_GAP: int = 5            # Bars a missing close is carried forward; staler symbols are dropped
+    WARM_START_MAX_NEW_BARS: int = 5       # 0 = always cold-fit
+    WARM_START_MAX_NOISE_RATIO: float = 1.5 # Warm fit noisier than this x previous = diverged
+
+    # Nightly Precompute
+    PRECOMPUTE_HORIZONS: str = "7,30"      # Comma-separated forecast horizons (days)
+    PRECOMPUTE_MAX_AGE_HOURS: int = 30     # Never serve a precomputed row older than this
+
+    # Asset Metadata
+    ASSET_INDEX_PATH: str = "./data/assets.json"
+    ASSET_INDEX_REFRESH_HOURS: int = 24
+    ASSET_INDEX_MISS_TTL: int = 3600       # Seconds an unknown symbol is remembered (no Yahoo lookup)
+    ASSET_INDEX_SAVE_INTERVAL: int = 60    # Seconds between writes of Yahoo-resolved names to disk
+
+    # Outbound HTTP (shared client for scrapers and feeds)
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_CONNECT_TIMEOUT: float = 3.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_PER_HOST: int = 10            # Concurrent requests per host (be polite to Finviz/Google)
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+
+    # Provider Resilience (Alpaca -> Yahoo chain)
+    BREAKER_FAILURE_THRESHOLD: int = 3     # Consecutive failures before a provider is skipped
+    BREAKER_COOLDOWN: float = 30.0         # Seconds before an open provider is probed again
+    RETRY_BASE_DELAY: float = 0.25         # Jittered exponential backoff between retries
+    RETRY_MAX_DELAY: float = 2.0
+    HEDGE_ENABLED: bool = False            # Race Yahoo against a slow Alpaca call instead of waiting it out
+    HEDGE_PERCENTILE: float = 95.0         # Fire the hedge once Alpaca is slower than this latency percentile
+    HEDGE_DEFAULT_DELAY: float = 1.0       # Hedge delay (seconds) until enough latencies have been observed
+    HEDGE_MIN_DELAY: float = 0.05
+    HEDGE_WINDOW: int = 200                # Recent Alpaca latencies the percentile is taken over
+
+    # Live Prices (Alpaca real-time trade stream)
+    PRICE_STREAM_URL: str = "wss://stream.data.alpaca.markets/v2/iex"
+    PRICE_STREAM_STALE_AFTER: int = 300    # While disconnected, streamed prices are trusted this long
+    PRICE_STREAM_MAX_AGE: int = 900        # While connected, older last trades are re-polled (halts, thin names)
+    PRICE_STREAM_RECONNECT_DELAY: float = 1.0
+    PRICE_STREAM_RECONNECT_MAX: float = 30.0
+    PRICE_BATCH_WINDOW: float = 0.01       # Seconds price misses are pooled before going upstream
+    PRICE_BATCH_CHUNK: int = 100           # Symbols per upstream snapshot request
+    PRICE_BATCH_WORKERS: int = 4           # Chunks fetched in parallel
+    PRICE_BATCH_TIMEOUT: float = 30.0      # Longest a caller waits for its batch
+    WATCHLIST_PUSH_HEARTBEAT: float = 15.0 # SSE keep-alive interval (and poll interval without a stream)
+
+    # Prediction Finalization (background queue fed by watchlist reads)
+    FINALIZE_WORKERS: int = 2              # Finalization passes running at once
+    FINALIZE_BATCH: int = 200              # Prediction IDs settled per pass (one bulk history fetch)
+    FINALIZE_MAX_PENDING: int = 10000      # Queued IDs beyond this are dropped; the next read re-enqueues
+    FINALIZE_RETRY_AFTER: int = 300        # Seconds before an unsettled prediction (no close yet) is retried
+
     # QStash
     QSTASH_CURRENT_SIGNING_KEY: str = ""
     QSTASH_NEXT_SIGNING_KEY: str = ""
@@ -49,19 +49,39 @@ def _migrate_db():
         print(f"ℹ️ Migration check skipped/failed (Safe to ignore on SQLite): {e}")
 
 
+def _migrate_precompute_unique():
+    """
+    Tables created before (symbol, days) was unique: drop duplicate rows (keeping the
+    newest) and add the unique index the precompute upsert relies on.
+    """
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("""
+                              DELETE FROM precomputedforecast
+                              WHERE id NOT IN (SELECT MAX(id) FROM precomputedforecast GROUP BY symbol, days);
+                              """))
+            conn.execute(text("""
+                              CREATE UNIQUE INDEX IF NOT EXISTS uq_precomputedforecast_symbol_days
+                              ON precomputedforecast (symbol, days);
+                              """))
+    except Exception as e:
+        print(f"⚠️ Migration: unique (symbol, days) index on 'precomputedforecast' failed: {e}")
+
+
 def create_db_and_tables():
     """
     Initializes the database schema and runs migrations.
     """
     # Import models here to ensure they are registered with SQLModel
     # and to avoid circular imports at the top level.
-    from app.models import Prediction
+    from app.models import Prediction, PrecomputedForecast
 
     # Create tables if they don't exist
     SQLModel.metadata.create_all(engine)
 
     # Run manual migrations (alterations)
     _migrate_db()
+    _migrate_precompute_unique()
 
 
 def get_session():
@@ -2,30 +2,49 @@ import logging
 import sys
 import os
 import time
+import json
+import asyncio
 from datetime import datetime, timedelta, date
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from contextlib import asynccontextmanager
 from qstash import Receiver
 
-from fastapi import FastAPI, HTTPException, Depends, Request, Header
+from fastapi import FastAPI, HTTPException, Depends, Request, Header, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 import yfinance as yf
 import pandas as pd
 
 # ✅ UPDATED IMPORTS (Pointing to core/)
-from app.core.database import create_db_and_tables, get_session
+from app.core.database import create_db_and_tables, get_session, engine as db_engine
 from app.core.auth import get_current_user, check_user_exists
 from app.core.config import settings
 
 from app.models import Prediction
 from app.services.engine import PredictionEngine
+from app.services.forecast_pool import forecast_pool, ForecastQueueFull
+from app.services.asset_index import asset_index
+from app.services.http_client import http_client
+from app.services.resilience import history_hedger, price_hedger
+from app.services.price_stream import price_stream
+from app.services.price_hub import price_hub, PriceSubscription
+from app.services.cache import LRUCache, BatchLoader
+from app.services.tiered_cache import TieredCache, MsgpackCodec
 from app.schemas import (
     StockRequest, PredictionResponse, MarketMoversResponse,
-    WatchlistAddRequest, WatchlistPerformanceItem,
+    BatchStockRequest, BatchPredictionItem,
+    WatchlistAddRequest, WatchlistPerformanceItem, WatchlistPriceDelta,
     RealTimeMarketData, UserCheckRequest
 )
 from app.services.intelligence import MarketIntelligence
+from app.services.precompute import run_precompute, get_fresh_forecast
+from app.services.providers import DataProvider
+from app.services.finalization import (
+    next_market_day, is_open, matured, open_predictions, closed_symbols, resolve_final_prices,
+    apply_final_prices, FinalizationQueue
+)
 
 # --- ALPACA IMPORTS ---
 from alpaca.data.historical import StockHistoricalDataClient
@@ -40,8 +59,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-PRICE_CACHE: Dict[str, Dict] = {}
 CACHE_TTL = 300
+PRICE_CACHE = TieredCache(
+    LRUCache(max_entries=settings.PRICE_CACHE_SIZE, ttl=CACHE_TTL), namespace="price", codec=MsgpackCodec()
+)
 
 ALPACA_KEY = os.environ.get("ALPACA_KEY")
 ALPACA_SECRET = os.environ.get("ALPACA_SECRET")
@@ -61,12 +82,29 @@ if ALPACA_KEY and ALPACA_SECRET:
         logger.error(f"⚠️ [INIT] Alpaca Init Failed: {e}")
 
 
+def _watchlisted_symbols() -> List[str]:
+    """Symbols with at least one prediction still waiting for its final price."""
+    with Session(db_engine) as session:
+        statement = select(Prediction.symbol).where(open_predictions()).distinct()
+        return list(session.exec(statement).all())
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("🚀 Starting Sentient API...")
     create_db_and_tables()
+    forecast_pool.start()
+    asset_index.start(alpaca_trading)
+    price_stream.add_listener(price_hub.publish)
+    if ALPACA_KEY and ALPACA_SECRET:
+        price_stream.start(ALPACA_KEY, ALPACA_SECRET, _watchlisted_symbols())
     yield
     logger.info("🛑 Shutting down Sentient API...")
+    price_stream.shutdown()
+    finalization_queue.shutdown()
+    asset_index.shutdown()
+    forecast_pool.shutdown()
+    http_client.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -74,81 +112,196 @@ app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
                    allow_headers=["*"])
 
 
-def get_live_prices(symbols: List[str]) -> Dict[str, float]:
-    current_time = time.time()
+def _alpaca_prices(symbols: List[str]) -> Optional[Dict[str, float]]:
+    """Latest IEX trade per symbol from one Alpaca snapshot call; None if it had nothing."""
+    alpaca_map = {sym.replace('-', '.'): sym for sym in symbols}
+    req = StockSnapshotRequest(symbol_or_symbols=list(alpaca_map.keys()), feed='iex')
+    snapshots = alpaca_data.get_stock_snapshot(req)
     prices = {}
-    missing = []
-
-    # Check Cache
+    for alpaca_sym, snapshot in snapshots.items():
+        if snapshot.latest_trade:
+            price = float(snapshot.latest_trade.price)
+            if price > 0:
+                prices[alpaca_map.get(alpaca_sym, alpaca_sym)] = price
+    return prices or None
+
+
+def _yahoo_prices(symbols: List[str]) -> Optional[Dict[str, float]]:
+    """Last close per symbol from one yfinance download; None if it had nothing."""
+    logger.info(f"Fetching fallback prices for: {symbols}")
+    data = yf.download(symbols, period="1d", progress=False)['Close']
+    if data.empty:
+        return None
+    if isinstance(data, pd.Series):
+        return {symbols[0]: float(data.iloc[-1])}
+    prices = {}
+    curr = data.iloc[-1]
     for sym in symbols:
-        cached = PRICE_CACHE.get(sym)
-        if cached and (current_time - cached['timestamp'] < CACHE_TTL):
-            prices[sym] = cached['price']
-        else:
-            missing.append(sym)
+        try:
+            prices[sym] = float(curr[sym])
+        except:
+            pass
+    return prices or None
 
-    if not missing: return prices
+
+def _fetch_prices(symbols: List[str]) -> Dict[str, float]:
+    """One chunk of cache misses from upstream: Alpaca (raced against Yahoo when hedging is on), then Yahoo."""
+    prices: Dict[str, float] = {}
+    missing = list(symbols)
+
+    def _keep(fetched: Optional[Dict[str, float]]) -> List[str]:
+        for sym, price in (fetched or {}).items():
+            prices[sym] = price
+            PRICE_CACHE.set(sym, price)
+        return [sym for sym in missing if sym not in prices]
 
     # Fetch from Alpaca
+    yahoo_tried = False
     if alpaca_data:
         try:
-            alpaca_map = {sym.replace('-', '.'): sym for sym in missing}
-            req = StockSnapshotRequest(symbol_or_symbols=list(alpaca_map.keys()), feed='iex')
-            snapshots = alpaca_data.get_stock_snapshot(req)
-            for alpaca_sym, snapshot in snapshots.items():
-                if snapshot.latest_trade:
-                    price = float(snapshot.latest_trade.price)
-                    if price > 0:
-                        orig = alpaca_map.get(alpaca_sym, alpaca_sym)
-                        prices[orig] = price
-                        PRICE_CACHE[orig] = {"price": price, "timestamp": current_time}
-                        if orig in missing: missing.remove(orig)
+            if settings.HEDGE_ENABLED:
+                # Yahoo answers (or fails) inside the race unless Alpaca wins it
+                yahoo_tried = True
+                fetched, winner = http_client.run_sync(price_hedger.run(
+                    lambda: asyncio.to_thread(_alpaca_prices, missing),
+                    lambda: asyncio.to_thread(_yahoo_prices, missing)
+                ))
+                missing = _keep(fetched)
+                yahoo_tried = winner != "primary"
+            else:
+                missing = _keep(_alpaca_prices(missing))
         except Exception as e:
             logger.warning(f"Alpaca price fetch failed: {e}")
 
-    # Fallback to YFinance
-    if missing:
+    # Fallback to YFinance (unless it was already part of the race)
+    if missing and not yahoo_tried:
         try:
-            logger.info(f"Fetching fallback prices for: {missing}")
-            data = yf.download(missing, period="1d", progress=False)['Close']
-            if not data.empty:
-                if isinstance(data, pd.Series):
-                    val = float(data.iloc[-1])
-                    prices[missing[0]] = val
-                    PRICE_CACHE[missing[0]] = {"price": val, "timestamp": current_time}
-                else:
-                    curr = data.iloc[-1]
-                    for sym in missing:
-                        try:
-                            val = float(curr[sym])
-                            prices[sym] = val
-                            PRICE_CACHE[sym] = {"price": val, "timestamp": current_time}
-                        except:
-                            pass
+            _keep(_yahoo_prices(missing))
         except Exception as e:
             logger.warning(f"YFinance fallback failed: {e}")
 
     return prices
 
 
+# Misses from concurrent requests are pooled for a few ms, chunked, fetched in parallel and shared
+PRICE_LOADER = BatchLoader(
+    lambda symbols: _fetch_prices(symbols), window=settings.PRICE_BATCH_WINDOW,
+    chunk_size=settings.PRICE_BATCH_CHUNK, max_workers=settings.PRICE_BATCH_WORKERS, name="prices"
+)
+
+
+def get_live_prices(symbols: List[str]) -> Dict[str, float]:
+    # Streamed last trades first: a dict lookup, no upstream call
+    prices = price_stream.prices(symbols)
+    missing = []
+
+    # Check Cache
+    for sym in symbols:
+        if sym in prices:
+            continue
+        cached = PRICE_CACHE.get(sym)
+        if cached is not None:
+            prices[sym] = cached
+        else:
+            missing.append(sym)
+
+    if not missing: return prices
+    prices.update(PRICE_LOADER.load_many(missing, timeout=settings.PRICE_BATCH_TIMEOUT))
+    # Watchlisted symbols that haven't traded since we subscribed: the poll seeds the table
+    price_stream.seed(prices)
+    return prices
+
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict(request: StockRequest):
+async def predict(request: StockRequest, session: Session = Depends(get_session)):
     logger.info(f"🔮 Prediction Request: {request.symbol}")
+
+    # Serve the nightly precomputed forecast when a fresh one exists
+    if request.engine == "prophet":
+        precomputed = get_fresh_forecast(session, request.symbol, request.days)
+        if precomputed:
+            logger.info(f"⚡ Prediction Served from Precompute: {request.symbol} ({request.days} days)")
+            return precomputed
+
     try:
         engine = PredictionEngine(data_client=alpaca_data, trading_client=alpaca_trading)
-        result = engine.predict(request)
+        # Runs in a worker thread; the Prophet fit itself goes to the process pool
+        result = await run_in_threadpool(engine.predict, request)
         logger.info(f"✅ Prediction Success: {request.symbol} -> Target ${result.predicted_price}")
         return result
+    except ForecastQueueFull as e:
+        logger.warning(f"⚠️ Prediction Rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Prediction Failed: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.post("/predict/batch")
+async def predict_batch(request: BatchStockRequest):
+    """
+    Forecasts many symbols in one call.
+    Histories are fetched in one multi-symbol request, fits fan out across the process pool,
+    and each result is streamed back as an NDJSON line as soon as it finishes.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in request.symbols if s.strip()))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    if len(symbols) > settings.BATCH_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Batch limited to {settings.BATCH_MAX_SYMBOLS} symbols")
+
+    logger.info(f"🔮 Batch Prediction Request: {len(symbols)} symbols ({request.days} days)")
+    engine = PredictionEngine(data_client=alpaca_data, trading_client=alpaca_trading)
+    histories = await run_in_threadpool(engine.provider.fetch_history_many, symbols, 730)
+
+    # Fast engine: every symbol is scored in one vectorized call
+    if request.engine == "fast":
+        results = await run_in_threadpool(engine.predict_fast_many, request.days, histories)
+
+        async def stream_fast():
+            for symbol in symbols:
+                if symbol in results:
+                    item = BatchPredictionItem(symbol=symbol, result=results[symbol])
+                else:
+                    item = BatchPredictionItem(symbol=symbol, error=f"Not enough history for {symbol}")
+                yield item.model_dump_json() + "\n"
+
+        return StreamingResponse(stream_fast(), media_type="application/x-ndjson")
+
+    # Keep roughly one fit per worker in flight so a big batch doesn't starve /predict
+    fit_slots = asyncio.Semaphore(max(1, forecast_pool.max_workers))
+
+    async def run_one(symbol: str) -> BatchPredictionItem:
+        if symbol not in histories:
+            return BatchPredictionItem(symbol=symbol, error=f"All data providers failed for {symbol}")
+        history, source = histories[symbol]
+        try:
+            async with fit_slots:
+                result = await run_in_threadpool(
+                    engine.predict_from_history,
+                    StockRequest(symbol=symbol, days=request.days, engine=request.engine), history, source
+                )
+            return BatchPredictionItem(symbol=symbol, result=result)
+        except Exception as e:
+            logger.error(f"❌ Batch Prediction Failed for {symbol}: {e}")
+            return BatchPredictionItem(symbol=symbol, error=str(e))
+
+    async def stream():
+        done = 0
+        for next_item in asyncio.as_completed([run_one(s) for s in symbols]):
+            item = await next_item
+            done += 1
+            yield item.model_dump_json() + "\n"
+        logger.info(f"✅ Batch Prediction Complete: {done} symbols")
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.get("/market/movers", response_model=MarketMoversResponse)
 async def get_movers():
     logger.info("📊 Fetching Market Movers...")
     try:
-        movers = PredictionEngine(data_client=alpaca_data, trading_client=alpaca_trading).get_market_movers()
+        movers = await PredictionEngine(data_client=alpaca_data, trading_client=alpaca_trading).get_market_movers()
         logger.info(f"✅ Movers fetched: {len(movers.gainers)} gainers, {len(movers.losers)} losers")
         return movers
     except Exception as e:
@@ -156,6 +309,55 @@ async def get_movers():
         return {"gainers": [], "losers": [], "active": []}
 
 
+# Matured predictions are finalized here, off the watchlist read path
+finalization_queue = FinalizationQueue(
+    lambda: Session(db_engine), lambda: DataProvider(alpaca_data),
+    workers=settings.FINALIZE_WORKERS, batch_size=settings.FINALIZE_BATCH,
+    max_pending=settings.FINALIZE_MAX_PENDING, retry_after=settings.FINALIZE_RETRY_AFTER
+)
+
+
+def _release_symbols(session: Session, symbols: Iterable[str]) -> None:
+    """Stops streaming symbols whose last open prediction was finalized or deleted."""
+    closed = closed_symbols(session, symbols)
+    if closed:
+        price_stream.untrack(closed)
+        logger.info(f"📴 Stream: Untracked {len(closed)} symbols with no open predictions")
+
+
+def _release_finalized(finalized: Dict[int, Tuple[str, float, date]]) -> None:
+    with Session(db_engine) as session:
+        _release_symbols(session, {symbol for symbol, _, _ in finalized.values()})
+
+
+finalization_queue.add_listener(_release_finalized)
+finalization_queue.add_listener(price_hub.publish_finalized)
+
+
+def _score_prediction(target_price: float, current_val: float, final_price: float,
+                      is_matured: bool) -> Tuple[float, str]:
+    """
+    Accuracy and status. Accuracy only counts once a prediction is finalized or matured;
+    a matured prediction stays FINALIZING (scored on the live price) until its close is recorded.
+    """
+    if final_price > 0.0 or is_matured:
+        diff = abs(target_price - current_val)
+        accuracy = max(0, 100 * (1 - (diff / target_price))) if target_price else 0
+
+        if final_price <= 0.0:
+            status = "⏳ FINALIZING"  # Matured: provisional score until the close is recorded
+        elif current_val >= target_price:
+            status = "✅ SUCCESS"
+        elif accuracy > 95:
+            status = "⏱️ CLOSE"
+        else:
+            status = "❌ FAILED"
+    else:
+        accuracy = 0  # Pending
+        status = "⏳ PENDING"
+    return round(accuracy, 1), status
+
+
 @app.get("/watchlist/performance", response_model=List[WatchlistPerformanceItem])
 async def get_watchlist_performance(session: Session = Depends(get_session), user_id: str = Depends(get_current_user)):
     predictions = session.exec(select(Prediction).where(Prediction.user_id == user_id)).all()
@@ -164,69 +366,31 @@ async def get_watchlist_performance(session: Session = Depends(get_session), use
         return []
 
     today_dt = date.today()
-    active_symbols = []
-
-    # Helper to check if a date is a market day (Mon-Fri)
-    def get_next_market_day(d: date) -> date:
-        while d.weekday() > 4: d += timedelta(days=1)
-        return d
+    # Only fetch live prices for predictions that aren't finalized yet
+    active_symbols = {p.symbol for p in predictions if is_open(p)}
+    # Off the loop: a batched lookup waits for its window, and other requests must be able to join it
+    live_prices = await run_in_threadpool(get_live_prices, list(active_symbols)) if active_symbols else {}
 
-    # Identify active symbols to fetch live prices
-    for p in predictions:
-        final_price = p.final_price if p.final_price is not None else 0.0
-        # Only fetch live price if NOT finalized and NOT expired
-        if final_price == 0.0:
-            active_symbols.append(p.symbol)
+    # Pure read: matured predictions are settled by the background queue, not this request
+    pending = matured(predictions, today_dt)
+    if pending:
+        finalization_queue.enqueue([p.id for p in pending])
 
-    live_prices = get_live_prices(list(set(active_symbols))) if active_symbols else {}
     results = []
-
     for p in predictions:
-        final_price = p.final_price if p.final_price is not None else 0.0
-        target_final_date = get_next_market_day(p.end_date)
-        is_matured = today_dt >= target_final_date
+        final_price = p.final_price or 0.0
+        is_matured = today_dt >= next_market_day(p.end_date)
 
         # 1. Determine "Final" or "Current" price
         if final_price > 0.0:
             current_val = final_price  # It's finalized
-        elif is_matured:
-            # Try to finalize it now
-            try:
-                hist = yf.download(p.symbol, start=target_final_date, end=target_final_date + timedelta(days=2),
-                                   progress=False)
-                if not hist.empty:
-                    val = float(hist['Close'].iloc[0])
-                    p.final_price = val
-                    p.finalized_date = target_final_date
-                    current_val = val
-                    session.add(p)
-                    session.commit()
-                    session.refresh(p)
-                    final_price = val
-                else:
-                    # Market might be closed or data delayed
-                    current_val = live_prices.get(p.symbol, p.initial_price)
-            except:
-                current_val = live_prices.get(p.symbol, p.initial_price)
         else:
-            # Active tracking
+            # Active tracking (or matured and queued for finalization)
             current_val = live_prices.get(p.symbol, p.initial_price)
             if current_val == 0.0: current_val = p.initial_price
 
         # 2. Calculate Accuracy (ONLY if Finalized/Matured)
-        if final_price > 0.0 or is_matured:
-            diff = abs(p.target_price - current_val)
-            accuracy = max(0, 100 * (1 - (diff / p.target_price))) if p.target_price else 0
-
-            if current_val >= p.target_price:
-                status = "✅ SUCCESS"
-            elif accuracy > 95:
-                status = "⏱️ CLOSE"
-            else:
-                status = "❌ FAILED"
-        else:
-            accuracy = 0  # Pending
-            status = "⏳ PENDING"
+        accuracy, status = _score_prediction(p.target_price, current_val, final_price, is_matured)
 
         results.append(WatchlistPerformanceItem(
             id=p.id,
@@ -238,12 +402,94 @@ async def get_watchlist_performance(session: Session = Depends(get_session), use
             end_date=p.end_date,
             finalized_date=p.finalized_date,
             created_at=p.created_at,
-            accuracy_score=round(accuracy, 1),
+            accuracy_score=accuracy,
             status=status
         ))
     return results
 
 
+def _watchlist_deltas(items: Dict[int, WatchlistPerformanceItem],
+                      prices: Dict[str, float]) -> List[WatchlistPriceDelta]:
+    """Re-scores active predictions at the new prices; returns (and applies) only what changed."""
+    today_dt = date.today()
+    deltas = []
+    for item in list(items.values()):
+        if item.final_price is not None or item.symbol not in prices:
+            continue
+        price = prices[item.symbol]
+        accuracy, status = _score_prediction(item.target_price, price, 0.0,
+                                             today_dt >= next_market_day(item.end_date))
+        if (price, accuracy, status) == (item.current_price, item.accuracy_score, item.status):
+            continue
+        items[item.id] = item.model_copy(update={"current_price": price, "accuracy_score": accuracy, "status": status})
+        deltas.append(WatchlistPriceDelta(id=item.id, symbol=item.symbol, current_price=price,
+                                          accuracy_score=accuracy, status=status))
+    return deltas
+
+
+def _watchlist_finalized(items: Dict[int, WatchlistPerformanceItem],
+                         finalized: Dict[int, Tuple[float, date]]) -> List[WatchlistPerformanceItem]:
+    """Applies background finalizations to a stream's items; returns the items that settled."""
+    settled = []
+    for pid, (price, finalized_date) in finalized.items():
+        item = items.get(pid)
+        if item is None or item.final_price is not None:
+            continue
+        accuracy, status = _score_prediction(item.target_price, price, price, True)
+        items[pid] = item.model_copy(update={"current_price": price, "final_price": price,
+                                             "finalized_date": finalized_date,
+                                             "accuracy_score": accuracy, "status": status})
+        settled.append(items[pid])
+    return settled
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _watchlist_events(request: Request, snapshot: List[WatchlistPerformanceItem],
+                            subscription: PriceSubscription):
+    items = {item.id: item for item in snapshot}
+    try:
+        yield _sse("snapshot", json.dumps([item.model_dump(mode="json") for item in snapshot]))
+        while not await request.is_disconnected():
+            changed = await subscription.next(timeout=settings.WATCHLIST_PUSH_HEARTBEAT)
+            settled = _watchlist_finalized(items, subscription.take_finalized())
+            if not changed and not settled and not price_stream.connected and subscription.symbols:
+                # No streaming feed: one poll per heartbeat (cached and coalesced across clients)
+                changed = await run_in_threadpool(get_live_prices, sorted(subscription.symbols))
+
+            deltas = _watchlist_deltas(items, changed)
+            if settled:
+                yield _sse("finalized", json.dumps([item.model_dump(mode="json") for item in settled]))
+            if deltas:
+                yield _sse("update", json.dumps([d.model_dump(mode="json") for d in deltas]))
+            if not settled and not deltas:
+                yield ": keep-alive\n\n"
+    finally:
+        price_hub.unsubscribe(subscription)
+
+
+@app.get("/watchlist/stream")
+async def stream_watchlist(request: Request, session: Session = Depends(get_session),
+                           user_id: str = Depends(get_current_user)):
+    """
+    Server-Sent Events for the watchlist: one `snapshot` event with the full performance
+    list, then `update` events carrying only the predictions whose price, accuracy or
+    status changed, and `finalized` events with the full item once the background queue
+    records a prediction's close. Both come from the shared price hub, so one upstream
+    tick reaches every connected client without any of them polling.
+    """
+    snapshot = await get_watchlist_performance(session=session, user_id=user_id)
+    subscription = price_hub.subscribe({item.symbol for item in snapshot if item.final_price is None})
+    logger.info(f"📡 Watchlist Stream: User={user_id} | {len(subscription.symbols)} live symbols")
+    return StreamingResponse(
+        _watchlist_events(request, snapshot, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/scheduler/validate")
 async def validate_predictions(request: Request, signature: str = Header(None, alias="Upstash-Signature"),
                                session: Session = Depends(get_session)):
@@ -258,44 +504,61 @@ async def validate_predictions(request: Request, signature: str = Header(None, a
             logger.warning("⚠️ Scheduler: Invalid QStash Signature")
             raise HTTPException(status_code=401, detail="Invalid QStash Signature")
 
-    predictions = session.exec(select(Prediction).where(Prediction.final_price == 0.0)).all()
+    predictions = session.exec(select(Prediction).where(open_predictions())).all()
     if not predictions:
         logger.info("⏰ Scheduler: No pending predictions to validate.")
         return {"status": "success"}
 
     logger.info(f"⏰ Scheduler: Validating {len(predictions)} pending predictions...")
-    live_prices = get_live_prices(list(set([p.symbol for p in predictions])))
-    today = date.today()
+    live_prices = await run_in_threadpool(get_live_prices, list(set([p.symbol for p in predictions])))
+    # Matured predictions: one bulk history fetch (before the commit below expires the rows).
+    # Off the event loop: the per-symbol provider fallback runs its own loop.
+    resolved = await run_in_threadpool(resolve_final_prices, DataProvider(alpaca_data), predictions)
+    finalized_rows = {p.id: (p.symbol, *resolved[p.id]) for p in predictions if p.id in resolved}
     updates = 0
-    finalized = 0
 
     for p in predictions:
-        if p.symbol in live_prices:
-            p.current_price = live_prices[p.symbol]
-            if p.target_price > 0:
-                diff = abs(p.target_price - p.current_price)
-                p.accuracy_score = max(0.0, 100 * (1 - (diff / p.target_price)))
-        check_date = p.end_date
-        while check_date.weekday() > 4: check_date += timedelta(days=1)
-        if today >= check_date:
-            try:
-                history = yf.download(p.symbol, start=check_date, end=check_date + timedelta(days=2), progress=False)
-                if not history.empty:
-                    val = float(history['Close'].iloc[0])
-                    p.final_price = val
-                    p.finalized_date = check_date
-                    p.current_price = val
-                    p.status = "VALIDATED"
-                    finalized += 1
-            except:
-                pass
+        if p.symbol in live_prices and p.target_price > 0:
+            diff = abs(p.target_price - live_prices[p.symbol])
+            p.accuracy_score = max(0.0, 100 * (1 - (diff / p.target_price)))
+            session.add(p)
         updates += 1
-        session.add(p)
     session.commit()
+
+    finalized = apply_final_prices(session, resolved)
+    _release_symbols(session, {symbol for symbol, _, _ in finalized_rows.values()})
+    price_hub.publish_finalized(finalized_rows)
     logger.info(f"✅ Scheduler: Job Complete. Updated: {updates}, Finalized: {finalized}")
     return {"status": "success", "updated": updates, "finalized": finalized}
 
 
+@app.post("/scheduler/precompute")
+async def precompute_forecasts(request: Request, background_tasks: BackgroundTasks,
+                               signature: str = Header(None, alias="Upstash-Signature")):
+    logger.info("🌙 Scheduler: Starting Precompute Job")
+    if settings.QSTASH_CURRENT_SIGNING_KEY:
+        try:
+            receiver = Receiver(current_signing_key=settings.QSTASH_CURRENT_SIGNING_KEY,
+                                next_signing_key=settings.QSTASH_NEXT_SIGNING_KEY)
+            body = await request.body()
+            receiver.verify(body.decode("utf-8"), signature)
+        except:
+            logger.warning("⚠️ Scheduler: Invalid QStash Signature")
+            raise HTTPException(status_code=401, detail="Invalid QStash Signature")
+
+    # The full universe takes minutes: acknowledge now, fit in the background
+    background_tasks.add_task(_run_precompute_job)
+    return {"status": "accepted"}
+
+
+def _run_precompute_job():
+    try:
+        with Session(db_engine) as session:
+            run_precompute(session, PredictionEngine(data_client=alpaca_data, trading_client=alpaca_trading))
+    except Exception as e:
+        logger.error(f"❌ Scheduler: Precompute Job Failed: {e}")
+
+
 @app.post("/scheduler/cleanup")
 async def cleanup_predictions(request: Request, signature: str = Header(None, alias="Upstash-Signature"),
                               session: Session = Depends(get_session)):
@@ -310,10 +573,12 @@ async def cleanup_predictions(request: Request, signature: str = Header(None, al
             raise HTTPException(status_code=401, detail="Invalid Signature")
 
     cutoff = date.today() - timedelta(days=30)
-    zombies = session.exec(select(Prediction).where(Prediction.final_price == 0.0, Prediction.end_date < cutoff)).all()
+    zombies = session.exec(select(Prediction).where(open_predictions(), Prediction.end_date < cutoff)).all()
     count = len(zombies)
+    symbols = {z.symbol for z in zombies}
     for z in zombies: session.delete(z)
     session.commit()
+    _release_symbols(session, symbols)
     logger.info(f"✅ Scheduler: Cleanup Complete. Deleted {count} stale records.")
     return {"status": "success", "deleted_zombies": count}
 
@@ -369,6 +634,7 @@ async def add_to_watchlist(
         existing.created_at = datetime.utcnow()
         session.add(existing)
         session.commit()
+        price_stream.track([normalized_symbol])
         return {"status": "updated", "message": "Prediction overwritten"}
 
     else:
@@ -383,6 +649,7 @@ async def add_to_watchlist(
         )
         session.add(pred)
         session.commit()
+        price_stream.track([normalized_symbol])
         return {"status": "created", "message": "Added to watchlist"}
 
 
@@ -391,7 +658,7 @@ async def get_sentiment(symbol: str):
     logger.info(f"🧠 Deep Sentiment Analysis for: {symbol}")
 
     # 1. Fetch Dynamic Data (Google News RSS)
-    rss_news = market_brain.get_company_rss(symbol)
+    rss_news = await market_brain.get_company_rss(symbol)
     logger.info(f"   📰 Source: Google News (RSS) | Found: {len(rss_news)} articles")
 
     # 2. Fetch Social Sentiment (Reddit)
@@ -486,6 +753,18 @@ async def validate_user_email(request: UserCheckRequest):
     return {"exists": False, "message": "Email available"}
 
 
+@app.get("/metrics/hedging")
+def hedging_metrics():
+    """Hedged provider calls: how often the secondary was fired, and how often it won."""
+    return {"history": history_hedger.stats(), "prices": price_hedger.stats()}
+
+
+@app.get("/metrics/finalization")
+def finalization_metrics():
+    """Background finalization queue: backlog, passes in flight and predictions settled."""
+    return finalization_queue.stats()
+
+
 @app.get("/health")
 def health_check():
     return {"status": "running", "service": "Sentient API"}
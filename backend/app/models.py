@@ -1,3 +1,4 @@
+from sqlalchemy import UniqueConstraint
 from sqlmodel import SQLModel, Field
 from datetime import datetime, timezone
 from datetime import date
@@ -29,6 +30,19 @@ class Prediction(SQLModel, table=True):
     created_at: date = Field(default_factory=date.today)
 
 
+class PrecomputedForecast(SQLModel, table=True):
+    """Nightly forecast for one (symbol, horizon), served by /predict while fresh."""
+    __table_args__ = (UniqueConstraint("symbol", "days", name="uq_precomputedforecast_symbol_days"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    symbol: str = Field(index=True)
+    days: int = Field(index=True)
+
+    payload: str  # PredictionResponse JSON
+    as_of: date   # Date of the last bar the model saw
+    computed_at: datetime = Field(index=True)  # UTC
+
+
 # --- Pydantic Schemas (Request/Response Bodies) ---
 
 class SavePredictionRequest(SQLModel):
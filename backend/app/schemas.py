@@ -1,11 +1,24 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import AfterValidator, BaseModel, EmailStr
 from datetime import date
-from typing import Optional, List
+from typing import Annotated, Optional, List
+
+from app.services.forecasters import FORECASTERS
+
+
+def _registered_engine(name: str) -> str:
+    if name not in FORECASTERS:
+        raise ValueError(f"Unknown forecast engine '{name}'. Choose one of: {', '.join(sorted(FORECASTERS))}")
+    return name
+
+
+# Any name registered with forecasters.register_forecaster ("prophet", "fast", ...)
+ForecastEngine = Annotated[str, AfterValidator(_registered_engine)]
 
 # Request Model
 class StockRequest(BaseModel):
     symbol: str
     days: int = 7
+    engine: ForecastEngine = "prophet"  # "fast" = vectorized NumPy model (sub-100ms)
 
 # Sub-Models for Analysis
 class TechnicalSignals(BaseModel):
@@ -47,6 +60,12 @@ class MarketMoversResponse(BaseModel):
     losers: List[MoverItem]
     active: List[MoverItem]
 
+class ForecastPoint(BaseModel):
+    forecast_date: date
+    price: float
+    lower: Optional[float] = None  # Uncertainty band (Prophet only)
+    upper: Optional[float] = None
+
 # Main Response
 class PredictionResponse(BaseModel):
     symbol: str
@@ -57,10 +76,22 @@ class PredictionResponse(BaseModel):
     forecast_date: date
     confidence_score: float
     explanation: str
+    forecast_path: Optional[List[ForecastPoint]] = None  # One point per day up to forecast_date
     technicals: Optional[TechnicalSignals] = None
     sentiment: Optional[SentimentAnalysis] = None
     liquidity: Optional[LiquidityData] = None
 
+# --- Batch Forecasting ---
+class BatchStockRequest(BaseModel):
+    symbols: List[str]
+    days: int = 7
+    engine: ForecastEngine = "prophet"
+
+class BatchPredictionItem(BaseModel):
+    symbol: str
+    result: Optional[PredictionResponse] = None
+    error: Optional[str] = None
+
 # --- Watchlist & Performance Models ---
 class WatchlistAddRequest(BaseModel):
     symbol: str
@@ -81,6 +112,13 @@ class WatchlistPerformanceItem(BaseModel):
     accuracy_score: float
     status: str
 
+class WatchlistPriceDelta(BaseModel):
+    id: int
+    symbol: str
+    current_price: float
+    accuracy_score: float
+    status: str
+
 class OptionStats(BaseModel):
     put_call_ratio: float
     total_call_vol: int
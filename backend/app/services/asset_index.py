@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import yfinance as yf
+from alpaca.trading.requests import GetAssetsRequest
+from alpaca.trading.enums import AssetClass, AssetStatus
+
+from app.core.config import settings
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class AssetIndex:
+    """
+    Local symbol -> company name index.
+
+    Built in bulk from Alpaca's asset list, persisted to a JSON file so it survives
+    restarts, and refreshed periodically by a background thread. Lookups are a dict hit;
+    a miss returns None immediately and queues a one-off Yahoo lookup off the request path.
+    Symbols Yahoo can't name are remembered for `miss_ttl` seconds, so a bad ticker
+    costs one lookup per TTL rather than one per request. Names Yahoo resolves only mark
+    the index dirty; the refresh thread writes them out every `save_interval` seconds
+    (and on shutdown), so the file isn't rewritten once per lookup.
+    """
+
+    def __init__(self, path: str, refresh_interval: float, miss_ttl: float = 3600, max_misses: int = 10000,
+                 save_interval: float = 60):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.save_interval = save_interval
+        self._names: Dict[str, str] = {}
+        self._updated_at = 0.0
+        self._dirty = False  # Names resolved since the last save
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lookups = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asset-lookup")
+        self._pending: set = set()
+        self._misses = LRUCache(max_entries=max_misses, ttl=miss_ttl)
+
+    @staticmethod
+    def _normalize(symbol: str) -> str:
+        # Alpaca lists class shares as "BRK.B"; the rest of the app uses "BRK-B"
+        return symbol.upper().replace('.', '-')
+
+    def name(self, symbol: str) -> Optional[str]:
+        key = self._normalize(symbol)
+        name = self._names.get(key)
+        if name is None:
+            self._queue_lookup(key)
+        return name
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    # --- Persistence ---
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            with self._lock:
+                self._names = {**data.get("names", {}), **self._names}
+                self._updated_at = data.get("updated_at", 0.0)
+            logger.info(f"✅ [ASSETS] Loaded {len(self._names)} asset names from disk")
+        except Exception as e:
+            logger.warning(f"⚠️ [ASSETS] Failed to load asset index: {e}")
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._lock:
+                data = {"updated_at": self._updated_at, "names": dict(self._names)}
+                self._dirty = False
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)  # Atomic: readers never see a half-written index
+        except Exception as e:
+            with self._lock:
+                self._dirty = True
+            logger.warning(f"⚠️ [ASSETS] Failed to persist asset index: {e}")
+
+    def flush(self) -> None:
+        """Persists names resolved since the last save, if any."""
+        if self._dirty:
+            self._save()
+
+    # --- Refresh ---
+
+    def refresh(self, trading_client) -> int:
+        """Rebuilds the index from Alpaca's full active US equity list (one request)."""
+        assets = trading_client.get_all_assets(
+            GetAssetsRequest(asset_class=AssetClass.US_EQUITY, status=AssetStatus.ACTIVE)
+        )
+        names = {self._normalize(a.symbol): a.name for a in assets if a.symbol and a.name}
+        with self._lock:
+            # Keep names we resolved elsewhere (e.g. crypto via Yahoo) that Alpaca doesn't list
+            self._names = {**self._names, **names}
+            self._updated_at = time.time()
+        self._save()
+        logger.info(f"✅ [ASSETS] Indexed {len(names)} assets from Alpaca")
+        return len(names)
+
+    def is_stale(self) -> bool:
+        return time.time() - self._updated_at >= self.refresh_interval
+
+    def start(self, trading_client) -> None:
+        """Loads the index from disk and keeps it fresh in a daemon thread."""
+        self.load()
+        if trading_client is None or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._refresh_loop, args=(trading_client,), name="asset-index", daemon=True
+        )
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _refresh_loop(self, trading_client) -> None:
+        while not self._stop.is_set():
+            if self.is_stale():
+                try:
+                    self.refresh(trading_client)
+                except Exception as e:
+                    logger.error(f"❌ [ASSETS] Refresh failed: {e}")
+            self.flush()
+            # Re-check every save_interval (retries a failed refresh too)
+            self._stop.wait(min(self.refresh_interval, self.save_interval))
+
+    # --- Misses ---
+
+    def _queue_lookup(self, symbol: str) -> None:
+        if self._misses.get(symbol):
+            return
+        with self._lock:
+            if symbol in self._pending:
+                return
+            self._pending.add(symbol)
+        self._lookups.submit(self._lookup_yahoo, symbol)
+
+    def _lookup_yahoo(self, symbol: str) -> None:
+        try:
+            info = yf.Ticker(symbol).info
+            name = info.get('longName') or info.get('shortName')
+            if name:
+                with self._lock:
+                    self._names[symbol] = name
+                    self._dirty = True
+            else:
+                self._misses.set(symbol, True)
+        except Exception as e:
+            self._misses.set(symbol, True)
+            logger.warning(f"⚠️ [ASSETS] Name lookup failed for {symbol}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(symbol)
+
+
+asset_index = AssetIndex(settings.ASSET_INDEX_PATH, refresh_interval=settings.ASSET_INDEX_REFRESH_HOURS * 3600,
+                         miss_ttl=settings.ASSET_INDEX_MISS_TTL, save_interval=settings.ASSET_INDEX_SAVE_INTERVAL)
@@ -0,0 +1,266 @@
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def approx_size(value: Any) -> int:
+    """Rough in-memory size in bytes: exact-ish for DataFrames/arrays (anything with nbytes), shallow otherwise."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray) or isinstance(getattr(value, "nbytes", None), int):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(approx_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_size(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory cache with LRU eviction and per-entry TTL.
+
+    Bounded by entry count and, optionally, an approximate byte budget (see approx_size).
+    Expired entries are dropped lazily when they are read or when space is needed.
+    Keeps hit/miss/eviction/expiration counters for stats().
+    """
+
+    def __init__(self, max_entries: int, ttl: float, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.get_with_age(key)
+        return entry[0] if entry is not None else None
+
+    def get_with_age(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """(value, seconds since it was stored), or None if missing/expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at, _ = entry
+            age = time.time() - stored_at
+            if age >= self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, age
+
+    def set(self, key: Hashable, value: Any, stored_at: Optional[float] = None) -> None:
+        """`stored_at` backdates the entry (e.g. when copying it from a shared tier)."""
+        size = approx_size(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.time() if stored_at is None else stored_at, size)
+            self._bytes += size
+            self._shrink()
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries), "bytes": self._bytes,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "expirations": self.expirations,
+            }
+
+    def _drop(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _over_budget(self) -> bool:
+        over_bytes = self.max_bytes is not None and self._bytes > self.max_bytes
+        return len(self._entries) > self.max_entries or over_bytes
+
+    def _shrink(self) -> None:
+        if not self._over_budget():
+            return
+        # Expired entries go first, then least recently used (the newest entry always stays)
+        now = time.time()
+        for key in [k for k, (_, stored_at, _) in self._entries.items() if now - stored_at >= self.ttl]:
+            self._drop(key)
+            self.expirations += 1
+        while self._over_budget() and len(self._entries) > 1:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the function,
+    everyone who arrives while it is in flight waits for and shares its result (or error).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = Future()
+                self._calls[key] = call
+
+        if not is_leader:
+            logger.info(f"🔗 [SINGLEFLIGHT] Joining in-flight call for {key}")
+            return call.result()
+
+        try:
+            result = fn()
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class BatchLoader:
+    """
+    Batches and coalesces per-key lookups against a bulk upstream call.
+
+    Keys requested within `window` seconds of each other are collected into one batch,
+    split into chunks of `chunk_size`, and the chunks are fetched in parallel. A key that
+    is already in flight is never requested again: later callers wait on the same result.
+    `fetch(keys)` returns {key: value} for the keys it found; a failed chunk yields nothing.
+    """
+
+    def __init__(self, fetch: Callable[[List[Hashable]], Dict[Hashable, Any]], window: float,
+                 chunk_size: int, max_workers: int = 4, name: str = "batch"):
+        self.fetch = fetch
+        self.window = window
+        self.chunk_size = max(1, chunk_size)
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-loader")
+        self._inflight: Dict[Hashable, Future] = {}
+        self._queued: List[Hashable] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self.batches = self.chunks = self.coalesced = 0
+
+    def load_many(self, keys: Iterable[Hashable], timeout: Optional[float] = None) -> Dict[Hashable, Any]:
+        """Values for `keys` (missing ones left out). Waits at most `timeout` seconds."""
+        waiting: Dict[Hashable, Future] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = Future()
+                    self._queued.append(key)
+                else:
+                    self.coalesced += 1
+                waiting[key] = future
+            if self._queued and self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        wait(waiting.values(), timeout=timeout)
+        return {key: f.result() for key, f in waiting.items() if f.done() and f.result() is not None}
+
+    def _flush(self) -> None:
+        with self._lock:
+            batch, self._queued, self._timer = self._queued, [], None
+        if not batch:
+            return
+        self.batches += 1
+        for i in range(0, len(batch), self.chunk_size):
+            self.chunks += 1
+            self._executor.submit(self._load_chunk, batch[i:i + self.chunk_size])
+
+    def _load_chunk(self, chunk: List[Hashable]) -> None:
+        try:
+            found = self.fetch(chunk) or {}
+        except Exception as e:
+            logger.warning(f"⚠️ [BATCH] {self.name}: chunk of {len(chunk)} failed: {e}")
+            found = {}
+        with self._lock:
+            futures = [self._inflight.pop(key) for key in chunk]
+        for key, future in zip(chunk, futures):
+            future.set_result(found.get(key))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            inflight = len(self._inflight)
+        return {"batches": self.batches, "chunks": self.chunks, "coalesced": self.coalesced, "inflight": inflight}
+
+
+class BackgroundRefresher:
+    """
+    Stale-while-revalidate helper: runs refreshes on a small thread pool,
+    at most one in flight per key. Errors are logged; the stale value keeps being served.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cache-refresh")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn: Callable[[], Any]) -> bool:
+        """Schedules `fn` unless a refresh for `key` is already running. Returns True if scheduled."""
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        logger.info(f"🔄 [SWR] Serving stale {key}, refreshing in background")
+        self._executor.submit(self._run, key, fn)
+        return True
+
+    def _run(self, key: Hashable, fn: Callable[[], Any]) -> None:
+        try:
+            fn()
+        except Exception as e:
+            logger.warning(f"⚠️ [SWR] Background refresh for {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Blocks until no refresh is pending (mainly for tests)."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return True
+            time.sleep(0.01)
+        return False
+
+
+cache_refresher = BackgroundRefresher()
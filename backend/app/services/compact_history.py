@@ -0,0 +1,95 @@
+import hashlib
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+
+
+class CompactHistory:
+    """
+    A daily close history as two contiguous, read-only arrays:
+    `days` (int32 days since 1970-01-01) and `closes` (HISTORY_CLOSE_DTYPE).
+
+    12 bytes per bar (8 with float32 closes) against 16 for a ('ds', 'y') DataFrame, with
+    none of pandas' per-frame overhead. Windows are slices of the same buffers, so a
+    cache hit hands out views and copies nothing.
+    Build a pandas frame with to_frame() only where a model actually needs one.
+    Bars are daily: the time of day of a timestamp is dropped.
+    """
+
+    __slots__ = ("days", "closes")
+
+    def __init__(self, days: np.ndarray, closes: np.ndarray):
+        if len(days) != len(closes):
+            raise ValueError("days and closes must have the same length")
+        days.flags.writeable = False
+        closes.flags.writeable = False
+        self.days = days
+        self.closes = closes
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "CompactHistory":
+        """('ds', 'y') frame -> compact history (the one place data is copied in)."""
+        dtype = np.dtype(settings.HISTORY_CLOSE_DTYPE)
+        days = pd.DatetimeIndex(df['ds']).values.astype('datetime64[D]').astype(np.int32)
+        # Always own the buffers before freezing them: to_numpy() can alias the caller's frame
+        return cls(np.array(days, copy=True), np.array(df['y'].to_numpy(), dtype=dtype, copy=True))
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.days) == 0
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.days.nbytes + self.closes.nbytes)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Bar dates as datetime64[D] (a new array)."""
+        return self.days.astype('datetime64[D]')
+
+    @property
+    def first_date(self) -> pd.Timestamp:
+        return pd.Timestamp(self.days[0].astype('datetime64[D]'))
+
+    @property
+    def last_date(self) -> pd.Timestamp:
+        return pd.Timestamp(self.days[-1].astype('datetime64[D]'))
+
+    @property
+    def last_close(self) -> float:
+        return float(self.closes[-1])
+
+    def window(self, days: int, now: Optional[datetime] = None) -> "CompactHistory":
+        """Bars after the day `days` calendar days ago, as a view of the same buffers."""
+        cutoff = np.datetime64(now or datetime.now(), 'D').astype(np.int64) - days
+        start = int(np.searchsorted(self.days, cutoff, side='right'))
+        return CompactHistory(self.days[start:], self.closes[start:])
+
+    def fingerprint(self) -> str:
+        """Stable content hash, cheap enough to key caches on without building a frame."""
+        digest = hashlib.sha1(self.days.tobytes())
+        digest.update(self.closes.astype(np.float64, copy=False).tobytes())
+        return digest.hexdigest()[:16]
+
+    def to_frame(self) -> pd.DataFrame:
+        """A fresh ('ds', 'y') DataFrame the caller owns, for pandas/Prophet code."""
+        return pd.DataFrame({
+            'ds': pd.DatetimeIndex(self.dates).as_unit('ns'),
+            'y': self.closes.astype(np.float64)
+        })
+
+    def dump(self) -> List:
+        """msgpack-friendly form for the shared cache tier."""
+        return [self.days.tobytes(), self.closes.tobytes(), self.closes.dtype.str]
+
+    @classmethod
+    def load(cls, data: List) -> "CompactHistory":
+        days, closes, dtype = data
+        return cls(np.frombuffer(days, dtype=np.int32), np.frombuffer(closes, dtype=np.dtype(dtype)))
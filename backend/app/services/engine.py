@@ -1,36 +1,54 @@
+import numpy as np
 import pandas as pd
-import requests
+import asyncio
 import logging
-import time  # ✅ Added for cache timing
 from bs4 import BeautifulSoup
-from prophet import Prophet
 from textblob import TextBlob
-from sklearn.metrics import mean_absolute_error
 import yfinance as yf
+from typing import Dict, Tuple
 
 from alpaca.data.requests import StockSnapshotRequest
 from app.schemas import (
-    StockRequest, PredictionResponse, TechnicalSignals,
+    StockRequest, PredictionResponse,
     SentimentAnalysis, NewsItem, LiquidityData,
     MoverItem, MarketMoversResponse,
-    RealTimeMarketData, OptionStats, FundHolder
+    RealTimeMarketData, OptionStats, FundHolder, ForecastPoint
 )
+from app.core.config import settings
 from .providers import DataProvider
+from .cache import LRUCache, SingleFlight, cache_refresher
+from .tiered_cache import TieredCache, MsgpackCodec
+from .forecasters import FORECASTERS, Forecaster, ForecastPath, align_histories
+from .compact_history import CompactHistory
+from .technicals import TechnicalIndicators
+from .asset_index import asset_index
+from .http_client import http_client
 
 logger = logging.getLogger(__name__)
 
 # ✅ CONFIG: The specific tickers to track for Market Movers
 MOVERS_WATCHLIST = ['NVDA', 'AAPL', 'MSFT', 'AMZN', 'META', 'GOOGL', 'TSLA', 'AMD', 'BRK-B', 'LLY']
 
-
 class PredictionEngine:
     # ✅ CACHE STORAGE (Class-Level)
     # This persists across different requests/instances of PredictionEngine
-    _MOVERS_CACHE = {
-        "data": [],
-        "timestamp": 0
-    }
-    _CACHE_TTL = 300  # 5 Minutes (300 seconds)
+    _CACHE_TTL = 300  # 5 Minutes (300 seconds): soft TTL, stale movers are served while refreshing
+    _MOVERS_CACHE = TieredCache(
+        LRUCache(max_entries=1, ttl=settings.MOVERS_HARD_TTL), namespace="movers",
+        codec=MsgpackCodec(
+            dump=lambda items: [i.model_dump() for i in items],
+            load=lambda rows: [MoverItem(**r) for r in rows]
+        )
+    )
+
+    # ✅ FORECAST RESULT CACHE + REQUEST COALESCING
+    _FORECAST_CACHE = LRUCache(max_entries=settings.FORECAST_CACHE_SIZE, ttl=settings.FORECAST_CACHE_TTL)
+    _FORECAST_FLIGHTS = SingleFlight()
+    # One instance per registered forecaster (see forecasters.FORECASTERS), created on first use
+    _FORECASTERS: Dict[type, Forecaster] = {}
+
+    # ✅ TECHNICAL INDICATORS (per-symbol state, updated bar by bar)
+    _TECHNICALS = TechnicalIndicators(max_entries=settings.TECHNICALS_CACHE_SIZE)
 
     def __init__(self, data_client=None, trading_client=None):
         self.provider = DataProvider(data_client)
@@ -48,10 +66,10 @@ class PredictionEngine:
         if "-" in symbol and "USD" in symbol: return f"COINBASE:{symbol.split('-')[0]}USD"
         return f"NYSE:{symbol}" if len(symbol) <= 3 else f"NASDAQ:{symbol}"
 
-    def _scrape_google_news(self, symbol: str) -> list:
+    async def _scrape_google_news(self, symbol: str) -> list:
         try:
             url = f"https://news.google.com/rss/search?q={symbol}+stock+news&hl=en-US&gl=US&ceid=US:en"
-            resp = requests.get(url, headers=self._get_headers(), timeout=5)
+            resp = await http_client.get(url, headers=self._get_headers(), timeout=5)
             soup = BeautifulSoup(resp.content, "xml")
             items = soup.findAll("item")[:5]
             news = []
@@ -67,7 +85,7 @@ class PredictionEngine:
             logger.warning(f"⚠️ Google News Scrape failed for {symbol}: {e}")
             return []
 
-    def _fetch_market_data_unified(self) -> list[MoverItem]:
+    async def _fetch_market_data_unified(self) -> list[MoverItem]:
         """
         Attempts to fetch mover data for the specific watchlist.
         Priority: Finviz Scrape -> YFinance Fallback.
@@ -81,7 +99,7 @@ class PredictionEngine:
             url = f"https://finviz.com/screener.ashx?v=111&t={tickers_param}"
 
             logger.info(f"🕷️ Scraping Finviz Watchlist: {url}")
-            resp = requests.get(url, headers=self._get_headers(), timeout=8)
+            resp = await http_client.get(url, headers=self._get_headers(), timeout=8)
 
             if resp.status_code == 200:
                 soup = BeautifulSoup(resp.content, "html.parser")
@@ -131,7 +149,7 @@ class PredictionEngine:
         # --- STRATEGY 2: YFinance Fallback ---
         logger.info("🔄 Switching to YFinance Fallback...")
         try:
-            data = yf.download(MOVERS_WATCHLIST, period="2d", progress=False)['Close']
+            data = (await asyncio.to_thread(yf.download, MOVERS_WATCHLIST, period="2d", progress=False))['Close']
 
             # If only one ticker, yfinance returns a Series, not DataFrame
             is_series = isinstance(data, pd.Series)
@@ -162,30 +180,30 @@ class PredictionEngine:
             logger.error(f"❌ YFinance Fallback Failed: {e}")
             return []
 
-    def get_market_movers(self) -> MarketMoversResponse:
+    async def _refresh_movers(self) -> list[MoverItem]:
+        all_movers = await self._fetch_market_data_unified()
+
+        # ✅ UPDATE CACHE (Only if we got data)
+        if all_movers:
+            PredictionEngine._MOVERS_CACHE.set("movers", all_movers)
+        return all_movers
+
+    async def get_market_movers(self) -> MarketMoversResponse:
         """
         Orchestrates the fetching and sorting of market movers with CACHING.
         """
 
-        # ✅ CACHE CHECK
-        current_time = time.time()
-        cached_data = PredictionEngine._MOVERS_CACHE.get("data")
-        cached_ts = PredictionEngine._MOVERS_CACHE.get("timestamp", 0)
-        cache_age = current_time - cached_ts
+        # ✅ CACHE CHECK (stale-while-revalidate)
+        cached = PredictionEngine._MOVERS_CACHE.get_with_age("movers")
 
-        if cached_data and cache_age < PredictionEngine._CACHE_TTL:
+        if cached:
+            all_movers, cache_age = cached
             logger.info(f"⚡ Using Cached Market Movers ({int(cache_age)}s old)")
-            all_movers = cached_data
+            if cache_age >= PredictionEngine._CACHE_TTL:
+                cache_refresher.submit(("movers",), lambda: http_client.run_sync(self._refresh_movers()))
         else:
             # 1. Fetch All Data (Unified)
-            all_movers = self._fetch_market_data_unified()
-
-            # ✅ UPDATE CACHE (Only if we got data)
-            if all_movers:
-                PredictionEngine._MOVERS_CACHE = {
-                    "data": all_movers,
-                    "timestamp": current_time
-                }
+            all_movers = await self._refresh_movers()
 
         if not all_movers:
             return MarketMoversResponse(gainers=[], losers=[], active=[])
@@ -214,45 +232,96 @@ class PredictionEngine:
         return MarketMoversResponse(gainers=gainers, losers=losers, active=active)
 
     def predict(self, request: StockRequest) -> PredictionResponse:
-        logger.info(f"🧠 Engine: Starting analysis for {request.symbol} ({request.days} days)")
+        # Identical concurrent requests share one fetch + forecast
+        flight_key = ("predict", request.symbol.upper(), request.days, request.engine)
+        return PredictionEngine._FORECAST_FLIGHTS.do(flight_key, lambda: self._predict(request))
+
+    def _predict(self, request: StockRequest) -> PredictionResponse:
+        logger.info(f"🧠 Engine: Starting analysis for {request.symbol} ({request.days} days, {request.engine})")
 
         # 1. Fetch History
-        df, source = self.provider.fetch_history(request.symbol, days=730)
-        current_price = df.iloc[-1]['y']
+        history, source = self.provider.fetch_history(request.symbol, days=730)
+        return self.predict_from_history(request, history, source)
 
-        # 2. Prophet
-        try:
-            m = Prophet(daily_seasonality=True)
-            m.fit(df)
-            future = m.make_future_dataframe(periods=request.days)
-            forecast = m.predict(future)
-            pred_price = forecast.iloc[-1]['yhat']
-        except Exception as e:
-            logger.error(f"❌ Prophet Model Failed: {e}")
-            raise e
+    def predict_from_history(self, request: StockRequest, history: CompactHistory, source: str) -> PredictionResponse:
+        """
+        Forecast step of predict() on an already-fetched history.
+        Used directly by batch forecasting, which fetches all histories up front.
+        Results are cached per (symbol, days, engine, data version); the pandas frame
+        the models need is only built on a miss.
+        """
+        cache_key = self._forecast_key(request, history)
+        cached = PredictionEngine._FORECAST_CACHE.get(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Using Cached Forecast for {request.symbol} ({request.days} days)")
+            return cached
 
-        # 3. Fetch Company Name
-        company_name = request.symbol
-        if self.trading_client:
-            try:
-                alpaca_sym = request.symbol.replace('-', '.')
-                asset = self.trading_client.get_asset(alpaca_sym)
-                if asset.name: company_name = asset.name
-            except:
-                pass
+        def compute() -> PredictionResponse:
+            result = self._forecast(request, history.to_frame(), source)
+            PredictionEngine._FORECAST_CACHE.set(cache_key, result)
+            return result
 
-        if company_name == request.symbol:
-            try:
-                i = yf.Ticker(request.symbol).info
-                company_name = i.get('longName') or i.get('shortName') or request.symbol
-            except:
-                pass
-
-        # 4. Mock Technicals (Placeholders)
-        technicals = TechnicalSignals(
-            sma_50=0, sma_200=0, rsi=50, bollinger_upper=0, bollinger_lower=0,
-            trend_signal="Neutral", rsi_signal="Neutral", bollinger_signal="Normal"
-        )
+        return PredictionEngine._FORECAST_FLIGHTS.do(("forecast",) + cache_key, compute)
+
+    def predict_fast_many(self, days: int,
+                          histories: Dict[str, Tuple[CompactHistory, str]]) -> Dict[str, PredictionResponse]:
+        """
+        Scores every symbol with the vectorized fast forecaster in ONE call.
+        Symbols with too little history are left out of the result.
+        """
+        frames = {sym: history.to_frame() for sym, (history, _) in histories.items()}
+        symbols, dates, closes = align_histories(frames, limit=settings.FAST_ALIGN_MAX_GAP)
+        if not symbols:
+            return {}
+        forecaster = PredictionEngine._forecaster("fast")
+        result = forecaster.fit_predict(closes, dates, days)
+        valid_counts = np.isfinite(result.fitted).sum(axis=1)
+
+        responses = {}
+        for i, symbol in enumerate(symbols):
+            if valid_counts[i] < forecaster.min_bars:
+                logger.warning(f"⚠️ Fast Forecast: Not enough history for {symbol}")
+                continue
+            history, source = histories[symbol]
+            request = StockRequest(symbol=symbol, days=days, engine="fast")
+            responses[symbol] = self._build_response(request, frames[symbol], result.path(i), source, forecaster.label)
+            PredictionEngine._FORECAST_CACHE.set(self._forecast_key(request, history), responses[symbol])
+        return responses
+
+    @staticmethod
+    def _forecast_key(request: StockRequest, history: CompactHistory) -> tuple:
+        return request.symbol.upper(), request.days, request.engine, history.fingerprint()
+
+    def _forecast(self, request: StockRequest, df: pd.DataFrame, source: str) -> PredictionResponse:
+        if request.days < 1:
+            raise ValueError("Forecast horizon must be at least 1 day")
+
+        # 2. Model
+        forecaster = PredictionEngine._forecaster(request.engine)
+        path = forecaster.forecast_path(request.symbol, df, request.days)
+        return self._build_response(request, df, path, source, forecaster.label)
+
+    @staticmethod
+    def _forecaster(name: str) -> Forecaster:
+        cls = FORECASTERS.get(name)
+        if cls is None:
+            raise ValueError(f"Unknown forecast engine: {name}")
+        forecaster = PredictionEngine._FORECASTERS.get(cls)
+        if forecaster is None:
+            forecaster = PredictionEngine._FORECASTERS.setdefault(cls, cls())
+        return forecaster
+
+    def _build_response(self, request: StockRequest, df: pd.DataFrame, path: ForecastPath,
+                        source: str, model_label: str) -> PredictionResponse:
+        current_price = df.iloc[-1]['y']
+        pred_price = path.price_at(request.days)
+        mae = path.mae
+
+        # 3. Company Name (local index, no network)
+        company_name = asset_index.name(request.symbol) or request.symbol
+
+        # 4. Technicals (computed once per new bar, cached per symbol)
+        technicals = PredictionEngine._TECHNICALS.compute(request.symbol, df)
         sentiment = SentimentAnalysis(score=0, label="Neutral", news=[])
         liquidity = LiquidityData(avg_volume=0, market_cap=0, bid_ask_spread=0, liquidity_rating="Low",
                                   slippage_risk="Low")
@@ -262,10 +331,9 @@ class PredictionEngine:
         pct_change = abs((pred_price - current_price) / current_price) * 100
         detailed_explanation = (
             f"AI forecasts a {pct_change:.1f}% {direction} to ${pred_price:.2f} over {request.days} days. "
-            f"Analysis powered by Prophet models on {source} data."
+            f"Analysis powered by {model_label} on {source} data."
         )
 
-        mae = mean_absolute_error(df['y'], forecast.iloc[:len(df)]['yhat'])
         confidence = max(0, min(100, 100 * (1 - (mae / current_price))))
 
         logger.info(f"✅ Analysis Complete: {request.symbol} -> {pred_price:.2f} (Conf: {confidence:.1f}%)")
@@ -276,9 +344,10 @@ class PredictionEngine:
             tv_symbol=self._get_tv_symbol(request.symbol),
             current_price=current_price,
             predicted_price=pred_price,
-            forecast_date=forecast.iloc[-1]['ds'].date(),
+            forecast_date=path.date_at(request.days).date(),
             confidence_score=round(confidence, 1),
             explanation=detailed_explanation,
+            forecast_path=[ForecastPoint(**p) for p in path.points(request.days)],
             technicals=technicals, sentiment=sentiment, liquidity=liquidity
         )
 
@@ -358,4 +427,4 @@ class PredictionEngine:
             return RealTimeMarketData(
                 symbol=symbol, market_cap=0, short_float=0,
                 institutional_ownership=0, options_sentiment=None, top_holders=[]
-            )
\ No newline at end of file
+            )
@@ -0,0 +1,249 @@
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from datetime import date, timedelta
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import or_, update
+from sqlmodel import Session, select
+
+from app.models import Prediction
+from .providers import DataProvider
+
+logger = logging.getLogger(__name__)
+
+# A target date with no bar (holiday, delayed data) settles on the next close within this many days
+SETTLE_WITHIN_DAYS = 1
+
+
+def next_market_day(d: date) -> date:
+    """The first market day (Mon-Fri) on or after d."""
+    while d.weekday() > 4: d += timedelta(days=1)
+    return d
+
+
+def is_open(prediction: Prediction) -> bool:
+    return not prediction.final_price  # NULL or 0.0: not finalized yet
+
+
+def open_predictions():
+    """WHERE clause for predictions that haven't been finalized (final_price NULL or 0)."""
+    return or_(Prediction.final_price == None, Prediction.final_price == 0.0)  # noqa: E711
+
+
+def matured(predictions: Iterable[Prediction], today: Optional[date] = None) -> List[Prediction]:
+    """Open predictions whose target market day has arrived."""
+    today = today or date.today()
+    return [p for p in predictions if is_open(p) and today >= next_market_day(p.end_date)]
+
+
+def closed_symbols(session: Session, symbols: Iterable[str]) -> Set[str]:
+    """Of `symbols`, those with no open prediction left."""
+    symbols = set(symbols)
+    if not symbols:
+        return set()
+    still_open = session.exec(
+        select(Prediction.symbol).where(Prediction.symbol.in_(symbols), open_predictions()).distinct()
+    ).all()
+    return symbols - set(still_open)
+
+
+def resolve_final_prices(provider: DataProvider, predictions: Iterable[Prediction],
+                         today: Optional[date] = None) -> Dict[int, Tuple[float, date]]:
+    """
+    Closing prices for matured predictions: {prediction id: (final price, finalized date)}.
+
+    Predictions are grouped by (symbol, target market day) and every symbol's history comes
+    from one fetch_history_many call, so N matured rows cost one bulk download (or none,
+    when the histories are cached). Targets without a close yet are left out and retried
+    on the next pass.
+    """
+    today = today or date.today()
+    groups: Dict[Tuple[str, date], List[int]] = defaultdict(list)
+    for p in matured(predictions, today):
+        groups[(p.symbol, next_market_day(p.end_date))].append(p.id)
+    if not groups:
+        return {}
+
+    symbols = sorted({symbol for symbol, _ in groups})
+    oldest = min(target for _, target in groups)
+    histories = provider.fetch_history_many(symbols, days=max(30, (today - oldest).days + 7))
+
+    resolved: Dict[int, Tuple[float, date]] = {}
+    for (symbol, target), ids in groups.items():
+        entry = histories.get(symbol)
+        close = _close_on(entry[0], target) if entry else None
+        if close is None:
+            continue
+        for pid in ids:
+            resolved[pid] = (close, target)
+
+    logger.info(f"🏁 [FINALIZE] Resolved {len(resolved)} predictions "
+                f"({len(groups)} symbol/date groups, {len(symbols)} symbols)")
+    return resolved
+
+
+def _close_on(history, target: date) -> Optional[float]:
+    """First close on `target` or within SETTLE_WITHIN_DAYS after it."""
+    day = np.datetime64(target, 'D').astype(np.int64)
+    i = int(np.searchsorted(history.days, day, side='left'))
+    if i < len(history) and history.days[i] <= day + SETTLE_WITHIN_DAYS:
+        return float(history.closes[i])
+    return None
+
+
+def apply_final_prices(session: Session, resolved: Dict[int, Tuple[float, date]]) -> int:
+    """Writes final_price / finalized_date for every resolved prediction in one batched UPDATE."""
+    if not resolved:
+        return 0
+    session.execute(
+        update(Prediction),
+        [{"id": pid, "final_price": price, "finalized_date": finalized, "status": "VALIDATED"}
+         for pid, (price, finalized) in resolved.items()]
+    )
+    session.commit()
+    return len(resolved)
+
+
+class FinalizationQueue:
+    """
+    Finalization off the read path: watchlist reads enqueue matured prediction IDs and
+    return straight away; a small pool of worker threads drains the queue.
+
+    Each pass takes up to `batch_size` IDs, so many matured rows still cost one bulk
+    history fetch and one batched UPDATE. An ID is queued at most once at a time, and a
+    prediction whose close isn't published yet is not retried for `retry_after` seconds.
+    Past `max_pending` queued IDs new ones are dropped; the next read enqueues them again.
+    Listeners are called after each pass with {prediction id: (symbol, final price, finalized date)}.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], provider_factory: Callable[[], DataProvider],
+                 workers: int = 2, batch_size: int = 200, max_pending: int = 10000, retry_after: float = 300):
+        self._session_factory = session_factory
+        self._provider_factory = provider_factory
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._queue: Deque[int] = deque()
+        self._queued: Set[int] = set()  # Waiting or being settled
+        self._retry_at: Dict[int, float] = {}
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running = 0
+        self._closed = False
+        self._listeners: List[Callable[[Dict[int, Tuple[str, float, date]]], None]] = []
+        self.finalized = self.dropped = self.failed = 0
+
+    def enqueue(self, ids: Iterable[int]) -> int:
+        """Queues IDs for finalization without blocking. Returns how many were newly queued."""
+        now = time.time()
+        added = 0
+        with self._cond:
+            if self._closed:
+                return 0
+            for pid in ids:
+                if pid in self._queued or self._retry_at.get(pid, 0) > now:
+                    continue
+                if len(self._queue) >= self.max_pending:
+                    self.dropped += 1
+                    continue
+                self._retry_at.pop(pid, None)
+                self._queue.append(pid)
+                self._queued.add(pid)
+                added += 1
+            if added:
+                self._spawn_workers()
+                self._cond.notify_all()
+        return added
+
+    def add_listener(self, listener: Callable[[Dict[int, Tuple[str, float, date]]], None]) -> None:
+        with self._cond:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def _spawn_workers(self) -> None:
+        # Called with the lock held; workers start on first use
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"finalize-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._running += 1
+
+            settled: Set[int] = set()
+            try:
+                settled = self._settle(batch)
+            except Exception as e:
+                with self._cond:
+                    self.failed += 1
+                logger.warning(f"⚠️ [FINALIZE] Pass over {len(batch)} predictions failed: {e}")
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    retry_at = time.time() + self.retry_after
+                    for pid in batch:
+                        self._queued.discard(pid)
+                        if pid not in settled:
+                            self._retry_at[pid] = retry_at
+                    if len(self._retry_at) > self.max_pending:
+                        now = time.time()
+                        self._retry_at = {pid: t for pid, t in self._retry_at.items() if t > now}
+                    self._cond.notify_all()
+
+    def _settle(self, ids: List[int]) -> Set[int]:
+        """One pass: IDs that are finalized now (or no longer need it)."""
+        with self._session_factory() as session:
+            predictions = session.exec(
+                select(Prediction).where(Prediction.id.in_(ids), open_predictions())
+            ).all()
+            still_open = {p.id for p in predictions}
+            resolved = resolve_final_prices(self._provider_factory(), predictions)
+            finalized = {p.id: (p.symbol, *resolved[p.id]) for p in predictions if p.id in resolved}
+            apply_final_prices(session, resolved)
+        with self._cond:
+            self.finalized += len(finalized)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(finalized)
+            except Exception as e:
+                logger.warning(f"⚠️ [FINALIZE] Finalization listener failed: {e}")
+        # Already finalized (e.g. by the scheduler) or deleted: nothing left to do
+        return (set(ids) - still_open) | set(resolved)
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Blocks until the queue is drained and no pass is running (mainly for tests)."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._queue or self._running:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"queued": len(self._queue), "running": self._running, "finalized": self.finalized,
+                    "waiting_retry": len(self._retry_at), "dropped": self.dropped, "failed": self.failed}
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._closed = True
+            threads, self._threads = self._threads, []
+            self._cond.notify_all()
+        for thread in threads:
+            thread.join(timeout=5)
+        if threads:
+            logger.info("🛑 [FINALIZE] Finalization workers stopped")
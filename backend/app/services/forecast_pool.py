@@ -0,0 +1,186 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastQueueFull(RuntimeError):
+    """Raised when every forecast slot is busy for longer than the queue timeout."""
+
+
+def _warm_worker():
+    """
+    Worker initializer: pay the Prophet / Stan backend import once per process
+    instead of on the first request that lands on it.
+    """
+    from prophet import Prophet
+    Prophet()  # Loads the CmdStanPy model binary
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _stan_init(m) -> dict:
+    """Fitted parameters of `m` in the shape Prophet.fit(init=...) expects."""
+    init = {name: m.params[name][0][0] for name in ['k', 'm', 'sigma_obs']}
+    init.update({name: m.params[name][0] for name in ['delta', 'beta']})
+    return init
+
+
+def _noise_scale(m) -> float:
+    """Fitted observation noise in price units, comparable across fits."""
+    return float(m.params['sigma_obs'][0][0] * m.y_scale)
+
+
+def _warm_fit(df: pd.DataFrame, warm_json: str):
+    """
+    Refits seeded with the previous fit's parameters, so Stan starts next to the optimum.
+    Returns None (caller does a cold fit) if the history changed too much, the fit failed or it diverged.
+    """
+    from prophet import Prophet
+    from prophet.serialize import model_from_json
+
+    try:
+        prev = model_from_json(warm_json)
+    except Exception:
+        return None
+
+    try:
+        new_bars = int((df['ds'] > prev.history['ds'].max()).sum())
+        if not 0 < new_bars <= settings.WARM_START_MAX_NEW_BARS:
+            return None
+
+        m = Prophet(daily_seasonality=True)
+        m.fit(df, init=_stan_init(prev))
+
+        finite = all(np.all(np.isfinite(v)) for v in m.params.values())
+        if not finite or _noise_scale(m) > _noise_scale(prev) * settings.WARM_START_MAX_NOISE_RATIO:
+            logger.warning("⚠️ [FORECAST] Warm-started fit diverged. Falling back to a cold fit.")
+            return None
+    except Exception as e:
+        logger.warning(f"⚠️ [FORECAST] Warm-started fit failed, falling back to a cold fit: {e}")
+        return None
+
+    logger.info(f"♨️ [FORECAST] Warm-started fit ({new_bars} new bars)")
+    return m
+
+
+def prophet_forecast(df: pd.DataFrame, periods: int, model_json: Optional[str] = None,
+                     warm_json: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[str]]:
+    """
+    Runs inside a pool worker. Loads the cached model if one is given, otherwise fits
+    (warm-started from `warm_json` when possible, cold otherwise).
+    Returns the forecast frame and, if a new fit happened, its serialized model.
+    """
+    from prophet import Prophet
+    from prophet.serialize import model_to_json, model_from_json
+
+    m, fitted_json = None, None
+    if model_json is not None:
+        try:
+            m = model_from_json(model_json)
+        except Exception as e:
+            logger.warning(f"⚠️ [FORECAST] Cached model unreadable, refitting: {e}")
+
+    if m is None:
+        if warm_json is not None:
+            m = _warm_fit(df, warm_json)
+        if m is None:
+            m = Prophet(daily_seasonality=True)
+            m.fit(df)
+        fitted_json = model_to_json(m)
+
+    future = m.make_future_dataframe(periods=periods)
+    forecast = m.predict(future)
+    return forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']], fitted_json
+
+
+class ForecastPool:
+    """
+    Process pool for CPU-bound forecasting.
+
+    - Workers are spawned up front with Prophet already imported.
+    - At most `max_pending` jobs are queued or running; callers wait up to
+      `queue_timeout` seconds for a slot before ForecastQueueFull is raised.
+    - Workers are recycled after `max_tasks_per_child` jobs to cap Stan memory growth.
+
+    When the pool isn't started (tests, scripts, FORECAST_WORKERS=0), jobs run inline.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, max_tasks_per_child: int, queue_timeout: float):
+        self.max_workers = max_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        if self.max_workers <= 0:
+            logger.info("ℹ️ [FORECAST] Process pool disabled. Fitting inline.")
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+                max_tasks_per_child=self.max_tasks_per_child or None,
+            )
+            # Spawn every worker now so they are warm before the first request
+            for _ in range(self.max_workers):
+                self._executor.submit(_ping)
+        logger.info(f"✅ [FORECAST] Process pool started ({self.max_workers} workers)")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.info("🛑 [FORECAST] Process pool stopped")
+
+    def run(self, fn, *args):
+        """Blocking call: runs `fn(*args)` in a worker and returns its result."""
+        executor = self._executor
+        if executor is None:
+            return fn(*args)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise ForecastQueueFull("Forecast queue is full. Try again shortly.")
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault). Replace the pool so later jobs still run.
+            logger.error("❌ [FORECAST] Worker pool broken. Restarting...")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            self.start()
+            raise
+        finally:
+            self._slots.release()
+
+
+forecast_pool = ForecastPool(
+    max_workers=settings.FORECAST_WORKERS,
+    max_pending=settings.FORECAST_MAX_PENDING,
+    max_tasks_per_child=settings.FORECAST_MAX_TASKS_PER_CHILD,
+    queue_timeout=settings.FORECAST_QUEUE_TIMEOUT,
+)
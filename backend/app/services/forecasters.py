@@ -0,0 +1,243 @@
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+
+from app.core.config import settings
+from .cache import LRUCache, SingleFlight
+from .forecast_pool import forecast_pool, prophet_forecast
+from .model_cache import ModelCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ForecastPath:
+    """
+    Daily forecast curve after the last bar (row k is k+1 calendar days ahead),
+    plus the in-sample MAE. Any horizon up to `horizon` is a slice, not a refit.
+    """
+    dates: pd.DatetimeIndex
+    yhat: np.ndarray
+    lower: Optional[np.ndarray]
+    upper: Optional[np.ndarray]
+    mae: float
+
+    @property
+    def horizon(self) -> int:
+        return len(self.dates)
+
+    def price_at(self, days: int) -> float:
+        return float(self.yhat[days - 1])
+
+    def date_at(self, days: int) -> pd.Timestamp:
+        return self.dates[days - 1]
+
+    def points(self, days: int) -> List[dict]:
+        return [
+            {
+                "forecast_date": self.dates[k].date(),
+                "price": float(self.yhat[k]),
+                "lower": float(self.lower[k]) if self.lower is not None else None,
+                "upper": float(self.upper[k]) if self.upper is not None else None,
+            }
+            for k in range(min(days, self.horizon))
+        ]
+
+
+@dataclass
+class FastForecast:
+    paths: np.ndarray       # (n_symbols, horizon) price 1..horizon days ahead
+    dates: pd.DatetimeIndex # (horizon,) calendar dates of the path
+    fitted: np.ndarray      # (n_symbols, window) in-sample fit (NaN where a series had no data)
+    actual: np.ndarray      # (n_symbols, window) closes the fit was scored against
+
+    @property
+    def predicted(self) -> np.ndarray:
+        return self.paths[:, -1]
+
+    @property
+    def forecast_date(self) -> pd.Timestamp:
+        return self.dates[-1]
+
+    @property
+    def mae(self) -> np.ndarray:
+        return np.nanmean(np.abs(self.actual - self.fitted), axis=1)
+
+    def path(self, i: int) -> ForecastPath:
+        return ForecastPath(dates=self.dates, yhat=self.paths[i], lower=None, upper=None, mae=float(self.mae[i]))
+
+
+def align_histories(frames: Dict[str, pd.DataFrame],
+                    limit: Optional[int] = None) -> Tuple[List[str], pd.DatetimeIndex, np.ndarray]:
+    """
+    Puts several ('ds', 'y') histories on one shared date index.
+    Returns (symbols, dates, closes) with closes shaped (n_symbols, n_dates);
+    gaps of up to `limit` dates are forward-filled, dates before a symbol's first bar stay NaN.
+    A symbol with no close in the last `limit` dates (delisted, halted) is dropped.
+    """
+    wide = pd.concat(
+        {sym: df.drop_duplicates('ds', keep='last').set_index('ds')['y'] for sym, df in frames.items()},
+        axis=1
+    ).sort_index().ffill(limit=limit)
+    symbols = [sym for sym in frames if pd.notna(wide[sym].iloc[-1])]
+    stale = [sym for sym in frames if sym not in symbols]
+    if stale:
+        logger.warning(f"⚠️ [ALIGN] Dropped stale histories: {', '.join(stale)}")
+    return symbols, pd.DatetimeIndex(wide.index), wide[symbols].to_numpy(dtype=float).T
+
+
+# ✅ FORECASTER REGISTRY: StockRequest.engine name -> forecaster class
+FORECASTERS: Dict[str, Type["Forecaster"]] = {}
+
+
+def register_forecaster(name: str):
+    """Class decorator: makes a Forecaster selectable as StockRequest.engine == name."""
+    def decorator(cls):
+        FORECASTERS[name] = cls
+        return cls
+    return decorator
+
+
+class Forecaster(ABC):
+    """A model behind StockRequest.engine: one symbol's history in, a ForecastPath out."""
+    label = "a forecasting model"  # Shown in the prediction summary
+
+    @abstractmethod
+    def forecast_path(self, symbol: str, df: pd.DataFrame, days: int) -> ForecastPath:
+        """Forecast curve at least `days` long after the last bar of `df`."""
+
+
+@register_forecaster("fast")
+class FastForecaster(Forecaster):
+    """
+    Vectorized robust linear trend + day-of-week seasonality on log prices.
+
+    One design matrix is shared by every symbol, so a whole screen of symbols is
+    fitted at once: Huber-weighted least squares via batched normal equations (IRLS).
+    Typically ~1 ms per symbol versus seconds for a Prophet fit.
+    """
+
+    label = "a robust trend + weekly seasonality model"
+
+    def __init__(self, window: int = 252, huber_k: float = 1.345, iterations: int = 5, min_bars: int = 30):
+        self.window = window
+        self.min_bars = min_bars
+        self.huber_k = huber_k
+        self.iterations = iterations
+
+    @staticmethod
+    def _design(days: np.ndarray, weekdays: np.ndarray, scale: float) -> np.ndarray:
+        # Weekends carry Friday's effect (no trading, last close holds)
+        weekdays = np.minimum(weekdays, 4)
+        dummies = np.stack([(weekdays == d) for d in range(1, 5)], axis=1).astype(float)  # Monday = baseline
+        return np.column_stack([np.ones(len(days)), days / scale, dummies])
+
+    def fit_predict(self, closes: np.ndarray, dates: pd.DatetimeIndex, horizon: int) -> FastForecast:
+        """
+        closes: (n_symbols, T) array on the shared `dates` index. horizon: calendar days ahead.
+        """
+        closes = np.atleast_2d(np.asarray(closes, dtype=float))[:, -self.window:]
+        dates = pd.DatetimeIndex(dates[-closes.shape[1]:])
+
+        offsets = (dates - dates[0]).days.to_numpy(dtype=float)
+        scale = max(offsets[-1], 1.0)
+        X = self._design(offsets, dates.weekday.to_numpy(), scale)              # (T, p)
+
+        valid = np.isfinite(closes) & (closes > 0)
+        y = np.log(np.where(valid, closes, 1.0))                                # (n, T)
+        w = valid.astype(float)
+        ridge = 1e-8 * np.eye(X.shape[1])
+
+        for _ in range(self.iterations):
+            XtWX = np.einsum('tp,nt,tq->npq', X, w, X) + ridge
+            XtWy = np.einsum('tp,nt,nt->np', X, w, y)
+            beta = np.linalg.solve(XtWX, XtWy[..., None])[..., 0]              # (n, p)
+
+            resid = np.where(valid, y - beta @ X.T, np.nan)
+            mad = np.nanmedian(np.abs(resid), axis=1, keepdims=True)
+            scale_r = 1.4826 * np.nan_to_num(mad) + 1e-12
+            u = np.abs(np.nan_to_num(resid)) / (self.huber_k * scale_r)
+            w = np.where(u <= 1, 1.0, 1.0 / np.maximum(u, 1e-12)) * valid
+
+        steps = np.arange(1, horizon + 1)
+        future_dates = dates[-1] + pd.to_timedelta(steps, unit="D")
+        X_future = self._design(offsets[-1] + steps.astype(float), future_dates.weekday.to_numpy(), scale)
+
+        fitted = np.where(valid, np.exp(beta @ X.T), np.nan)
+        return FastForecast(
+            paths=np.exp(beta @ X_future.T),
+            dates=pd.DatetimeIndex(future_dates),
+            fitted=fitted,
+            actual=np.where(valid, closes, np.nan),
+        )
+
+    def forecast_path(self, symbol: str, df: pd.DataFrame, days: int) -> ForecastPath:
+        result = self.fit_predict(df['y'].to_numpy(dtype=float), pd.DatetimeIndex(df['ds']), days)
+        if np.isfinite(result.fitted).sum() < self.min_bars:
+            raise ValueError(f"Not enough history for a fast forecast of {symbol}")
+        return result.path(0)
+
+
+@register_forecaster("prophet")
+class ProphetForecaster(Forecaster):
+    """Prophet fitted in the forecast process pool; one fit per history serves every horizon."""
+    label = "Prophet models"
+
+    # ✅ FITTED MODEL CACHE (Memory LRU + Disk)
+    # Skips the Prophet fit when the training history hasn't changed
+    _MODEL_CACHE = ModelCache(settings.MODEL_CACHE_DIR, max_entries=settings.MODEL_CACHE_SIZE)
+    # Whole forecast curve per (symbol, data version): one fit serves every horizon
+    _PATH_CACHE = LRUCache(max_entries=settings.FORECAST_CACHE_SIZE, ttl=settings.FORECAST_CACHE_TTL)
+    _FLIGHTS = SingleFlight()
+
+    def forecast_path(self, symbol: str, df: pd.DataFrame, days: int) -> ForecastPath:
+        """
+        Fits once and forecasts out to FORECAST_MAX_HORIZON; every shorter horizon
+        on the same history is a slice of the cached path.
+        """
+        path_key = (symbol.upper(), ModelCache.fingerprint(df))
+        path = ProphetForecaster._PATH_CACHE.get(path_key)
+        if path is not None and path.horizon >= days:
+            return path
+
+        def compute() -> ForecastPath:
+            horizon = max(days, settings.FORECAST_MAX_HORIZON)
+            new_path = self._fit_path(symbol, df, horizon)
+            ProphetForecaster._PATH_CACHE.set(path_key, new_path)
+            return new_path
+
+        path = ProphetForecaster._FLIGHTS.do(("path",) + path_key, compute)
+        # A concurrent caller may have produced a shorter path
+        return path if path.horizon >= days else compute()
+
+    def _fit_path(self, symbol: str, df: pd.DataFrame, horizon: int) -> ForecastPath:
+        # Reuse the cached fit if the history is unchanged; fit in the process pool
+        try:
+            cached_model = ProphetForecaster._MODEL_CACHE.get_payload(symbol, df)
+            # No exact match: seed the refit with yesterday's fit (if history only grew a little)
+            warm_model = None
+            if cached_model is None and settings.WARM_START_MAX_NEW_BARS > 0:
+                warm_model = ProphetForecaster._MODEL_CACHE.latest_payload(symbol)
+            forecast, fitted_model = forecast_pool.run(
+                prophet_forecast, df, horizon, cached_model, warm_model
+            )
+            if fitted_model is not None:
+                ProphetForecaster._MODEL_CACHE.put_payload(symbol, df, fitted_model)
+        except Exception as e:
+            logger.error(f"❌ Prophet Model Failed: {e}")
+            raise e
+
+        mae = mean_absolute_error(df['y'], forecast.iloc[:len(df)]['yhat'])
+        future = forecast.iloc[len(df):]
+        return ForecastPath(
+            dates=pd.DatetimeIndex(future['ds']),
+            yhat=future['yhat'].to_numpy(),
+            lower=future['yhat_lower'].to_numpy(),
+            upper=future['yhat_upper'].to_numpy(),
+            mae=float(mae),
+        )
@@ -0,0 +1,90 @@
+import os
+import time
+import glob
+import logging
+import threading
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = pa.schema([
+    ("ds", pa.timestamp("ns")),
+    ("y", pa.float64()),
+    ("source", pa.string()),
+])
+
+
+class HistoryStore:
+    """
+    Persistent daily-bar store: one Parquet dataset (a directory of part files) per symbol.
+
+    A refresh appends only the new bars as a small part file; once a symbol has
+    more than `max_parts` parts they are compacted back into one.
+    """
+
+    def __init__(self, root: str, max_parts: int = 32):
+        self.root = root
+        self.max_parts = max_parts
+        self._lock = threading.Lock()
+
+    def _dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol.upper())
+
+    def _parts(self, symbol: str) -> list:
+        return sorted(glob.glob(os.path.join(self._dir(symbol), "part-*.parquet")))
+
+    def read(self, symbol: str) -> Optional[pd.DataFrame]:
+        """All stored bars for the symbol as a sorted ('ds', 'y', 'source') frame, or None."""
+        parts = self._parts(symbol)
+        if not parts:
+            return None
+        try:
+            df = pa.concat_tables([pq.read_table(p, schema=SCHEMA) for p in parts]).to_pandas()
+        except Exception as e:
+            logger.warning(f"⚠️ [HISTORY STORE] Unreadable dataset for {symbol}: {e}")
+            return None
+        # Later parts win if a bar was ever written twice
+        return df.drop_duplicates('ds', keep='last').sort_values('ds').reset_index(drop=True)
+
+    def append(self, symbol: str, bars: pd.DataFrame, source: str) -> None:
+        if bars.empty:
+            return
+        with self._lock:
+            self._write_part(symbol, bars, source)
+            if len(self._parts(symbol)) > self.max_parts:
+                self._compact(symbol)
+
+    def replace(self, symbol: str, bars: pd.DataFrame, source: str) -> None:
+        """Rewrites the symbol's dataset as a single part (e.g. after a wider refetch)."""
+        with self._lock:
+            old_parts = self._parts(symbol)
+            self._write_part(symbol, bars, source)
+            for p in old_parts:
+                os.remove(p)
+
+    def _compact(self, symbol: str) -> None:
+        df = self.read(symbol)
+        old_parts = self._parts(symbol)
+        self._write_part(symbol, df, None)
+        for p in old_parts:
+            os.remove(p)
+        logger.info(f"🧹 [HISTORY STORE] Compacted {len(old_parts)} parts for {symbol}")
+
+    def _write_part(self, symbol: str, bars: pd.DataFrame, source: Optional[str]) -> None:
+        os.makedirs(self._dir(symbol), exist_ok=True)
+        frame = pd.DataFrame({
+            'ds': pd.to_datetime(bars['ds']).astype('datetime64[ns]'),
+            'y': bars['y'].astype(float),
+            'source': bars['source'] if source is None else source,
+        })
+        table = pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+
+        # Dot-prefixed temp file: never picked up as a part, renamed into place atomically
+        name = f"part-{time.time_ns()}.parquet"
+        tmp_path = os.path.join(self._dir(symbol), f".{name}.tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(self._dir(symbol), name))
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Coroutine, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (HTTP/2 support for httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HttpClient:
+    """
+    One shared httpx.AsyncClient for every outbound scrape/feed request.
+
+    Keep-alive pooling, HTTP/2 where the server supports it, a global connection cap
+    plus a per-host cap, and default timeouts. The client lives on its own event loop
+    in a daemon thread, so it can be awaited from the API's event loop AND called from
+    worker threads (get_sync/run_sync) while still sharing a single connection pool.
+    """
+
+    def __init__(self, max_connections: int, max_per_host: int, timeout: float, connect_timeout: float,
+                 keepalive_expiry: float = 30.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.max_per_host = max_per_host
+        self._client_kwargs = dict(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            follow_redirects=True,
+            transport=transport,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever, name="http-client", daemon=True)
+                    self._thread.start()
+                    self._client = asyncio.run_coroutine_threadsafe(self._make_client(), loop).result()
+                    self._loop = loop
+                    logger.info(f"✅ [HTTP] Shared client started (HTTP/2: {HTTP2_AVAILABLE})")
+        return self._loop
+
+    async def _make_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(**self._client_kwargs)
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = httpx.URL(url).host
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        async with limit:
+            return await self._client.request(method, url, **kwargs)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Awaitable from any event loop; the request itself runs on the client's loop."""
+        loop = self._ensure_loop()
+        coro = self._request(method, url, **kwargs)
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    def run_sync(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Runs a coroutine on the client's loop from a plain (non-async) thread and waits for it.
+        This is the app's one sync-to-async bridge: the loop outlives the call, so a hedged
+        request that lost the race finishes in the background without holding the caller up.
+        """
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("run_sync() called from the HTTP client's own loop; await instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def get_sync(self, url: str, **kwargs) -> httpx.Response:
+        return self.run_sync(self.get(url, **kwargs))
+
+    def close(self) -> None:
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop = self._client = None
+            self._host_limits = {}
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"⚠️ [HTTP] Error closing shared client: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+
+http_client = HttpClient(
+    max_connections=settings.HTTP_MAX_CONNECTIONS,
+    max_per_host=settings.HTTP_MAX_PER_HOST,
+    timeout=settings.HTTP_TIMEOUT,
+    connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+)
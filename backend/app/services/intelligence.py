@@ -7,6 +7,8 @@ from textblob import TextBlob
 import urllib.parse
 from datetime import datetime
 
+from .http_client import http_client
+
 # Configure Logger
 logger = logging.getLogger(__name__)
 
@@ -41,7 +43,7 @@ class MarketIntelligence:
         else:
             logger.warning("⚠️ [INTEL] FRED API Key missing. Macro data will be empty.")
 
-    def get_company_rss(self, symbol: str):
+    async def get_company_rss(self, symbol: str):
         """
         Dynamically builds an RSS feed for the company using Google News.
         """
@@ -50,12 +52,15 @@ class MarketIntelligence:
         rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
 
         logger.info(f"📰 Fetching RSS News for {symbol}...")
-        return self.analyze_rss(rss_url, source_label="Google News (IR)")
+        return await self.analyze_rss(rss_url, source_label="Google News (IR)")
 
-    def analyze_rss(self, rss_url: str, source_label="RSS"):
+    async def analyze_rss(self, rss_url: str, source_label="RSS"):
         """Fetches and analyzes sentiment from the generated RSS feed"""
         try:
-            feed = feedparser.parse(rss_url)
+            # Fetch over the shared pooled client; feedparser only parses
+            resp = await http_client.get(rss_url)
+            resp.raise_for_status()
+            feed = feedparser.parse(resp.content)
             results = []
 
             # Limit to top 5
@@ -0,0 +1,123 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class ModelCache:
+    """
+    Two-tier cache of fitted Prophet models.
+
+    L1: bounded in-memory LRU of serialized models (JSON strings).
+    L2: one JSON file per symbol on disk, so fits survive a restart.
+
+    Entries are keyed by symbol + a fingerprint of the training frame, so a
+    history that gained a new bar never reuses a stale fit.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 64):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame) -> str:
+        """Stable content hash of the ('ds', 'y') training frame."""
+        hashed = pd.util.hash_pandas_object(df[['ds', 'y']], index=False).values
+        return hashlib.sha1(hashed.tobytes()).hexdigest()[:16]
+
+    def _key(self, symbol: str, fp: str) -> str:
+        return f"{symbol.upper()}_{fp}"
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get_payload(self, symbol: str, df: pd.DataFrame) -> Optional[str]:
+        """Returns the serialized model fitted on exactly this frame, if any."""
+        key = self._key(symbol, self.fingerprint(df))
+
+        # 1. MEMORY (L1)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+
+        if payload is not None:
+            logger.info(f"⚡ [MODEL CACHE] Reusing fitted model for {symbol}")
+            return payload
+
+        # 2. DISK (L2)
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                payload = fh.read()
+        except OSError as e:
+            logger.warning(f"⚠️ [MODEL CACHE] Failed to read {path}: {e}")
+            return None
+
+        self._remember(key, payload)
+        logger.info(f"💾 [MODEL CACHE] Loaded fitted model for {symbol} from disk")
+        return payload
+
+    def latest_payload(self, symbol: str) -> Optional[str]:
+        """
+        Returns the most recent fit for the symbol regardless of its training frame.
+        Used to warm-start a refit when the history has only grown by a few bars.
+        """
+        prefix = f"{symbol.upper()}_"
+        with self._lock:
+            for key in reversed(self._entries):
+                if key.startswith(prefix):
+                    return self._entries[key]
+
+        # Disk only holds the newest fit per symbol
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.startswith(prefix) and n.endswith(".json")]
+        except OSError:
+            return None
+        if not names:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, names[0]), "r", encoding="utf-8") as fh:
+                return fh.read()
+        except OSError:
+            return None
+
+    def put_payload(self, symbol: str, df: pd.DataFrame, payload: str) -> None:
+        key = self._key(symbol, self.fingerprint(df))
+        self._remember(key, payload)
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Only the newest fit per symbol is kept on disk
+            prefix = f"{symbol.upper()}_"
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(prefix) and name != f"{key}.json":
+                    os.remove(os.path.join(self.cache_dir, name))
+
+            tmp_path = self._disk_path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            logger.warning(f"⚠️ [MODEL CACHE] Failed to persist model for {symbol}: {e}")
+
+    def _remember(self, key: str, payload: str) -> None:
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
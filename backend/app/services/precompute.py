@@ -0,0 +1,113 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone, time as dt_time
+from typing import Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import PrecomputedForecast
+from app.schemas import StockRequest, PredictionResponse
+from .engine import PredictionEngine
+from .forecast_pool import forecast_pool
+from .sp500 import get_sp500_tickers
+
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_CLOSE = dt_time(16, 0)
+
+# INSERT ... ON CONFLICT DO UPDATE builders for the databases the app runs on
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def standard_horizons() -> List[int]:
+    return [int(h) for h in settings.PRECOMPUTE_HORIZONS.split(",") if h.strip()]
+
+
+def last_market_close(now: Optional[datetime] = None) -> datetime:
+    """Most recent weekday 16:00 New York close at or before `now`, as naive UTC."""
+    now = (now or datetime.now(timezone.utc)).astimezone(MARKET_TZ)
+    close = now.replace(hour=MARKET_CLOSE.hour, minute=0, second=0, microsecond=0)
+    if now < close:
+        close -= timedelta(days=1)
+    while close.weekday() > 4:
+        close -= timedelta(days=1)
+    return close.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def get_fresh_forecast(session: Session, symbol: str, days: int) -> Optional[PredictionResponse]:
+    """
+    Returns the precomputed forecast if it was computed after the latest market close
+    (and within PRECOMPUTE_MAX_AGE_HOURS), otherwise None.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    cutoff = max(last_market_close(), now - timedelta(hours=settings.PRECOMPUTE_MAX_AGE_HOURS))
+
+    row = session.exec(
+        select(PrecomputedForecast).where(
+            PrecomputedForecast.symbol == symbol.upper(),
+            PrecomputedForecast.days == days,
+            PrecomputedForecast.computed_at >= cutoff
+        )
+    ).first()
+    return PredictionResponse.model_validate_json(row.payload) if row else None
+
+
+def _upsert(session: Session, result: PredictionResponse, days: int, as_of, computed_at: datetime) -> None:
+    """
+    Inserts or overwrites the (symbol, days) row in ONE statement, so overlapping runs
+    (nightly job + manual /scheduler/precompute) can't insert duplicates.
+    """
+    insert = _UPSERT_INSERTS[session.get_bind().dialect.name]
+    stmt = insert(PrecomputedForecast).values(
+        symbol=result.symbol, days=days, payload=result.model_dump_json(), as_of=as_of, computed_at=computed_at
+    )
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=["symbol", "days"],
+        set_={col: stmt.excluded[col] for col in ("payload", "as_of", "computed_at")}
+    ))
+
+
+def run_precompute(session: Session, engine: PredictionEngine,
+                   symbols: Optional[Iterable[str]] = None, horizons: Optional[List[int]] = None) -> dict:
+    """
+    Fits and stores forecasts for every symbol x horizon.
+    Histories are fetched in bulk; fits run on the process pool (one job per worker at a time).
+    """
+    symbols = sorted({s.upper() for s in (symbols or get_sp500_tickers())})
+    horizons = horizons or standard_horizons()
+    logger.info(f"🌙 Precompute: {len(symbols)} symbols x horizons {horizons}")
+
+    histories = engine.provider.fetch_history_many(symbols, 730)
+    computed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def forecast_symbol(symbol: str):
+        history, source = histories[symbol]
+        return [
+            (days, engine.predict_from_history(StockRequest(symbol=symbol, days=days), history, source))
+            for days in horizons
+        ]
+
+    stored, failed = 0, 0
+    with ThreadPoolExecutor(max_workers=max(1, forecast_pool.max_workers)) as pool:
+        jobs = {pool.submit(forecast_symbol, sym): sym for sym in symbols if sym in histories}
+        failed += len(symbols) - len(jobs)
+
+        for job in as_completed(jobs):
+            symbol = jobs[job]
+            try:
+                as_of = histories[symbol][0].last_date.date()
+                for days, result in job.result():
+                    _upsert(session, result, days, as_of, computed_at)
+                    stored += 1
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                failed += 1
+                logger.error(f"❌ Precompute failed for {symbol}: {e}")
+
+    logger.info(f"✅ Precompute Complete. Stored: {stored}, Failed symbols: {failed}")
+    return {"stored": stored, "failed": failed}
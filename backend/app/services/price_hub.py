@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSubscription:
+    """
+    One push client's view of the hub: the symbols it watches and the prices that
+    changed since it last looked. Only the latest price per symbol is kept, so a slow
+    client skips intermediate ticks instead of building a backlog.
+    Predictions finalized in the background are collected alongside (take_finalized()).
+    """
+
+    def __init__(self, symbols: Iterable[str], loop: asyncio.AbstractEventLoop):
+        self.symbols: Set[str] = {s.upper() for s in symbols}
+        self._loop = loop
+        self._changed: Dict[str, float] = {}
+        self._finalized: Dict[int, Tuple[float, date]] = {}
+        self._ready = asyncio.Event()
+
+    def _offer(self, symbol: str, price: float) -> None:
+        # Runs on the subscriber's event loop
+        self._changed[symbol] = price
+        self._ready.set()
+
+    def _offer_finalized(self, entries: Dict[int, Tuple[float, date]]) -> None:
+        self._finalized.update(entries)
+        self._ready.set()
+
+    async def next(self, timeout: Optional[float] = None) -> Dict[str, float]:
+        """Prices changed since the last call; {} if nothing changed within `timeout` seconds."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        changed, self._changed = self._changed, {}
+        self._ready.clear()
+        return changed
+
+    def take_finalized(self) -> Dict[int, Tuple[float, date]]:
+        """Predictions finalized since the last call: {id: (final price, finalized date)}."""
+        finalized, self._finalized = self._finalized, {}
+        return finalized
+
+
+class PriceHub:
+    """
+    Fans price changes out to push subscribers (the watchlist SSE stream).
+
+    publish() may be called from any thread (the price stream's loop, a polling worker).
+    Each distinct price is delivered once to every subscriber watching that symbol,
+    however many clients are connected.
+    """
+
+    def __init__(self):
+        self._subscriptions: Set[PriceSubscription] = set()
+        self._last: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, symbols: Iterable[str]) -> PriceSubscription:
+        subscription = PriceSubscription(symbols, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: PriceSubscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, symbol: str, price: float) -> None:
+        with self._lock:
+            if self._last.get(symbol) == price:
+                return
+            self._last[symbol] = price
+            self.published += 1
+            targets = [s for s in self._subscriptions if symbol in s.symbols]
+        for subscription in targets:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._offer, symbol, price)
+            except RuntimeError:
+                # Subscriber's loop is gone (client disconnected mid-publish)
+                self.unsubscribe(subscription)
+
+    def publish_finalized(self, finalized: Dict[int, Tuple[str, float, date]]) -> None:
+        """Delivers {prediction id: (symbol, final price, finalized date)} to subscribers of each symbol."""
+        by_symbol: Dict[str, Dict[int, Tuple[float, date]]] = defaultdict(dict)
+        for pid, (symbol, price, finalized_date) in finalized.items():
+            by_symbol[symbol][pid] = (price, finalized_date)
+        with self._lock:
+            targets = []
+            for subscription in self._subscriptions:
+                entries = {pid: entry for symbol in subscription.symbols & by_symbol.keys()
+                           for pid, entry in by_symbol[symbol].items()}
+                if entries:
+                    targets.append((subscription, entries))
+        for subscription, entries in targets:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._offer_finalized, entries)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"subscribers": len(self._subscriptions), "published": self.published}
+
+
+price_hub = PriceHub()
@@ -0,0 +1,239 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from websockets.asyncio.client import connect
+
+from app.core.config import settings
+from .resilience import backoff
+
+logger = logging.getLogger(__name__)
+
+
+class PriceStream:
+    """
+    Last-trade table fed by Alpaca's real-time trade stream.
+
+    Subscribes to every tracked symbol (the union of open watchlist entries) and keeps
+    symbol -> (price, received_at) in memory, so reading a live price is a dict lookup.
+    The websocket runs on its own event loop in a daemon thread and reconnects with
+    jittered backoff, re-subscribing on every new connection. While it is disconnected,
+    prices are only trusted for `stale_after` seconds; while connected, a last trade older
+    than `max_age` (thinly traded or halted symbol) is not served either. Either way,
+    callers fall back to polling.
+    Listeners are called with (symbol, price) whenever a symbol's price changes.
+    """
+
+    def __init__(self, url: str, stale_after: float, max_age: Optional[float] = None,
+                 handshake_timeout: float = 10.0):
+        self.url = url
+        self.stale_after = stale_after
+        self.max_age = max_age
+        self.handshake_timeout = handshake_timeout
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        self._symbols: Set[str] = set()
+        self._subscribed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ws = None
+        self._listeners: List[Callable[[str, float], None]] = []
+        self.connected = False
+        self.trades = self.reconnects = 0
+
+    @staticmethod
+    def _to_feed(symbol: str) -> str:
+        # The feed uses "BRK.B"; the rest of the app uses "BRK-B"
+        return symbol.replace('-', '.')
+
+    @staticmethod
+    def _from_feed(symbol: str) -> str:
+        return symbol.replace('.', '-')
+
+    # --- Reads (any thread) ---
+
+    def get(self, symbol: str) -> Optional[float]:
+        with self._lock:
+            entry = self._prices.get(symbol)
+        if entry is None:
+            return None
+        price, received_at = entry
+        return price if self._fresh(received_at) else None
+
+    def _fresh(self, received_at: float) -> bool:
+        age = time.time() - received_at
+        if self.connected:
+            return self.max_age is None or age < self.max_age
+        return age < self.stale_after
+
+    def prices(self, symbols: Iterable[str]) -> Dict[str, float]:
+        found = {}
+        for symbol in symbols:
+            price = self.get(symbol)
+            if price is not None:
+                found[symbol] = price
+        return found
+
+    def seed(self, prices: Dict[str, float]) -> None:
+        """Polled prices for tracked symbols with no trade since we subscribed, or none recent enough to serve."""
+        for symbol, price in prices.items():
+            self._set(symbol, price, only_if_stale=True)
+
+    def _set(self, symbol: str, price: float, only_if_stale: bool = False) -> None:
+        with self._lock:
+            previous = self._prices.get(symbol)
+            if only_if_stale and ((previous is not None and self._fresh(previous[1])) or symbol not in self._symbols):
+                return
+            self._prices[symbol] = (price, time.time())
+            listeners = list(self._listeners) if previous is None or previous[0] != price else []
+        for listener in listeners:
+            try:
+                listener(symbol, price)
+            except Exception as e:
+                logger.warning(f"⚠️ [STREAM] Price listener failed for {symbol}: {e}")
+
+    def add_listener(self, listener: Callable[[str, float], None]) -> None:
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, float], None]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            tracked, priced = len(self._symbols), len(self._prices)
+        return {"connected": self.connected, "tracked": tracked, "priced": priced,
+                "trades": self.trades, "reconnects": self.reconnects}
+
+    # --- Subscriptions ---
+
+    def track(self, symbols: Iterable[str]) -> None:
+        with self._lock:
+            new = {s.strip().upper() for s in symbols if s and s.strip()} - self._symbols
+            self._symbols |= new
+        if new:
+            self._resync()
+
+    def untrack(self, symbols: Iterable[str]) -> None:
+        with self._lock:
+            gone = {s.strip().upper() for s in symbols} & self._symbols
+            self._symbols -= gone
+            for symbol in gone:
+                self._prices.pop(symbol, None)
+        if gone:
+            self._resync()
+
+    def _resync(self) -> None:
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._sync_subscriptions(), self._loop)
+
+    async def _sync_subscriptions(self) -> None:
+        ws = self._ws
+        if ws is None:
+            return  # Applied on the next connect
+        with self._lock:
+            wanted = set(self._symbols)
+        add, drop = wanted - self._subscribed, self._subscribed - wanted
+        try:
+            if add:
+                await ws.send(json.dumps({"action": "subscribe", "trades": sorted(map(self._to_feed, add))}))
+            if drop:
+                await ws.send(json.dumps({"action": "unsubscribe", "trades": sorted(map(self._to_feed, drop))}))
+        except Exception as e:
+            logger.warning(f"⚠️ [STREAM] Subscription update failed ({e}). Retrying on reconnect.")
+            return
+        self._subscribed = wanted
+
+    # --- Lifecycle ---
+
+    def start(self, key: str, secret: str, symbols: Iterable[str] = ()) -> None:
+        if self._thread is not None:
+            return
+        self.track(symbols)
+        loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=loop.run_forever, name="price-stream", daemon=True)
+        self._thread.start()
+        self._task = asyncio.run_coroutine_threadsafe(self._spawn(key, secret), loop).result()
+        self._loop = loop
+
+    async def _spawn(self, key: str, secret: str) -> asyncio.Task:
+        return asyncio.get_running_loop().create_task(self._run(key, secret))
+
+    def shutdown(self) -> None:
+        loop, task = self._loop, self._task
+        if loop is None:
+            return
+        self._loop = self._task = None
+
+        async def stop():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(stop(), loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"⚠️ [STREAM] Error stopping price stream: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    async def _run(self, key: str, secret: str) -> None:
+        attempt = 0
+        while True:
+            try:
+                async with connect(self.url, open_timeout=self.handshake_timeout) as ws:
+                    await self._handshake(ws, key, secret)
+                    self._ws, self._subscribed = ws, set()
+                    self.connected = True
+                    attempt = 0
+                    logger.info(f"✅ [STREAM] Connected to price feed ({len(self._symbols)} symbols)")
+                    await self._sync_subscriptions()
+                    async for raw in ws:
+                        self._handle(raw)
+                logger.warning("⚠️ [STREAM] Price feed closed the connection")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ [STREAM] Price feed dropped: {e}")
+            finally:
+                self._ws = None
+                self.connected = False
+
+            attempt = min(attempt + 1, 16)
+            self.reconnects += 1
+            await backoff(attempt, base=settings.PRICE_STREAM_RECONNECT_DELAY, cap=settings.PRICE_STREAM_RECONNECT_MAX)
+
+    async def _handshake(self, ws, key: str, secret: str) -> None:
+        await self._expect(ws, "connected")
+        await ws.send(json.dumps({"action": "auth", "key": key, "secret": secret}))
+        await self._expect(ws, "authenticated")
+
+    async def _expect(self, ws, status: str) -> None:
+        for message in json.loads(await asyncio.wait_for(ws.recv(), self.handshake_timeout)):
+            if message.get("T") == "error":
+                raise ConnectionError(f"Price feed error {message.get('code')}: {message.get('msg')}")
+            if message.get("T") == "success" and message.get("msg") == status:
+                return
+        raise ConnectionError(f"Price feed did not confirm '{status}'")
+
+    def _handle(self, raw) -> None:
+        for message in json.loads(raw):
+            kind = message.get("T")
+            if kind == "t":
+                price = float(message.get("p") or 0)
+                if price > 0:
+                    self.trades += 1
+                    self._set(self._from_feed(message["S"]), price)
+            elif kind == "error":
+                logger.warning(f"⚠️ [STREAM] Feed error {message.get('code')}: {message.get('msg')}")
+
+
+price_stream = PriceStream(settings.PRICE_STREAM_URL, stale_after=settings.PRICE_STREAM_STALE_AFTER,
+                           max_age=settings.PRICE_STREAM_MAX_AGE)
@@ -1,19 +1,48 @@
+import asyncio
+import numpy as np
 import pandas as pd
 import yfinance as yf
 import logging
-import time
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from alpaca.data.enums import Adjustment
 
+from app.core.config import settings
+from .history_store import HistoryStore
+from .cache import LRUCache, cache_refresher
+from .tiered_cache import TieredCache, MsgpackCodec
+from .compact_history import CompactHistory
+from .resilience import alpaca_breaker, yahoo_breaker, backoff, history_hedger
+from .http_client import http_client
+
 logger = logging.getLogger(__name__)
 
+# Daily bars are keyed by their New York trading date (Alpaca stamps them 04:00/05:00 UTC)
+MARKET_TZ = "America/New_York"
+
 
 class DataProvider:
     # Cache Configuration
-    _HISTORY_CACHE = {}
-    _CACHE_TTL = 3600  # 1 Hour
+    _CACHE_TTL = 3600  # 1 Hour: soft TTL, older entries are served stale and refreshed in the background
+    # symbol -> (widest history fetched as a CompactHistory, source, days covered)
+    # L1 per process, L2 in Redis (shared by every worker)
+    _HISTORY_CACHE = TieredCache(
+        LRUCache(
+            max_entries=settings.HISTORY_CACHE_SIZE, ttl=settings.HISTORY_HARD_TTL,
+            max_bytes=settings.HISTORY_CACHE_MAX_MB * 1024 * 1024
+        ),
+        namespace="history",
+        codec=MsgpackCodec(
+            dump=lambda entry: [entry[0].dump(), entry[1], entry[2]],
+            load=lambda row: (CompactHistory.load(row[0]), row[1], row[2])
+        )
+    )
+
+    # Persistent bar store: a refresh only downloads bars after the last stored date
+    _STORE = HistoryStore(settings.HISTORY_STORE_DIR)
+    _COVERAGE_SLACK = timedelta(days=7)  # Weekends/holidays at the start of a window
 
     def __init__(self, alpaca_client=None):
         self.alpaca = alpaca_client
@@ -22,90 +51,368 @@ class DataProvider:
         else:
             logger.warning("⚠️ [PROVIDER] No Alpaca Client. Running in Fallback Mode (Yahoo Only).")
 
-    def fetch_history(self, symbol: str, days: int = 730):
+    def fetch_history(self, symbol: str, days: int = 730) -> Tuple[CompactHistory, str]:
+        """
+        The last `days` of daily closes as a read-only CompactHistory view (no copy on a
+        cache hit), plus the provider it came from. Use .to_frame() where pandas is needed.
+        """
         symbol = symbol.upper()
-        alpaca_symbol = symbol.replace('-', '.')
+
+        # 1. CACHE CHECK (stale entries are served while a background refresh runs)
+        cached = self._cached_window(symbol, days)
+        if cached:
+            logger.info(f"⚡ [HISTORY] Using Cached Data for {symbol} ({cached[1]})")
+            return cached
+
+        # Refresh at least the widest window we already serve, so narrower requests never shrink it
+        history, source = self._refresh_history(symbol, self._fetch_days(symbol, days))
+        return history.window(days), source
+
+    def _refresh_history(self, symbol: str, days: int) -> Tuple[CompactHistory, str]:
+        """Brings the symbol's `days` window up to date (store + provider) and caches it."""
+
+        # 2. LOCAL STORE: only download the bars we don't have yet
+        stored = self._usable_store(symbol, days)
+        try:
+            if stored is not None:
+                fresh, source = self._download(symbol, stored['ds'].iloc[-1].to_pydatetime())
+                if self._stale_store(symbol, stored, fresh, source):
+                    stored = None
+            if stored is None:
+                fresh, source = self._download(symbol, datetime.now() - timedelta(days=days))
+        except ValueError as e:
+            stored = self._read_store(symbol)
+            if stored is None:
+                logger.critical(f"❌ [FATAL] All data providers failed for {symbol}: {e}")
+                raise
+            logger.warning(f"⚠️ [HISTORY] No new bars for {symbol} ({e}). Serving stored history.")
+            fresh, source = stored.iloc[0:0], stored['source'].iloc[-1]
+
+        df, source = self._merge(symbol, stored, fresh, source, days)
+        history = CompactHistory.from_frame(df)
+        DataProvider._HISTORY_CACHE.set(symbol, (history, source, days))
+        return history, source
+
+    def fetch_history_many(self, symbols: List[str], days: int = 730) -> Dict[str, Tuple[CompactHistory, str]]:
+        """
+        Multi-symbol variant of fetch_history.
+        Cache hits are served directly. Misses are downloaded in multi-symbol requests of
+        HISTORY_BATCH_CHUNK symbols: Alpaca first, then one Yahoo list download for whatever
+        Alpaca didn't return. Stored symbols only ask for new bars; cold ones for the full window.
+        Anything still missing goes through the per-symbol path.
+        Symbols that fail every provider are left out of the result.
+        """
+        results: Dict[str, Tuple[CompactHistory, str]] = {}
+        missing = []
 
         # 1. CACHE CHECK
-        current_time = time.time()
-        cache_key = f"{symbol}_{days}"
-        cached_entry = DataProvider._HISTORY_CACHE.get(cache_key)
+        for symbol in dict.fromkeys(s.upper() for s in symbols):
+            cached = self._cached_window(symbol, days)
+            if cached:
+                results[symbol] = cached
+            else:
+                missing.append(symbol)
+
+        # 2. BULK DOWNLOADS (One request per chunk and start date, per provider)
+        if missing:
+            stores = {sym: self._usable_store(sym, days) for sym in missing}
+            restated = set()
+            bulk = [(self._alpaca_bars_many, "Alpaca (IEX)")] if self.alpaca else []
+            bulk.append((self._yahoo_bars_many, "Yahoo"))
+
+            for fetch_many, provider_source in bulk:
+                pending = [sym for sym in missing if sym not in results and sym not in restated]
+                for batch, start_dt in self._batches(pending, stores, days):
+                    for symbol, fresh in fetch_many(batch, start_dt).items():
+                        stored = stores[symbol]
+                        if stored is not None and self._stale_store(symbol, stored, fresh, provider_source):
+                            restated.add(symbol)  # Per-symbol path refetches the full window
+                            continue
+                        df, source = self._merge(symbol, stored, fresh, provider_source, days)
+                        history = CompactHistory.from_frame(df)
+                        DataProvider._HISTORY_CACHE.set(symbol, (history, source, days))
+                        results[symbol] = (history, source)
+
+        # 3. PER-SYMBOL FALLBACK
+        for symbol in missing:
+            if symbol in results:
+                continue
+            try:
+                results[symbol] = self.fetch_history(symbol, days=days)
+            except ValueError as e:
+                logger.error(f"   ❌ [HISTORY] Skipping {symbol}: {e}")
+
+        return results
+
+    @staticmethod
+    def _batches(symbols: List[str], stores: Dict[str, Optional[pd.DataFrame]],
+                 days: int) -> List[Tuple[List[str], datetime]]:
+        """Chunks of HISTORY_BATCH_CHUNK symbols, each with the start date its request needs."""
+        warm = [sym for sym in symbols if stores[sym] is not None]
+        cold = [sym for sym in symbols if stores[sym] is None]
+        size = max(1, settings.HISTORY_BATCH_CHUNK)
+
+        batches = []
+        for i in range(0, len(warm), size):
+            chunk = warm[i:i + size]
+            # One shared start: the oldest "last stored bar"; _merge drops what a symbol already has
+            since = min(stores[sym]['ds'].iloc[-1] for sym in chunk).to_pydatetime()
+            batches.append((chunk, since))
+        for i in range(0, len(cold), size):
+            batches.append((cold[i:i + size], datetime.now() - timedelta(days=days)))
+        return batches
+
+    def _cached_window(self, symbol: str, days: int) -> Optional[Tuple[CompactHistory, str]]:
+        """
+        The cache holds ONE entry per symbol: the widest window fetched so far.
+        Any narrower window is served from it; a wider one is a miss.
+        """
+        cached_entry = DataProvider._HISTORY_CACHE.get_with_age(symbol)
+        if not cached_entry:
+            return None
+        (data, source, covered_days), age = cached_entry
+        if days > covered_days:
+            return None
+        if age >= DataProvider._CACHE_TTL:
+            cache_refresher.submit(("history", symbol), lambda: self._refresh_history(symbol, covered_days))
+        return data.window(days), source
+
+    @staticmethod
+    def _fetch_days(symbol: str, days: int) -> int:
+        cached_entry = DataProvider._HISTORY_CACHE.get(symbol)
+        return max(days, cached_entry[2]) if cached_entry else days
+
+    def _alpaca_bars_many(self, symbols: List[str], start_dt: datetime) -> Dict[str, pd.DataFrame]:
+        alpaca_map = {sym.replace('-', '.'): sym for sym in symbols}
+        frames = {}
+        if not alpaca_breaker.allow():
+            logger.info(f"⏭️ [HISTORY] Alpaca circuit open. Skipping batch of {len(alpaca_map)} symbols")
+            return frames
+
+        logger.info(f"🔌 [HISTORY] Fetching Alpaca data for {len(alpaca_map)} symbols...")
+        try:
+            req = StockBarsRequest(
+                symbol_or_symbols=list(alpaca_map.keys()),
+                timeframe=TimeFrame.Day,
+                start=start_dt,
+                end=datetime.now(),
+                adjustment=Adjustment.RAW,
+                feed='iex'
+            )
+            bars = self.alpaca.get_stock_bars(req).df
+            alpaca_breaker.record_success()
+
+            if not bars.empty:
+                for alpaca_sym, group in bars.reset_index().groupby('symbol'):
+                    frames[alpaca_map.get(alpaca_sym, alpaca_sym)] = self._to_prophet_frame(group)
+                logger.info(f"   ✅ [HISTORY] Alpaca returned {len(frames)} symbols")
+        except Exception as e:
+            alpaca_breaker.record_failure()
+            logger.warning(f"   ⚠️ [HISTORY] Alpaca batch request failed: {e}")
+        return frames
+
+    def _yahoo_bars_many(self, symbols: List[str], start_dt: datetime) -> Dict[str, pd.DataFrame]:
+        frames = {}
+        if not yahoo_breaker.allow():
+            logger.info(f"⏭️ [HISTORY] Yahoo circuit open. Skipping batch of {len(symbols)} symbols")
+            return frames
+
+        logger.info(f"⚠️ [HISTORY] Fallback: Fetching Yahoo data for {len(symbols)} symbols...")
+        try:
+            data = yf.download(symbols, start=start_dt.strftime("%Y-%m-%d"), group_by='ticker',
+                               progress=False, threads=True)
+        except Exception as e:
+            yahoo_breaker.record_failure()
+            logger.warning(f"   ⚠️ [HISTORY] Yahoo batch request failed: {e}")
+            return frames
+
+        if data.empty:
+            yahoo_breaker.record_failure()
+            return frames
+        yahoo_breaker.record_success()
+        for symbol in symbols:
+            try:
+                closes = data[symbol]['Close'] if isinstance(data.columns, pd.MultiIndex) else data['Close']
+            except KeyError:
+                continue
+            closes = closes.dropna()
+            if not closes.empty:
+                frames[symbol] = pd.DataFrame({
+                    'ds': self._calendar_days(closes.index),
+                    'y': closes.values
+                })
+        logger.info(f"   ✅ [HISTORY] Yahoo returned {len(frames)} symbols")
+        return frames
 
-        if cached_entry:
-            data, source, timestamp = cached_entry
-            if current_time - timestamp < DataProvider._CACHE_TTL:
-                logger.info(f"⚡ [HISTORY] Using Cached Data for {symbol} ({source})")
-                return data.copy(), source
+    def _download(self, symbol: str, start_dt: datetime) -> Tuple[pd.DataFrame, str]:
+        return http_client.run_sync(self._download_async(symbol, start_dt))
 
-        # 2. ATTEMPT 1: ALPACA (With Retry Logic)
+    async def _download_async(self, symbol: str, start_dt: datetime) -> Tuple[pd.DataFrame, str]:
+        """
+        Bars from start_dt (inclusive) to now: Alpaca first, Yahoo as fallback.
+        A provider whose circuit is open is skipped without spending any time on it.
+        With HEDGE_ENABLED, a slow Alpaca call is raced against Yahoo instead of waited out.
+        """
+        # 1. ATTEMPT 1: ALPACA (With Retry Logic, hedged with Yahoo when enabled)
         if self.alpaca:
-            logger.info(f"🔌 [HISTORY] Fetching Alpaca data for {alpaca_symbol}...")
-
-            # ✅ RETRY LOGIC: Try 3 times before failing
-            max_retries = 3
-            for attempt in range(1, max_retries + 1):
-                try:
-                    end_dt = datetime.now()
-                    start_dt = end_dt - timedelta(days=days)
-
-                    req = StockBarsRequest(
-                        symbol_or_symbols=alpaca_symbol,
-                        timeframe=TimeFrame.Day,
-                        start=start_dt,
-                        end=end_dt,
-                        adjustment=Adjustment.RAW,
-                        feed='iex'
-                    )
-
-                    # This is the call that might fail
-                    bars = self.alpaca.get_stock_bars(req).df
-
-                    if not bars.empty:
-                        logger.info(f"   ✅ [HISTORY] Alpaca returned {len(bars)} rows")
-                        bars = bars.reset_index()
-                        df = pd.DataFrame({
-                            'ds': bars['timestamp'].dt.tz_localize(None),
-                            'y': bars['close']
-                        })
-
-                        # Save to Cache & Return
-                        DataProvider._HISTORY_CACHE[cache_key] = (df, "Alpaca (IEX)", current_time)
-                        return df, "Alpaca (IEX)"
-
-                    # If empty, break loop to try fallback logic (no error, just no data)
+            if settings.HEDGE_ENABLED and yahoo_breaker.state == "closed" and alpaca_breaker.allow():
+                bars, winner = await history_hedger.run(
+                    lambda: self._alpaca_bars(symbol, start_dt),
+                    lambda: self._yahoo_bars(symbol, start_dt)
+                )
+                if bars is None:
+                    raise ValueError(f"All data providers failed for {symbol}: no data returned")
+                return bars, "Alpaca (IEX)" if winner == "primary" else "Yahoo"
+            if alpaca_breaker.allow():
+                bars = await self._alpaca_bars(symbol, start_dt)
+                if bars is not None:
+                    return bars, "Alpaca (IEX)"
+            else:
+                logger.info(f"⏭️ [HISTORY] Alpaca circuit open. Going straight to Yahoo for {symbol}")
+
+        # 2. ATTEMPT 2: YAHOO (Fallback)
+        if not yahoo_breaker.allow():
+            raise ValueError(f"All data providers failed for {symbol}: every provider circuit is open")
+        return await self._yahoo_bars(symbol, start_dt), "Yahoo"
+
+    async def _alpaca_bars(self, symbol: str, start_dt: datetime) -> Optional[pd.DataFrame]:
+        """Alpaca bars as a ('ds', 'y') frame, or None if it had no data or kept failing."""
+        alpaca_symbol = symbol.replace('-', '.')
+        logger.info(f"🔌 [HISTORY] Fetching Alpaca data for {alpaca_symbol} since {start_dt:%Y-%m-%d}...")
+
+        # ✅ RETRY LOGIC: jittered backoff, and stop as soon as the circuit opens
+        max_retries = 3
+        for attempt in range(1, max_retries + 1):
+            try:
+                req = StockBarsRequest(
+                    symbol_or_symbols=alpaca_symbol,
+                    timeframe=TimeFrame.Day,
+                    start=start_dt,
+                    end=datetime.now(),
+                    adjustment=Adjustment.RAW,
+                    feed='iex'
+                )
+
+                # This is the call that might fail (the SDK is blocking, so keep it off the loop)
+                bars = (await asyncio.to_thread(self.alpaca.get_stock_bars, req)).df
+                alpaca_breaker.record_success()
+
+                if not bars.empty:
+                    logger.info(f"   ✅ [HISTORY] Alpaca returned {len(bars)} rows")
+                    return self._to_prophet_frame(bars.reset_index())
+
+                # If empty, try fallback logic (no error, just no data)
+                return None
+
+            except Exception as e:
+                logger.warning(f"   ⚠️ [HISTORY] Alpaca Attempt {attempt}/{max_retries} Failed: {e}")
+                if attempt < max_retries and alpaca_breaker.state == "closed":
+                    await backoff(attempt)
+                else:
                     break
 
-                except Exception as e:
-                    logger.warning(f"   ⚠️ [HISTORY] Alpaca Attempt {attempt}/{max_retries} Failed: {e}")
-                    if attempt < max_retries:
-                        time.sleep(1)  # Wait 1s before retrying
-                    else:
-                        logger.error(f"   ❌ [HISTORY] Alpaca Failed after {max_retries} attempts.")
+        # One failed request counts once against the breaker, however many attempts it took
+        alpaca_breaker.record_failure()
+        logger.error(f"   ❌ [HISTORY] Alpaca Failed after {attempt} attempts.")
+        return None
 
-        # 3. ATTEMPT 2: YAHOO (Fallback)
+    async def _yahoo_bars(self, symbol: str, start_dt: datetime) -> pd.DataFrame:
+        logger.info(f"⚠️ [HISTORY] Fallback: Fetching Yahoo data for {symbol}...")
         try:
-            logger.info(f"⚠️ [HISTORY] Fallback: Fetching Yahoo data for {symbol}...")
-            df = yf.download(symbol, period="2y", progress=False, threads=False)
+            df = await asyncio.to_thread(
+                yf.download, symbol, start=start_dt.strftime("%Y-%m-%d"), progress=False, threads=False
+            )
+        except Exception as e:
+            yahoo_breaker.record_failure()
+            raise ValueError(f"All data providers failed for {symbol}: {e}")
 
-            if df.empty:
-                raise ValueError("Yahoo returned empty data.")
+        # yfinance reports unknown symbols and throttling as an empty frame, not an exception
+        if df.empty:
+            yahoo_breaker.record_failure()
+            raise ValueError(f"All data providers failed for {symbol}: Yahoo returned empty data.")
+        yahoo_breaker.record_success()
 
-            df = df.reset_index()
-            if isinstance(df.columns, pd.MultiIndex):
-                try:
-                    df.columns = df.columns.get_level_values(0)
-                except:
-                    pass
+        df = df.reset_index()
+        if isinstance(df.columns, pd.MultiIndex):
+            try:
+                df.columns = df.columns.get_level_values(0)
+            except:
+                pass
 
-            clean_df = pd.DataFrame({
-                'ds': pd.to_datetime(df['Date']).dt.tz_localize(None),
-                'y': df['Close']
-            })
-            logger.info(f"   ✅ [HISTORY] Yahoo returned {len(clean_df)} rows")
+        clean_df = pd.DataFrame({
+            'ds': self._calendar_days(df['Date']),
+            'y': df['Close']
+        })
+        logger.info(f"   ✅ [HISTORY] Yahoo returned {len(clean_df)} rows")
+        return clean_df
 
-            DataProvider._HISTORY_CACHE[cache_key] = (clean_df, "Yahoo", current_time)
-            return clean_df, "Yahoo"
+    def _usable_store(self, symbol: str, days: int) -> Optional[pd.DataFrame]:
+        """Stored bars for the symbol, if they reach back far enough to cover `days`."""
+        stored = self._read_store(symbol)
+        if stored is None or stored.empty:
+            return None
+        window_start = datetime.now() - timedelta(days=days)
+        return stored if stored['ds'].iloc[0] <= window_start + DataProvider._COVERAGE_SLACK else None
 
-        except Exception as e:
-            logger.critical(f"❌ [FATAL] All data providers failed for {symbol}: {e}")
-            raise ValueError(f"All data providers failed for {symbol}: {e}")
\ No newline at end of file
+    @staticmethod
+    def _read_store(symbol: str) -> Optional[pd.DataFrame]:
+        """Stored bars keyed by trading date (older stores may hold intraday-stamped Alpaca bars)."""
+        stored = DataProvider._STORE.read(symbol)
+        if stored is None:
+            return None
+        stored = stored.assign(ds=DataProvider._calendar_days(stored['ds']))
+        return stored.drop_duplicates('ds', keep='last').reset_index(drop=True)
+
+    def _stale_store(self, symbol: str, stored: pd.DataFrame, fresh: pd.DataFrame, source: str) -> bool:
+        """True if the fresh bars can't simply extend the stored ones (the window must be refetched)."""
+        stored_source = stored['source'].iloc[-1]
+        if stored_source != source:
+            # Raw Alpaca and adjusted Yahoo closes don't belong in one series
+            logger.info(f"🔀 [HISTORY] {symbol} switched from {stored_source} to {source}. Refetching window.")
+            return True
+        if self._restated(stored, fresh):
+            # Splits/adjustments rewrote old closes -> the stored bars are no longer valid
+            logger.warning(f"⚠️ [HISTORY] Stored bars for {symbol} were restated. Refetching window.")
+            return True
+        return False
+
+    @staticmethod
+    def _restated(stored: pd.DataFrame, fresh: pd.DataFrame) -> bool:
+        """True if the provider's close for our last stored trading day no longer matches the stored one."""
+        overlap = fresh.loc[fresh['ds'] == stored['ds'].iloc[-1], 'y']
+        return not overlap.empty and not np.isclose(overlap.iloc[-1], stored['y'].iloc[-1], rtol=1e-6)
+
+    def _merge(self, symbol: str, stored: Optional[pd.DataFrame], fresh: pd.DataFrame,
+               source: str, days: int) -> Tuple[pd.DataFrame, str]:
+        """Persists the downloaded bars and returns the `days` window as a ('ds', 'y') frame."""
+        if stored is None:
+            DataProvider._STORE.replace(symbol, fresh, source)
+            full = fresh
+        else:
+            new = fresh[fresh['ds'] > stored['ds'].iloc[-1]]
+            if not new.empty:
+                DataProvider._STORE.append(symbol, new, source)
+                logger.info(f"   💾 [HISTORY] Appended {len(new)} new bars for {symbol}")
+            else:
+                source = stored['source'].iloc[-1]
+            full = pd.concat([stored[['ds', 'y']], new[['ds', 'y']]], ignore_index=True)
+
+        window_start = pd.Timestamp(datetime.now() - timedelta(days=days))
+        df = full.loc[full['ds'] >= window_start, ['ds', 'y']].reset_index(drop=True)
+        return df, source
+
+    @staticmethod
+    def _calendar_days(values) -> np.ndarray:
+        """Bar timestamps -> naive midnight of their New York trading date, whatever the provider."""
+        ds = pd.DatetimeIndex(pd.to_datetime(values))
+        if ds.tz is not None:
+            ds = ds.tz_convert(MARKET_TZ).tz_localize(None)
+        return ds.normalize().values
+
+    @staticmethod
+    def _to_prophet_frame(bars: pd.DataFrame) -> pd.DataFrame:
+        """Alpaca bars (reset index) -> Prophet ('ds', 'y') frame."""
+        return pd.DataFrame({
+            'ds': DataProvider._calendar_days(bars['timestamp']),
+            'y': bars['close'].values
+        })
@@ -0,0 +1,179 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    closed    -> calls go through; `failure_threshold` consecutive failures open it.
+    open      -> calls are skipped immediately for `cooldown` seconds.
+    half-open -> after the cool-down ONE probe call is let through; success closes, failure re-opens.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.time() - self._opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.time() - self._opened_at < self.cooldown or self._probing:
+                return False
+            self._probing = True
+            logger.info(f"🔌 [BREAKER] {self.name}: cool-down over, probing")
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"✅ [BREAKER] {self.name}: recovered, closing circuit")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning(f"🚫 [BREAKER] {self.name}: opening circuit for {self.cooldown:.0f}s "
+                               f"after {self._failures} failures")
+                self._opened_at = time.time()
+            self._probing = False
+
+
+alpaca_breaker = CircuitBreaker("Alpaca", settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_COOLDOWN)
+yahoo_breaker = CircuitBreaker("Yahoo", settings.BREAKER_FAILURE_THRESHOLD, settings.BREAKER_COOLDOWN)
+
+
+async def backoff(attempt: int, base: float = None, cap: float = None) -> None:
+    """Full-jitter exponential backoff: sleeps U(0, min(cap, base * 2^(attempt-1))) without blocking the loop."""
+    base = settings.RETRY_BASE_DELAY if base is None else base
+    cap = settings.RETRY_MAX_DELAY if cap is None else cap
+    await asyncio.sleep(random.uniform(0, min(cap, base * 2 ** (attempt - 1))))
+
+
+class Hedger:
+    """
+    Hedged requests: start the primary call, and if it hasn't answered within the
+    `percentile` of its recent latencies, start the secondary too. The first usable
+    answer wins and the other call is cancelled. A primary that fails before the hedge
+    delay falls straight through to the secondary, like a plain fallback chain.
+
+    "Usable" means it returned something other than None without raising.
+    Every primary that answers is a latency sample, including one the secondary beat;
+    a primary cancelled by the winner is sampled at its elapsed time (a lower bound),
+    so slow calls stay in the tail instead of dragging the delay down.
+    """
+
+    def __init__(self, name: str, percentile: float, default_delay: float, min_delay: float = 0.0,
+                 window: int = 200, min_samples: int = 20):
+        self.name = name
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.fired = self.won = 0
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def delay(self) -> float:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        rank = min(len(samples) - 1, int(round(self.percentile / 100 * (len(samples) - 1))))
+        return max(self.min_delay, samples[rank])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = len(self._latencies)
+        return {"fired": self.fired, "won": self.won, "delay": round(self.delay(), 3), "samples": samples}
+
+    async def run(self, primary: Callable[[], Awaitable[Any]],
+                  secondary: Callable[[], Awaitable[Any]]) -> Tuple[Optional[Any], Optional[str]]:
+        """Returns (result, "primary" | "secondary"); (None, None) if neither had an answer."""
+        started = time.monotonic()
+        primary_task = asyncio.ensure_future(primary())
+        primary_task.add_done_callback(lambda task: self._observe_primary(task, started))
+        done, _ = await asyncio.wait({primary_task}, timeout=self.delay())
+
+        if done:
+            error, result = self._outcome(primary_task)
+            if error is None and result is not None:
+                return result, "primary"
+            # Failed fast: no race to run, just fall back
+            result = await secondary()
+            return (result, "secondary") if result is not None else (None, None)
+
+        self.fired += 1
+        logger.info(f"🏇 [HEDGE] {self.name}: primary slower than {self.delay():.2f}s, firing secondary")
+        secondary_task = asyncio.ensure_future(secondary())
+        pending = {primary_task, secondary_task}
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error, result = self._outcome(task)
+                    if error is not None or result is None:
+                        last_error = error or last_error
+                        continue
+                    if task is secondary_task:
+                        self.won += 1
+                        return result, "secondary"
+                    return result, "primary"
+        finally:
+            for task in pending:
+                task.cancel()
+            # The loser's blocking SDK call may keep running in its thread; we just stop waiting for it
+            await asyncio.gather(*pending, return_exceptions=True)
+        if last_error is not None:
+            raise last_error
+        return None, None
+
+    def _observe_primary(self, task: "asyncio.Future", started: float) -> None:
+        # Runs when the primary settles, before whoever awaited it resumes
+        if task.cancelled() or (task.exception() is None and task.result() is not None):
+            self.observe(time.monotonic() - started)
+
+    @staticmethod
+    def _outcome(task: "asyncio.Future") -> Tuple[Optional[BaseException], Any]:
+        error = task.exception()
+        return error, (None if error is not None else task.result())
+
+
+history_hedger = Hedger("History", settings.HEDGE_PERCENTILE, settings.HEDGE_DEFAULT_DELAY,
+                        settings.HEDGE_MIN_DELAY, settings.HEDGE_WINDOW)
+price_hedger = Hedger("Prices", settings.HEDGE_PERCENTILE, settings.HEDGE_DEFAULT_DELAY,
+                      settings.HEDGE_MIN_DELAY, settings.HEDGE_WINDOW)
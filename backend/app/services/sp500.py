@@ -1,9 +1,10 @@
 import pandas as pd
-import requests
 import logging
 from io import StringIO
 from datetime import datetime, timedelta
 
+from .http_client import http_client
+
 logger = logging.getLogger(__name__)
 
 # Simple in-memory cache
@@ -29,7 +30,7 @@ def get_sp500_tickers():
             "User-Agent": "SentientAI (Educational Project; contact@example.com)"
         }
 
-        response = requests.get(url, headers=headers)
+        response = http_client.get_sync(url, headers=headers)
         response.raise_for_status()
 
         # 3. Parse HTML
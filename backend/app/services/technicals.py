@@ -0,0 +1,183 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.schemas import TechnicalSignals
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+SMA_SHORT = 50
+SMA_LONG = 200
+RSI_PERIOD = 14
+BB_PERIOD = 20
+BB_STD = 2.0
+BB_HIGH_VOL_WIDTH = 0.10  # Band width / middle band above this = "High Volatility"
+CROSS_LOOKBACK = 5        # A golden/death cross is reported for this many bars after it happens
+
+
+@dataclass
+class IndicatorState:
+    """
+    Everything needed to extend the indicators by new bars without revisiting old ones:
+    the last SMA_LONG closes, Wilder's RSI averages and where the 50/200 spread last flipped.
+    """
+    last_ds: pd.Timestamp
+    last_close: float
+    bars: int
+    tail: np.ndarray
+    avg_gain: float
+    avg_loss: float
+    spread_sign: float
+    bars_since_cross: Optional[int]
+    signals: TechnicalSignals
+
+
+def _wilder(values: np.ndarray, prior: float) -> float:
+    """Wilder smoothing (EMA with alpha=1/period), continued from `prior` when it is known."""
+    if values.size == 0:
+        return prior
+    if np.isfinite(prior):
+        series = pd.Series(np.r_[prior, values])
+        return float(series.ewm(alpha=1 / RSI_PERIOD, adjust=False).mean().iloc[-1])
+    series = pd.Series(values)
+    return float(series.ewm(alpha=1 / RSI_PERIOD, adjust=False, min_periods=RSI_PERIOD).mean().iloc[-1])
+
+
+def _advance(state: Optional[IndicatorState], ds: pd.Series, new_closes: np.ndarray) -> IndicatorState:
+    """
+    Rolls the indicators forward over `new_closes`. With state=None this is the full
+    computation over the whole history; otherwise only the new bars are touched.
+    """
+    tail = state.tail if state is not None else np.empty(0)
+    closes = np.concatenate([tail, new_closes])
+    n_new = len(new_closes)
+    series = pd.Series(closes)
+
+    # Moving averages for the new bars (the kept tail covers the longest window)
+    sma_short = series.rolling(SMA_SHORT).mean().to_numpy()[-n_new:]
+    sma_long = series.rolling(SMA_LONG).mean().to_numpy()[-n_new:]
+
+    # RSI
+    changes = np.diff(closes)[-n_new:] if len(tail) else np.diff(closes)
+    avg_gain = _wilder(np.clip(changes, 0, None), state.avg_gain if state else np.nan)
+    avg_loss = _wilder(np.clip(-changes, 0, None), state.avg_loss if state else np.nan)
+
+    # Golden/Death cross: last bar where the sign of (SMA50 - SMA200) flipped
+    signs = pd.Series(np.r_[state.spread_sign if state else 0.0, np.sign(sma_short - sma_long)])
+    signs = signs.replace(0, np.nan).ffill()
+    flips = np.flatnonzero(signs.diff().abs().to_numpy()[1:] > 0)
+    if flips.size:
+        bars_since_cross = n_new - 1 - int(flips[-1])
+    elif state is not None and state.bars_since_cross is not None:
+        bars_since_cross = state.bars_since_cross + n_new
+    else:
+        bars_since_cross = None
+    spread_sign = float(np.nan_to_num(signs.iloc[-1]))
+
+    signals = _signals(closes, sma_short[-1], sma_long[-1], avg_gain, avg_loss, spread_sign, bars_since_cross)
+    return IndicatorState(
+        last_ds=pd.Timestamp(ds.iloc[-1]),
+        last_close=float(closes[-1]),
+        bars=(state.bars if state else 0) + n_new,
+        tail=closes[-SMA_LONG:].copy(),
+        avg_gain=avg_gain,
+        avg_loss=avg_loss,
+        spread_sign=spread_sign,
+        bars_since_cross=bars_since_cross,
+        signals=signals,
+    )
+
+
+def _signals(closes: np.ndarray, sma_short: float, sma_long: float, avg_gain: float, avg_loss: float,
+             spread_sign: float, bars_since_cross: Optional[int]) -> TechnicalSignals:
+    price = closes[-1]
+
+    # 1. Trend
+    if bars_since_cross is not None and bars_since_cross < CROSS_LOOKBACK:
+        trend = "Golden Cross" if spread_sign > 0 else "Death Cross"
+    elif np.isfinite(sma_long) and price > sma_short > sma_long:
+        trend = "Strong Uptrend"
+    elif np.isfinite(sma_long) and price < sma_short < sma_long:
+        trend = "Strong Downtrend"
+    elif np.isfinite(sma_short) and price > sma_short:
+        trend = "Uptrend"
+    elif np.isfinite(sma_short) and price < sma_short:
+        trend = "Downtrend"
+    else:
+        trend = "Neutral"
+
+    # 2. RSI
+    if not (np.isfinite(avg_gain) and np.isfinite(avg_loss)) or avg_gain + avg_loss == 0:
+        rsi = 50.0
+    else:
+        rsi = 100.0 * avg_gain / (avg_gain + avg_loss)
+    rsi_signal = "Overbought" if rsi > 70 else "Oversold" if rsi < 30 else "Neutral"
+
+    # 3. Bollinger Bands
+    upper = lower = 0.0
+    bollinger_signal = "Normal"
+    if len(closes) >= BB_PERIOD:
+        window = closes[-BB_PERIOD:]
+        mid, std = window.mean(), window.std(ddof=0)  # Population std, per Bollinger's definition
+        upper, lower = mid + BB_STD * std, mid - BB_STD * std
+        if price > upper:
+            bollinger_signal = "Above Upper Band"
+        elif price < lower:
+            bollinger_signal = "Below Lower Band"
+        elif mid > 0 and (upper - lower) / mid > BB_HIGH_VOL_WIDTH:
+            bollinger_signal = "High Volatility"
+
+    return TechnicalSignals(
+        sma_50=round(float(np.nan_to_num(sma_short)), 4),
+        sma_200=round(float(np.nan_to_num(sma_long)), 4),
+        rsi=round(float(rsi), 2),
+        bollinger_upper=round(float(upper), 4),
+        bollinger_lower=round(float(lower), 4),
+        rsi_signal=rsi_signal,
+        trend_signal=trend,
+        bollinger_signal=bollinger_signal,
+    )
+
+
+class TechnicalIndicators:
+    """
+    SMA50/200, RSI(14), Bollinger(20, 2) and trend/cross signals over a ('ds', 'y') history.
+
+    State is cached per symbol: when the history only gained bars since the last call,
+    just those bars are folded in, so each bar is processed once rather than once per request.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 86400):
+        self._states = LRUCache(max_entries=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def compute(self, symbol: str, df: pd.DataFrame) -> TechnicalSignals:
+        symbol = symbol.upper()
+        with self._lock:
+            state = self._states.get(symbol)
+            state = self._update(symbol, state, df)
+            self._states.set(symbol, state)
+        return state.signals
+
+    def _update(self, symbol: str, state: Optional[IndicatorState], df: pd.DataFrame) -> IndicatorState:
+        ds, closes = df['ds'], df['y'].to_numpy(dtype=float)
+
+        if state is not None and state.bars >= SMA_LONG:
+            pos = int(ds.searchsorted(state.last_ds))
+            # Same history up to the cached bar (no revisions) -> extend by the new bars only
+            if pos < len(df) and ds.iloc[pos] == state.last_ds and closes[pos] == state.last_close:
+                new = closes[pos + 1:]
+                if new.size == 0:
+                    return state
+                logger.info(f"📈 [TECHNICALS] {symbol}: folding in {new.size} new bar(s)")
+                return _advance(state, ds, new)
+
+        return _advance(None, ds, closes)
+
+    def clear(self) -> None:
+        self._states.clear()
@@ -0,0 +1,181 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import msgpack
+import redis
+
+from app.core.config import settings
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+# --- Codecs (value <-> bytes for the shared tier) ---
+
+class MsgpackCodec:
+    """Plain values (numbers, strings, lists, dicts) via msgpack; optional hooks for richer types."""
+
+    def __init__(self, dump: Optional[Callable[[Any], Any]] = None, load: Optional[Callable[[Any], Any]] = None):
+        self.dump = dump or (lambda v: v)
+        self.load = load or (lambda v: v)
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(self.dump(value), use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return self.load(msgpack.unpackb(data, raw=False))
+
+
+# --- Shared L2 ---
+
+class RedisTier:
+    """
+    Thin wrapper around a Redis client that never raises: any error marks Redis as down
+    for `retry_after` seconds, during which every call is a silent miss/no-op.
+    """
+
+    def __init__(self, url: str, retry_after: float = 30.0, timeout: float = 0.25):
+        self.url = url
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self._client = None
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+        self.errors = 0
+
+    @property
+    def client(self):
+        if self._client is None and self.url:
+            with self._lock:
+                if self._client is None:
+                    self._client = redis.Redis.from_url(
+                        self.url, socket_timeout=self.timeout, socket_connect_timeout=self.timeout
+                    )
+        return self._client
+
+    def available(self) -> bool:
+        return bool(self.url) and time.time() >= self._down_until
+
+    def _failed(self, op: str, e: Exception) -> None:
+        self.errors += 1
+        self._down_until = time.time() + self.retry_after
+        logger.warning(f"⚠️ [REDIS] {op} failed ({e}). Using local cache only for {self.retry_after:.0f}s.")
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.available():
+            return None
+        try:
+            return self.client.get(key)
+        except Exception as e:
+            self._failed("GET", e)
+            return None
+
+    def set(self, key: str, data: bytes, ttl: float) -> None:
+        if not self.available():
+            return
+        try:
+            self.client.set(key, data, px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            self._failed("SET", e)
+
+    def delete(self, *keys: str) -> None:
+        if not self.available() or not keys:
+            return
+        try:
+            self.client.delete(*keys)
+        except Exception as e:
+            self._failed("DEL", e)
+
+    def delete_prefix(self, prefix: str) -> None:
+        if not self.available():
+            return
+        try:
+            keys = list(self.client.scan_iter(match=f"{prefix}*"))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            self._failed("SCAN", e)
+
+
+redis_tier = RedisTier(settings.REDIS_URL)
+
+
+class TieredCache:
+    """
+    L1: the process-local LRUCache. L2: Redis, shared by every worker and replica.
+
+    Reads go L1 -> L2 (an L2 hit is copied into L1 with its original age), writes go to
+    both. Same interface as LRUCache, so call sites don't change. If Redis is unreachable
+    this behaves exactly like the L1 on its own.
+    """
+
+    def __init__(self, l1: LRUCache, namespace: str, codec, tier: Optional[RedisTier] = None):
+        self.l1 = l1
+        self.namespace = namespace
+        self.codec = codec
+        self._tier = tier
+        self.l2_hits = self.l2_misses = 0
+
+    @property
+    def tier(self) -> RedisTier:
+        # Resolved late so tests (and a reconfigured app) can swap the module-level tier
+        return self._tier or redis_tier
+
+    @property
+    def ttl(self) -> float:
+        return self.l1.ttl
+
+    def _key(self, key: Hashable) -> str:
+        return f"sentient:{self.namespace}:{key}"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.get_with_age(key)
+        return entry[0] if entry is not None else None
+
+    def get_with_age(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        entry = self.l1.get_with_age(key)
+        if entry is not None:
+            return entry
+
+        data = self.tier.get(self._key(key))
+        if data is None:
+            self.l2_misses += 1
+            return None
+        try:
+            stored_at, payload = msgpack.unpackb(data, raw=False)
+            value = self.codec.decode(payload)
+        except Exception as e:
+            logger.warning(f"⚠️ [REDIS] Dropping undecodable {self.namespace} entry for {key}: {e}")
+            self.tier.delete(self._key(key))
+            return None
+
+        self.l2_hits += 1
+        self.l1.set(key, value, stored_at=stored_at)
+        # LRUCache applies the TTL against the original write time
+        return self.l1.get_with_age(key)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        stored_at = time.time()
+        self.l1.set(key, value, stored_at=stored_at)
+        try:
+            payload = self.codec.encode(value)
+        except Exception as e:
+            logger.warning(f"⚠️ [REDIS] Could not serialize {self.namespace} entry for {key}: {e}")
+            return
+        self.tier.set(self._key(key), msgpack.packb([stored_at, payload], use_bin_type=True), self.ttl)
+
+    def pop(self, key: Hashable) -> None:
+        self.l1.pop(key)
+        self.tier.delete(self._key(key))
+
+    def clear(self) -> None:
+        self.l1.clear()
+        self.tier.delete_prefix(self._key(""))
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.l1.stats(), "l2_hits": self.l2_hits, "l2_misses": self.l2_misses}
+
+    def __len__(self) -> int:
+        return len(self.l1)
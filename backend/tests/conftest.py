@@ -1,4 +1,8 @@
+import fnmatch
+import time
 import pytest
+import numpy as np
+import pandas as pd
 from fastapi.testclient import TestClient
 from sqlmodel import Session, SQLModel, create_engine
 from sqlalchemy.pool import StaticPool  # ✅ REQUIRED for in-memory tests
@@ -8,6 +12,82 @@ from app.main import app
 from app.models import Prediction
 from app.core.database import get_session
 from app.core.auth import get_current_user
+from app.services.history_store import HistoryStore
+from app.services.compact_history import CompactHistory
+from app.services.providers import DataProvider
+from app.services.forecasters import ProphetForecaster
+from app.services.model_cache import ModelCache
+from app.services import tiered_cache
+from app.services.resilience import alpaca_breaker, yahoo_breaker
+
+
+@pytest.fixture(autouse=True)
+def history_store(tmp_path, monkeypatch):
+    """Keeps every test's Parquet history store out of the working tree."""
+    store = HistoryStore(str(tmp_path / "history"))
+    monkeypatch.setattr(DataProvider, "_STORE", store)
+    return store
+
+
+@pytest.fixture(autouse=True)
+def model_cache(tmp_path, monkeypatch):
+    """Keeps fitted Prophet models written by tests out of the working tree."""
+    cache = ModelCache(str(tmp_path / "models"))
+    monkeypatch.setattr(ProphetForecaster, "_MODEL_CACHE", cache)
+    return cache
+
+
+class FakeRedis:
+    """In-process stand-in for the few Redis commands the shared cache tier uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and time.time() >= expires_at:
+            self.data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, px=None):
+        self.data[key] = (value, time.time() + px / 1000 if px else None)
+        return True
+
+    def delete(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    def scan_iter(self, match="*"):
+        return [k for k in list(self.data) if fnmatch.fnmatch(k, match)]
+
+
+@pytest.fixture(autouse=True)
+def redis_tier(monkeypatch):
+    """Every test gets its own empty in-process 'Redis' behind the shared cache tier."""
+    tier = tiered_cache.RedisTier("redis://fake")
+    tier._client = FakeRedis()
+    monkeypatch.setattr(tiered_cache, "redis_tier", tier)
+    return tier
+
+
+@pytest.fixture(autouse=True)
+def provider_breakers():
+    """Circuit breakers are process-wide; start every test with closed circuits."""
+    alpaca_breaker.reset()
+    yahoo_breaker.reset()
+    yield
+    alpaca_breaker.reset()
+    yahoo_breaker.reset()
+
+
+@pytest.fixture(autouse=True)
+def price_stream(monkeypatch):
+    """A fresh, unconnected last-trade table per test so streamed/seeded prices don't leak."""
+    from app import main
+    from app.services.price_stream import PriceStream
+    stream = PriceStream("ws://unused", stale_after=60)
+    monkeypatch.setattr(main, "price_stream", stream)
+    return stream
 
 
 @pytest.fixture(name="session")
@@ -45,4 +125,22 @@ def client_fixture(session: Session):
     client = TestClient(app)
     yield client
 
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def history_df():
+    """
+    Small synthetic price history in the ('ds', 'y') shape Prophet expects.
+    """
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({
+        "ds": pd.date_range("2024-01-01", periods=120, freq="D"),
+        "y": 100 + np.cumsum(rng.normal(0, 1, 120))
+    })
+
+
+@pytest.fixture
+def history(history_df):
+    """history_df as the CompactHistory that DataProvider.fetch_history returns."""
+    return CompactHistory.from_frame(history_df)
@@ -66,4 +66,104 @@ def test_market_movers(client: TestClient):
 
         # Verify structure
         assert len(data["gainers"]) > 0
-        assert data["gainers"][0]["symbol"] == "AMD"
\ No newline at end of file
+        assert data["gainers"][0]["symbol"] == "AMD"
+
+def test_predict_batch_streams_per_symbol_results(client: TestClient):
+    import json
+    import pandas as pd
+    from app.services.compact_history import CompactHistory
+
+    history = CompactHistory.from_frame(
+        pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=3), "y": [1.0, 2.0, 3.0]})
+    )
+
+    def fake_predict(self, request, df, source):
+        if request.symbol == "BAD":
+            raise ValueError("Prophet exploded")
+        return create_mock_prediction().model_copy(update={"symbol": request.symbol})
+
+    with patch("app.services.providers.DataProvider.fetch_history_many",
+               return_value={"AAPL": (history, "Test"), "BAD": (history, "Test")}), \
+            patch("app.services.engine.PredictionEngine.predict_from_history", fake_predict):
+        response = client.post("/predict/batch", json={"symbols": ["aapl", "BAD", "NODATA", "AAPL"], "days": 7})
+
+    assert response.status_code == 200
+    items = {i["symbol"]: i for i in map(json.loads, response.text.strip().splitlines())}
+
+    # Duplicates collapse, failures are reported per symbol without failing the batch
+    assert set(items) == {"AAPL", "BAD", "NODATA"}
+    assert items["AAPL"]["result"]["predicted_price"] == 155.0
+    assert items["BAD"]["error"] == "Prophet exploded"
+    assert "NODATA" in items["NODATA"]["error"]
+
+
+def test_predict_batch_rejects_empty(client: TestClient):
+    response = client.post("/predict/batch", json={"symbols": []})
+    assert response.status_code == 400
+
+
+def test_live_prices_are_fetched_in_provider_sized_chunks(monkeypatch):
+    from app import main
+
+    def snapshots(req):
+        return {sym: MagicMock(latest_trade=MagicMock(price=1.0)) for sym in req.symbol_or_symbols}
+
+    alpaca = MagicMock()
+    alpaca.get_stock_snapshot.side_effect = snapshots
+    monkeypatch.setattr(main, "alpaca_data", alpaca)
+    monkeypatch.setattr(main.PRICE_LOADER, "chunk_size", 100)
+    main.PRICE_CACHE.clear()
+
+    symbols = [f"S{i}" for i in range(250)]
+    prices = main.get_live_prices(symbols)
+
+    assert len(prices) == 250
+    sizes = sorted(len(c.args[0].symbol_or_symbols) for c in alpaca.get_stock_snapshot.call_args_list)
+    assert sizes == [50, 100, 100]
+
+
+def test_concurrent_watchlist_reads_share_one_price_batch(session, monkeypatch):
+    import asyncio
+    import httpx
+    from fastapi import Request
+    from app import main
+    from app.main import app
+    from app.models import Prediction
+    from app.core.database import get_session
+    from app.core.auth import get_current_user
+
+    future = date.today().replace(year=date.today().year + 1)
+    for user, symbol in (("user-a", "AAPL"), ("user-b", "MSFT")):
+        session.add(Prediction(user_id=user, symbol=symbol, initial_price=100.0, target_price=200.0,
+                               end_date=future, confidence_score=0.0))
+    session.commit()
+
+    alpaca = MagicMock()
+    alpaca.get_stock_snapshot.side_effect = lambda req: {
+        sym: MagicMock(latest_trade=MagicMock(price=150.0)) for sym in req.symbol_or_symbols
+    }
+    monkeypatch.setattr(main, "alpaca_data", alpaca)
+    monkeypatch.setattr(main.PRICE_LOADER, "window", 0.2)
+    main.PRICE_CACHE.clear()
+    app.dependency_overrides[get_session] = lambda: session
+
+    def current_user(request: Request):
+        return request.headers["x-user"]
+    app.dependency_overrides[get_current_user] = current_user
+
+    async def read(user):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return (await client.get("/watchlist/performance", headers={"x-user": user})).json()
+
+    async def scenario():
+        first = asyncio.create_task(read("user-a"))
+        await asyncio.sleep(0.05)  # Second request arrives while the first batch is still open
+        return await asyncio.gather(first, read("user-b"))
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.clear()
+
+    assert first[0]["current_price"] == second[0]["current_price"] == 150.0
+    assert alpaca.get_stock_snapshot.call_count == 1
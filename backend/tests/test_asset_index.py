@@ -0,0 +1,90 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.services.asset_index import AssetIndex
+
+
+def _trading_client(*assets):
+    client = MagicMock()
+    client.get_all_assets.return_value = [SimpleNamespace(symbol=s, name=n) for s, n in assets]
+    return client
+
+
+def test_bulk_refresh_and_persist(tmp_path):
+    path = str(tmp_path / "assets.json")
+    client = _trading_client(("AAPL", "Apple Inc. Common Stock"), ("BRK.B", "Berkshire Hathaway Inc."))
+
+    index = AssetIndex(path, refresh_interval=3600)
+    assert index.refresh(client) == 2
+    client.get_all_assets.assert_called_once()
+
+    # Class shares resolve with the app's dash notation
+    assert index.name("brk-b") == "Berkshire Hathaway Inc."
+
+    # A fresh process reads the index from disk without touching Alpaca
+    reloaded = AssetIndex(path, refresh_interval=3600)
+    reloaded.load()
+    assert reloaded.name("AAPL") == "Apple Inc. Common Stock"
+    assert not reloaded.is_stale()
+
+
+def test_miss_returns_immediately_and_backfills(tmp_path):
+    index = AssetIndex(str(tmp_path / "assets.json"), refresh_interval=3600)
+
+    with patch("yfinance.Ticker") as ticker:
+        ticker.return_value.info = {"longName": "Bitcoin USD"}
+        assert index.name("BTC-USD") is None
+        index._lookups.shutdown(wait=True)
+
+    assert index.name("BTC-USD") == "Bitcoin USD"
+
+
+def test_resolved_names_are_saved_in_batches_not_per_lookup(tmp_path):
+    path = str(tmp_path / "assets.json")
+    index = AssetIndex(path, refresh_interval=3600)
+
+    with patch("yfinance.Ticker") as ticker, patch.object(index, "_save", wraps=index._save) as save:
+        ticker.return_value.info = {"longName": "Some Company"}
+        for symbol in ("AAA", "BBB", "CCC"):
+            index.name(symbol)
+        index._lookups.shutdown(wait=True)
+        save.assert_not_called()
+
+        index.shutdown()
+        assert save.call_count == 1
+
+    reloaded = AssetIndex(path, refresh_interval=3600)
+    reloaded.load()
+    assert len(reloaded) == 3
+
+
+def test_unknown_symbols_are_not_looked_up_again_until_the_miss_expires(tmp_path):
+    index = AssetIndex(str(tmp_path / "assets.json"), refresh_interval=3600, miss_ttl=60)
+
+    with patch("yfinance.Ticker") as ticker:
+        ticker.return_value.info = {}
+        for _ in range(3):
+            assert index.name("NOTREAL") is None
+            index._lookups.submit(lambda: None).result()  # Let the queued lookup finish
+        assert ticker.call_count == 1
+
+        with patch("app.services.cache.time.time", return_value=time.time() + 61):
+            index.name("NOTREAL")
+        index._lookups.shutdown(wait=True)
+        assert ticker.call_count == 2
+
+
+def test_background_refresh_on_start(tmp_path):
+    index = AssetIndex(str(tmp_path / "assets.json"), refresh_interval=3600)
+    client = _trading_client(("MSFT", "Microsoft Corporation Common Stock"))
+
+    index.start(client)
+    try:
+        deadline = time.time() + 5
+        while len(index) == 0 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        index.shutdown()
+
+    assert index.name("MSFT") == "Microsoft Corporation Common Stock"
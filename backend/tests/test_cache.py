@@ -0,0 +1,157 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from app.services.cache import BatchLoader, LRUCache, SingleFlight
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")          # "b" is now the oldest
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUCache(max_entries=2, ttl=10)
+    with patch("app.services.cache.time.time", return_value=1000.0):
+        cache.set("a", 1)
+    with patch("app.services.cache.time.time", return_value=1009.0):
+        assert cache.get("a") == 1
+    with patch("app.services.cache.time.time", return_value=1010.0):
+        assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_singleflight_shares_one_call():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "done"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flights.do, "k", work)
+        started.wait(timeout=5)
+        followers = [pool.submit(flights.do, "k", work) for _ in range(3)]
+        time.sleep(0.05)
+        release.set()
+
+        assert leader.result(timeout=5) == "done"
+        assert [f.result(timeout=5) for f in followers] == ["done"] * 3
+
+    assert len(calls) == 1
+    # Once finished, the key is free again
+    assert flights.do("k", lambda: "fresh") == "fresh"
+
+
+def test_singleflight_propagates_errors():
+    flights = SingleFlight()
+
+    def boom():
+        raise ValueError("upstream down")
+
+    with pytest.raises(ValueError):
+        flights.do("k", boom)
+    assert flights._calls == {}
+
+
+def test_byte_budget_evicts_large_frames():
+    import pandas as pd
+
+    frame = pd.DataFrame({"y": range(1000)}, dtype=float)  # ~8 KB
+    cache = LRUCache(max_entries=100, ttl=60, max_bytes=20_000)
+    for key in "abc":
+        cache.set(key, (frame, "source"))
+
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= 20_000
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_expired_entries_are_reclaimed_before_live_ones():
+    cache = LRUCache(max_entries=2, ttl=10)
+    with patch("app.services.cache.time.time", return_value=1000.0):
+        cache.set("old", 1)
+    with patch("app.services.cache.time.time", return_value=1005.0):
+        cache.set("live", 2)
+    with patch("app.services.cache.time.time", return_value=1012.0):
+        cache.set("new", 3)
+        assert cache.get("live") == 2
+
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["evictions"] == 0
+
+
+def test_batch_loader_coalesces_concurrent_overlapping_lookups():
+    calls = []
+
+    def fetch(keys):
+        calls.append(sorted(keys))
+        time.sleep(0.05)
+        return {k: k.lower() for k in keys if k != "GONE"}
+
+    loader = BatchLoader(fetch, window=0.05, chunk_size=100)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(loader.load_many, keys) for keys in
+                   (["AAPL", "MSFT"], ["MSFT", "NVDA"], ["AAPL", "GONE"])]
+        results = [f.result(timeout=5) for f in futures]
+
+    # Every symbol went upstream exactly once, in a single batch
+    assert calls == [["AAPL", "GONE", "MSFT", "NVDA"]]
+    assert results == [{"AAPL": "aapl", "MSFT": "msft"}, {"MSFT": "msft", "NVDA": "nvda"}, {"AAPL": "aapl"}]
+    assert loader.stats()["inflight"] == 0
+
+
+def test_batch_loader_fetches_chunks_in_parallel():
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+    chunks = []
+
+    def fetch(keys):
+        with lock:
+            chunks.append(len(keys))
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return {k: 1.0 for k in keys}
+
+    loader = BatchLoader(fetch, window=0.0, chunk_size=100, max_workers=4)
+    result = loader.load_many([f"S{i}" for i in range(250)])
+
+    assert len(result) == 250
+    assert sorted(chunks) == [50, 100, 100]
+    assert active["peak"] == 3
+
+
+def test_batch_loader_failed_chunk_is_retried_on_the_next_call():
+    fetch_calls = []
+
+    def fetch(keys):
+        fetch_calls.append(keys)
+        if len(fetch_calls) == 1:
+            raise ConnectionError("upstream down")
+        return {k: 1.0 for k in keys}
+
+    loader = BatchLoader(fetch, window=0.0, chunk_size=10)
+
+    assert loader.load_many(["AAPL"]) == {}
+    assert loader.load_many(["AAPL"]) == {"AAPL": 1.0}
+    assert len(fetch_calls) == 2
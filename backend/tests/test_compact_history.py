@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.cache import approx_size
+from app.services.compact_history import CompactHistory
+
+
+def test_round_trips_to_the_prophet_frame(history_df):
+    history = CompactHistory.from_frame(history_df)
+
+    assert history.days.dtype == np.int32
+    pd.testing.assert_frame_equal(history.to_frame(), history_df)
+    assert history.last_date == history_df["ds"].iloc[-1]
+    assert history.last_close == pytest.approx(history_df["y"].iloc[-1])
+    assert approx_size(history) < approx_size(history_df)
+
+
+def test_float32_closes_halve_the_footprint(history_df, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "HISTORY_CLOSE_DTYPE", "float32")
+
+    history = CompactHistory.from_frame(history_df)
+
+    assert history.closes.dtype == np.float32
+    assert history.nbytes == len(history_df) * 8
+    assert history.to_frame()["y"].dtype == np.float64
+
+
+def test_windows_are_read_only_views(history_df):
+    history = CompactHistory.from_frame(history_df)
+    now = datetime(2024, 4, 29)  # history runs 2024-01-01 .. 2024-04-29
+
+    week = history.window(7, now=now)
+
+    assert len(week) == 7
+    assert week.first_date == pd.Timestamp("2024-04-23")
+    assert np.shares_memory(week.closes, history.closes)
+    with pytest.raises(ValueError):
+        week.closes[0] = 0.0
+    # Mutating what to_frame() returns never touches the shared buffers
+    frame = week.to_frame()
+    frame.loc[0, "y"] = 0.0
+    assert week.closes[0] != 0.0
+
+
+def test_dump_load_and_fingerprint(history_df):
+    history = CompactHistory.from_frame(history_df)
+    restored = CompactHistory.load(history.dump())
+
+    assert restored.fingerprint() == history.fingerprint()
+    assert np.array_equal(restored.closes, history.closes)
+    assert history.window(30, now=datetime(2024, 4, 29)).fingerprint() != history.fingerprint()
+
+
+def test_from_frame_leaves_the_callers_frame_writable(history_df):
+    history = CompactHistory.from_frame(history_df)
+
+    closes = history_df["y"].to_numpy()
+    assert not np.shares_memory(history.closes, closes)
+    closes[0] = -1.0  # Used to raise "assignment destination is read-only"
+
+    assert history.closes[0] != -1.0
+    assert not history.closes.flags.writeable
@@ -1,7 +1,11 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+import numpy as np
 import pandas as pd
 from app.services.engine import PredictionEngine
+from app.services.forecasters import ProphetForecaster
+from app.services.compact_history import CompactHistory
 
 
 # --- FIXTURES ---
@@ -80,17 +84,17 @@ def test_market_movers_finviz_success(mock_finviz_html):
     """
     Test that the engine prefers Finviz data when available.
     """
+    PredictionEngine._MOVERS_CACHE.clear()
     engine = PredictionEngine()
 
-    with patch("requests.get") as mock_get:
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        mock_resp.content = mock_finviz_html.encode("utf-8")
-        mock_get.return_value = mock_resp
+    mock_resp = MagicMock()
+    mock_resp.status_code = 200
+    mock_resp.content = mock_finviz_html.encode("utf-8")
 
+    with patch("app.services.engine.http_client.get", new=AsyncMock(return_value=mock_resp)):
         with patch("yfinance.download") as mock_yf:
             # ACT
-            result = engine.get_market_movers()
+            result = asyncio.run(engine.get_market_movers())
 
             # ASSERT
             assert len(result.gainers) > 0
@@ -112,15 +116,16 @@ def test_market_movers_fallback_to_yf(mock_yf_data):
     """
     Test that the engine correctly switches to YFinance if Finviz fails.
     """
+    PredictionEngine._MOVERS_CACHE.clear()
     engine = PredictionEngine()
 
     # 1. Force Finviz to Fail
-    with patch("requests.get", side_effect=Exception("Connection Refused")):
+    with patch("app.services.engine.http_client.get", new=AsyncMock(side_effect=Exception("Connection Refused"))):
         # 2. Mock yfinance to return a DICT containing our DataFrame.
         # This allows yf.download(...)['Close'] to work naturally.
         with patch("yfinance.download", return_value={"Close": mock_yf_data}):
             # ACT
-            result = engine.get_market_movers()
+            result = asyncio.run(engine.get_market_movers())
 
             # ASSERT
             # Gainers: NVDA (+7.1%) and MSFT (+1.2%)
@@ -138,14 +143,204 @@ def test_market_movers_total_failure():
     """
     Test that the engine handles total failure gracefully (empty lists).
     """
-    PredictionEngine._MOVERS_CACHE = {}
+    PredictionEngine._MOVERS_CACHE.clear()
 
     engine = PredictionEngine()
 
-    with patch("requests.get", side_effect=Exception("Finviz Down")):
+    with patch("app.services.engine.http_client.get", new=AsyncMock(side_effect=Exception("Finviz Down"))):
         with patch("yfinance.download", side_effect=Exception("YF Down")):
-            result = engine.get_market_movers()
+            result = asyncio.run(engine.get_market_movers())
 
             assert result.gainers == []
             assert result.losers == []
-            assert result.active == []
\ No newline at end of file
+            assert result.active == []
+
+def test_predict_reuses_cached_model(tmp_path, history):
+    """
+    A second prediction on unchanged history must not refit Prophet.
+    """
+    from app.services.model_cache import ModelCache
+    from app.services.cache import LRUCache
+    from app.services.forecast_pool import forecast_pool
+    from app.schemas import StockRequest
+
+    engine = PredictionEngine()
+
+    with patch.object(ProphetForecaster, "_MODEL_CACHE", ModelCache(str(tmp_path))), \
+            patch.object(PredictionEngine, "_FORECAST_CACHE", LRUCache(max_entries=8, ttl=60)), \
+            patch.object(ProphetForecaster, "_PATH_CACHE", LRUCache(max_entries=8, ttl=60)), \
+            patch.object(engine.provider, "fetch_history", return_value=(history, "Test")), \
+            patch("yfinance.Ticker", side_effect=Exception("offline")), \
+            patch.object(forecast_pool, "run", wraps=forecast_pool.run) as mock_run:
+        first = engine.predict(StockRequest(symbol="AAPL", days=7))
+        PredictionEngine._FORECAST_CACHE.clear()
+        ProphetForecaster._PATH_CACHE.clear()
+        second = engine.predict(StockRequest(symbol="AAPL", days=7))
+
+    # 1st call fits from scratch, 2nd call hands the cached model to the worker
+    assert mock_run.call_args_list[0].args[3] is None
+    assert mock_run.call_args_list[1].args[3] is not None
+    assert first.predicted_price == pytest.approx(second.predicted_price)
+    assert first.forecast_date == second.forecast_date
+    assert first.company_name == "AAPL"
+
+
+def test_concurrent_predictions_are_coalesced_and_cached(history):
+    """
+    N identical concurrent requests -> one fetch + one forecast; a repeat is a cache hit.
+    """
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services.cache import LRUCache
+    from app.schemas import StockRequest, PredictionResponse
+
+    engine = PredictionEngine()
+    release = threading.Event()
+
+    def slow_fetch(symbol, days=730):
+        release.wait(timeout=5)
+        return history, "Test"
+
+    result = MagicMock(spec=PredictionResponse)
+
+    with patch.object(PredictionEngine, "_FORECAST_CACHE", LRUCache(max_entries=8, ttl=60)), \
+            patch.object(engine.provider, "fetch_history", side_effect=slow_fetch) as fetch, \
+            patch.object(engine, "_forecast", return_value=result) as forecast:
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(engine.predict, StockRequest(symbol="tsla", days=7)) for _ in range(5)]
+            # Hold the leader until the followers have had time to join its flight
+            time.sleep(0.2)
+            release.set()
+            results = [f.result(timeout=5) for f in futures]
+
+        again = engine.predict(StockRequest(symbol="TSLA", days=7))
+
+    assert all(r is result for r in results)
+    assert again is result
+    assert forecast.call_count == 1
+    assert fetch.call_count == 2  # Coalesced burst + the repeat (history itself is cached upstream)
+
+
+def test_fast_engine_mode_returns_prediction_shape(history_df, history):
+    from app.services.cache import LRUCache
+    from app.schemas import StockRequest
+
+    engine = PredictionEngine()
+
+    with patch.object(PredictionEngine, "_FORECAST_CACHE", LRUCache(max_entries=8, ttl=60)), \
+            patch.object(engine.provider, "fetch_history", return_value=(history, "Test")), \
+            patch("yfinance.Ticker", side_effect=Exception("offline")), \
+            patch("app.services.forecasters.forecast_pool.run") as prophet_run:
+        result = engine.predict(StockRequest(symbol="AAPL", days=7, engine="fast"))
+        tiny = CompactHistory.from_frame(history_df.tail(5))
+        many = engine.predict_fast_many(7, {"AAPL": (history, "Test"), "TINY": (tiny, "Test")})
+
+    prophet_run.assert_not_called()
+    assert 0 <= result.confidence_score <= 100
+    assert result.forecast_date == (history_df["ds"].iloc[-1] + pd.Timedelta(days=7)).date()
+    assert "robust trend" in result.explanation
+
+    # Same answer from the vectorized batch path; too-short histories are skipped
+    assert set(many) == {"AAPL"}
+    assert many["AAPL"].predicted_price == pytest.approx(result.predicted_price)
+
+
+def test_forecast_engine_is_picked_from_the_registry(history_df, history):
+    from app.services.cache import LRUCache
+    from app.services.forecasters import FORECASTERS, Forecaster, ForecastPath, register_forecaster
+    from app.schemas import StockRequest
+
+    class FlatForecaster(Forecaster):
+        label = "a flat line"
+
+        def forecast_path(self, symbol, df, days):
+            dates = pd.date_range(df["ds"].iloc[-1] + pd.Timedelta(days=1), periods=days)
+            return ForecastPath(dates=dates, yhat=np.full(days, 42.0), lower=None, upper=None, mae=0.0)
+
+    engine = PredictionEngine()
+    with patch.dict(FORECASTERS), \
+            patch.object(PredictionEngine, "_FORECAST_CACHE", LRUCache(max_entries=8, ttl=60)), \
+            patch.object(engine.provider, "fetch_history", return_value=(history, "Test")), \
+            patch("yfinance.Ticker", side_effect=Exception("offline")):
+        with pytest.raises(ValueError, match="Unknown forecast engine"):
+            StockRequest(symbol="AAPL", days=7, engine="flat")
+        register_forecaster("flat")(FlatForecaster)
+        result = engine.predict(StockRequest(symbol="AAPL", days=7, engine="flat"))
+
+    assert result.predicted_price == 42.0
+    assert "flat line" in result.explanation
+
+
+def test_one_fit_serves_every_horizon(tmp_path, history_df, history):
+    """
+    7- and 30-day requests on the same history are slices of a single Prophet fit.
+    """
+    from app.services.model_cache import ModelCache
+    from app.services.cache import LRUCache
+    from app.services.forecast_pool import forecast_pool
+    from app.schemas import StockRequest
+
+    engine = PredictionEngine()
+
+    with patch.object(ProphetForecaster, "_MODEL_CACHE", ModelCache(str(tmp_path))), \
+            patch.object(PredictionEngine, "_FORECAST_CACHE", LRUCache(max_entries=8, ttl=60)), \
+            patch.object(ProphetForecaster, "_PATH_CACHE", LRUCache(max_entries=8, ttl=60)), \
+            patch.object(engine.provider, "fetch_history", return_value=(history, "Test")), \
+            patch("yfinance.Ticker", side_effect=Exception("offline")), \
+            patch.object(forecast_pool, "run", wraps=forecast_pool.run) as mock_run:
+        week = engine.predict(StockRequest(symbol="AAPL", days=7))
+        month = engine.predict(StockRequest(symbol="AAPL", days=30))
+
+    assert mock_run.call_count == 1
+    last = history_df["ds"].iloc[-1]
+    assert week.forecast_date == (last + pd.Timedelta(days=7)).date()
+    assert month.forecast_date == (last + pd.Timedelta(days=30)).date()
+    assert len(week.forecast_path) == 7
+    assert len(month.forecast_path) == 30
+    # The shorter horizon is literally a prefix of the longer one
+    assert [p.price for p in month.forecast_path[:7]] == [p.price for p in week.forecast_path]
+    assert week.forecast_path[-1].price == pytest.approx(week.predicted_price)
+    assert month.forecast_path[0].lower is not None
+
+
+def test_stale_movers_are_served_while_refreshing_in_background():
+    import time
+    import threading
+    from app.schemas import MoverItem
+    from app.services.cache import cache_refresher
+
+    PredictionEngine._MOVERS_CACHE.clear()
+    stale = [MoverItem(symbol="OLD", price=1.0, change_pct=1.0, volume="1M")]
+    fresh = [MoverItem(symbol="NEW", price=2.0, change_pct=2.0, volume="2M")]
+    # Past the soft TTL, inside the hard TTL
+    PredictionEngine._MOVERS_CACHE.set("movers", stale)
+    PredictionEngine._MOVERS_CACHE.l1.set("movers", stale, stored_at=time.time() - PredictionEngine._CACHE_TTL - 1)
+
+    engine = PredictionEngine()
+    release = threading.Event()
+
+    async def slow_scrape():
+        await asyncio.to_thread(release.wait, 5)
+        return fresh
+
+    with patch.object(engine, "_fetch_market_data_unified", side_effect=slow_scrape) as scrape:
+        results = [asyncio.run(engine.get_market_movers()) for _ in range(3)]
+        release.set()
+        assert cache_refresher.wait_idle()
+
+        # Stale answers came back immediately; only one refresh ran
+        assert all(r.gainers[0].symbol == "OLD" for r in results)
+        assert scrape.call_count == 1
+        assert asyncio.run(engine.get_market_movers()).gainers[0].symbol == "NEW"
+
+
+def test_movers_past_hard_ttl_block_on_refresh():
+    from app.schemas import MoverItem
+
+    PredictionEngine._MOVERS_CACHE.clear()
+    engine = PredictionEngine()
+    fresh = [MoverItem(symbol="NEW", price=2.0, change_pct=2.0, volume="2M")]
+
+    with patch.object(engine, "_fetch_market_data_unified", new=AsyncMock(return_value=fresh)):
+        assert asyncio.run(engine.get_market_movers()).gainers[0].symbol == "NEW"
@@ -0,0 +1,162 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+from sqlmodel import Session, select
+
+from app.models import Prediction
+from app.services.compact_history import CompactHistory
+from app.services.finalization import (
+    FinalizationQueue, next_market_day, resolve_final_prices, apply_final_prices
+)
+
+
+def bars(closes):
+    """{'YYYY-MM-DD': close} -> CompactHistory."""
+    return CompactHistory.from_frame(pd.DataFrame({"ds": pd.to_datetime(list(closes)), "y": list(closes.values())}))
+
+
+def add(session, symbol, end_date, target=200.0, final_price=None):
+    p = Prediction(user_id="test-user-id", symbol=symbol, initial_price=100.0, target_price=target,
+                   end_date=end_date, confidence_score=0.0, final_price=final_price)
+    session.add(p)
+    session.commit()
+    session.refresh(p)
+    return p
+
+
+def test_next_market_day_skips_weekends():
+    assert next_market_day(date(2024, 3, 8)) == date(2024, 3, 8)   # Friday
+    assert next_market_day(date(2024, 3, 9)) == date(2024, 3, 11)  # Saturday -> Monday
+
+
+def test_matured_predictions_resolve_with_one_bulk_fetch(session):
+    today = date(2024, 3, 20)
+    aapl_a = add(session, "AAPL", date(2024, 3, 8))
+    aapl_b = add(session, "AAPL", date(2024, 3, 9))   # Weekend: settles on Monday
+    msft = add(session, "MSFT", date(2024, 3, 11))   # No bar on the day: next close counts
+    late = add(session, "NVDA", date(2024, 3, 11))   # Close not published yet
+    active = add(session, "AAPL", date(2024, 4, 30))
+    done = add(session, "AAPL", date(2024, 3, 1), final_price=150.0)
+
+    provider = MagicMock()
+    provider.fetch_history_many.return_value = {
+        "AAPL": (bars({"2024-03-07": 170.0, "2024-03-08": 171.0, "2024-03-11": 172.0}), "Alpaca (IEX)"),
+        "MSFT": (bars({"2024-03-08": 400.0, "2024-03-12": 405.0}), "Alpaca (IEX)"),
+        "NVDA": (bars({"2024-03-08": 875.0}), "Alpaca (IEX)"),
+    }
+
+    resolved = resolve_final_prices(provider, [aapl_a, aapl_b, msft, late, active, done], today=today)
+
+    provider.fetch_history_many.assert_called_once()
+    assert sorted(provider.fetch_history_many.call_args.args[0]) == ["AAPL", "MSFT", "NVDA"]
+    assert resolved == {
+        aapl_a.id: (171.0, date(2024, 3, 8)),
+        aapl_b.id: (172.0, date(2024, 3, 11)),
+        msft.id: (405.0, date(2024, 3, 11)),
+    }
+
+
+def test_apply_writes_every_row_in_one_update(session):
+    first, second = add(session, "AAPL", date(2024, 3, 8)), add(session, "MSFT", date(2024, 3, 8))
+
+    with patch.object(session, "commit", wraps=session.commit) as commit:
+        assert apply_final_prices(session, {first.id: (171.0, date(2024, 3, 8)), second.id: (405.0, date(2024, 3, 8))}) == 2
+    assert commit.call_count == 1
+
+    rows = {p.symbol: p for p in session.exec(select(Prediction)).all()}
+    assert (rows["AAPL"].final_price, rows["AAPL"].status) == (171.0, "VALIDATED")
+    assert rows["MSFT"].finalized_date == date(2024, 3, 8)
+
+
+def make_queue(session, provider, **kwargs):
+    engine = session.get_bind()
+    return FinalizationQueue(lambda: Session(engine), lambda: provider, **kwargs)
+
+
+def test_queue_settles_matured_ids_in_batches_and_backs_off_unsettled_ones(session):
+    ids = [add(session, sym, date(2024, 3, 8)).id for sym in ("AAPL", "MSFT", "NVDA")]
+    provider = MagicMock()
+    history = bars({"2024-03-08": 171.0})
+    provider.fetch_history_many.return_value = {"AAPL": (history, "Yahoo"), "MSFT": (history, "Yahoo")}
+    queue = make_queue(session, provider, workers=1, batch_size=10, retry_after=60)
+    try:
+        assert queue.enqueue(ids + ids[:1]) == 3  # Duplicates are queued once
+        assert queue.wait_idle()
+
+        provider.fetch_history_many.assert_called_once()
+        assert queue.stats()["finalized"] == 2
+        session.expire_all()
+        assert session.get(Prediction, ids[0]).final_price == 171.0
+        # NVDA has no close yet: not retried until retry_after has passed
+        assert queue.enqueue(ids[2:]) == 0
+        assert queue.stats()["waiting_retry"] == 1
+    finally:
+        queue.shutdown()
+
+
+def test_watchlist_read_enqueues_matured_predictions_and_returns_immediately(client, session, monkeypatch):
+    from app import main
+    matured = add(session, "AAPL", date(2024, 3, 8), target=170.0)
+    add(session, "NVDA", date.today().replace(year=date.today().year + 1))
+    monkeypatch.setattr(main, "get_live_prices", lambda symbols: {"AAPL": 180.0, "NVDA": 900.0})
+
+    provider = MagicMock()
+    provider.fetch_history_many.return_value = {"AAPL": (bars({"2024-03-08": 171.0}), "Yahoo")}
+    queue = make_queue(session, provider, workers=1)
+    monkeypatch.setattr(main, "finalization_queue", queue)
+    try:
+        with patch.object(queue, "_settle", wraps=queue._settle) as settle, patch("app.main.yf.download") as download:
+            items = {item["symbol"]: item for item in client.get("/watchlist/performance").json()}
+            download.assert_not_called()
+
+            # The read itself changed nothing: the prediction is reported as finalizing
+            assert items["AAPL"]["status"] == "⏳ FINALIZING"
+            assert items["AAPL"]["final_price"] is None and items["AAPL"]["current_price"] == 180.0
+            assert items["NVDA"]["status"] == "⏳ PENDING"
+
+            assert queue.wait_idle()
+            settle.assert_called_once_with([matured.id])
+
+        session.expire_all()
+        items = {item["symbol"]: item for item in client.get("/watchlist/performance").json()}
+        assert items["AAPL"]["final_price"] == 171.0 and items["AAPL"]["status"] == "✅ SUCCESS"
+    finally:
+        queue.shutdown()
+
+
+def test_validate_job_finalizes_through_the_per_symbol_fallback(client, session, monkeypatch):
+    from app import main
+    from app.services.providers import DataProvider
+    DataProvider._HISTORY_CACHE.clear()
+    monkeypatch.setattr(main, "alpaca_data", None)
+    monkeypatch.setattr(main, "get_live_prices", lambda symbols: {})
+    prediction = add(session, "AAPL", date(2024, 3, 8))
+
+    closes = pd.DataFrame({"Close": [171.0]}, index=pd.Index(pd.to_datetime(["2024-03-08"]), name="Date"))
+    # The bulk list download returns nothing, so AAPL goes through the per-symbol path
+    download = lambda symbols, **kwargs: pd.DataFrame() if isinstance(symbols, list) else closes
+    with patch("app.services.providers.yf.download", side_effect=download) as yahoo:
+        response = client.post("/scheduler/validate")
+
+    assert response.status_code == 200
+    assert response.json()["finalized"] == 1
+    assert [call.args[0] for call in yahoo.call_args_list] == [["AAPL"], "AAPL"]
+    session.expire_all()
+    assert session.get(Prediction, prediction.id).final_price == 171.0
+
+
+def test_cleanup_deletes_stale_open_predictions_whether_null_or_zero(client, session):
+    from app import main
+    stale = date(2024, 1, 5)
+    null_open = add(session, "AAPL", stale)
+    zero_open = add(session, "MSFT", stale, final_price=0.0)
+    settled = add(session, "NVDA", stale, final_price=171.0)
+
+    with patch.object(main.settings, "QSTASH_CURRENT_SIGNING_KEY", None):
+        response = client.post("/scheduler/cleanup")
+
+    assert response.json()["deleted_zombies"] == 2
+    session.expire_all()
+    assert session.get(Prediction, null_open.id) is None and session.get(Prediction, zero_open.id) is None
+    assert session.get(Prediction, settled.id) is not None
@@ -0,0 +1,97 @@
+import os
+import pytest
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.services.forecast_pool import ForecastPool, ForecastQueueFull, prophet_forecast, _warm_fit
+
+
+def test_runs_inline_when_not_started(history_df):
+    pool = ForecastPool(max_workers=1, max_pending=1, max_tasks_per_child=1, queue_timeout=0.1)
+
+    forecast, fitted = pool.run(prophet_forecast, history_df, 5, None)
+
+    assert len(forecast) == len(history_df) + 5
+    assert list(forecast.columns) == ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+    assert fitted is not None
+
+    # Feeding the fitted model back in skips the fit entirely
+    reforecast, refitted = pool.run(prophet_forecast, history_df, 5, fitted)
+    assert refitted is None
+    assert reforecast['yhat'].iloc[-1] == pytest.approx(forecast['yhat'].iloc[-1])
+
+
+def test_runs_in_worker_process():
+    pool = ForecastPool(max_workers=1, max_pending=2, max_tasks_per_child=5, queue_timeout=30)
+    pool.start()
+    try:
+        assert pool.run(os.getpid) != os.getpid()
+    finally:
+        pool.shutdown()
+
+
+def test_rejects_when_queue_is_full():
+    pool = ForecastPool(max_workers=1, max_pending=1, max_tasks_per_child=5, queue_timeout=0.05)
+    pool.start()
+    try:
+        # Occupy the only slot
+        pool._slots.acquire()
+        with pytest.raises(ForecastQueueFull):
+            pool.run(os.getpid)
+        pool._slots.release()
+    finally:
+        pool.shutdown()
+
+
+def test_warm_start_seeds_from_previous_fit(history_df):
+    _, yesterday = prophet_forecast(history_df.iloc[:-2], 5)
+
+    with patch("prophet.Prophet.fit", autospec=True, side_effect=lambda self, df, **kw: None) as fit, \
+            patch("app.services.forecast_pool._noise_scale", return_value=1.0):
+        _warm_fit(history_df, yesterday)
+
+    init = fit.call_args.kwargs["init"]
+    assert set(init) == {"k", "m", "sigma_obs", "delta", "beta"}
+
+
+def test_warm_start_result_is_used(history_df):
+    _, yesterday = prophet_forecast(history_df.iloc[:-2], 5)
+
+    warm = _warm_fit(history_df, yesterday)
+    assert warm is not None
+    assert warm.history["ds"].max() == history_df["ds"].max()
+
+
+def test_warm_start_skipped_when_history_moved_too_far(history_df):
+    _, old = prophet_forecast(history_df.iloc[:-30], 5)
+    assert _warm_fit(history_df, old) is None
+
+
+def test_warm_start_falls_back_when_diverged(history_df):
+    _, yesterday = prophet_forecast(history_df.iloc[:-1], 5)
+
+    # Any noise increase counts as divergence -> cold fit
+    with patch.object(settings, "WARM_START_MAX_NOISE_RATIO", 0.0):
+        assert _warm_fit(history_df, yesterday) is None
+        forecast, fitted = prophet_forecast(history_df, 5, None, yesterday)
+
+    assert fitted is not None
+    assert len(forecast) == len(history_df) + 5
+
+
+def test_warm_start_falls_back_when_the_warm_fit_raises(history_df):
+    from prophet import Prophet
+    _, yesterday = prophet_forecast(history_df.iloc[:-1], 5)
+    cold_fit = Prophet.fit
+
+    def fit(self, df, **kwargs):
+        if "init" in kwargs:
+            raise RuntimeError("Error during optimization")
+        return cold_fit(self, df, **kwargs)
+
+    with patch("prophet.Prophet.fit", autospec=True, side_effect=fit) as mock_fit:
+        forecast, fitted = prophet_forecast(history_df, 5, None, yesterday)
+
+    assert mock_fit.call_count == 2  # Warm attempt, then the cold fit
+    assert fitted is not None
+    assert len(forecast) == len(history_df) + 5
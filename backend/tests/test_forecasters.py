@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.forecasters import FastForecaster, align_histories
+
+
+@pytest.fixture
+def trading_days():
+    return pd.bdate_range("2024-01-01", periods=300)
+
+
+def test_recovers_exact_log_linear_trend(trading_days):
+    offsets = (trading_days - trading_days[0]).days.to_numpy()
+    closes = 50 * np.exp(0.001 * offsets)
+
+    result = FastForecaster().fit_predict(closes, trading_days, horizon=7)
+
+    assert result.predicted[0] == pytest.approx(50 * np.exp(0.001 * (offsets[-1] + 7)), rel=1e-6)
+    assert result.mae[0] == pytest.approx(0, abs=1e-6)
+    assert result.forecast_date == trading_days[-1] + pd.Timedelta(days=7)
+
+
+def test_robust_to_outliers(trading_days):
+    closes = np.full(len(trading_days), 100.0)
+    closes[-5] = 1000.0  # Bad print
+
+    result = FastForecaster().fit_predict(closes, trading_days, horizon=5)
+    assert result.predicted[0] == pytest.approx(100.0, rel=1e-3)
+
+
+def test_batch_matches_single_symbol_fits(trading_days):
+    rng = np.random.default_rng(3)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (4, len(trading_days))), axis=1))
+    forecaster = FastForecaster()
+
+    batch = forecaster.fit_predict(closes, trading_days, horizon=10)
+    singles = [forecaster.fit_predict(row, trading_days, horizon=10).predicted[0] for row in closes]
+
+    np.testing.assert_allclose(batch.predicted, singles, rtol=1e-9)
+
+
+def test_align_histories_handles_ragged_frames(trading_days):
+    long = pd.DataFrame({"ds": trading_days, "y": np.linspace(10, 20, len(trading_days))})
+    short = pd.DataFrame({"ds": trading_days[-100:], "y": np.linspace(5, 6, 100)})
+
+    symbols, dates, closes = align_histories({"LONG": long, "SHORT": short})
+
+    assert symbols == ["LONG", "SHORT"]
+    assert closes.shape == (2, len(trading_days))
+    assert np.isnan(closes[1, 0]) and closes[1, -1] == 6.0
+
+    # Leading NaNs are ignored by the fit instead of poisoning it
+    result = FastForecaster().fit_predict(closes, dates, horizon=3)
+    assert np.all(np.isfinite(result.predicted))
+    assert np.isfinite(result.fitted[1]).sum() == 100
+
+
+def test_align_histories_drops_symbols_that_stopped_trading(trading_days):
+    live = pd.DataFrame({"ds": trading_days, "y": np.linspace(10, 20, len(trading_days))})
+    gappy = live.drop(index=range(100, 110))                  # Ten-day halt mid-history
+    delisted = live.iloc[:-10]                                # No bars for the last ten days
+
+    symbols, dates, closes = align_histories({"LIVE": live, "GAPPY": gappy, "DELISTED": delisted}, limit=5)
+
+    assert symbols == ["LIVE", "GAPPY"]
+    assert closes.shape == (2, len(trading_days))
+    # The halt is bridged for `limit` days only, not carried forward indefinitely
+    assert np.all(closes[1, 100:105] == closes[1, 99])
+    assert np.all(np.isnan(closes[1, 105:110]))
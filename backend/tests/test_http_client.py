@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.http_client import HttpClient
+
+
+def make_client(handler, max_per_host=10):
+    return HttpClient(max_connections=10, max_per_host=max_per_host, timeout=5, connect_timeout=1,
+                      transport=httpx.MockTransport(handler))
+
+
+def test_sync_and_async_callers_share_one_client():
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.host)
+        return httpx.Response(200, text=f"hello {request.url.path}")
+
+    client = make_client(handler)
+    try:
+        assert client.get_sync("https://example.com/a").text == "hello /a"
+
+        async def from_api_loop():
+            return await client.get("https://example.com/b")
+
+        assert asyncio.run(from_api_loop()).text == "hello /b"
+        assert seen == ["example.com", "example.com"]
+    finally:
+        client.close()
+
+
+def test_per_host_limit_caps_concurrency():
+    active = {"now": 0, "peak": 0}
+
+    async def handler(request):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        return httpx.Response(200)
+
+    client = make_client(handler, max_per_host=2)
+    try:
+        async def burst():
+            return await asyncio.gather(*[client.get("https://finviz.com/x") for _ in range(6)])
+
+        responses = asyncio.run(burst())
+        assert all(r.status_code == 200 for r in responses)
+        assert active["peak"] == 2
+    finally:
+        client.close()
+
+
+def test_run_sync_refuses_to_deadlock_its_own_loop():
+    client = make_client(lambda request: httpx.Response(200))
+    try:
+        async def nested():
+            client.run_sync(asyncio.sleep(0))
+
+        with pytest.raises(RuntimeError):
+            client.run_sync(nested())
+    finally:
+        client.close()
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+from prophet import Prophet
+from prophet.serialize import model_to_json, model_from_json
+
+from app.services.model_cache import ModelCache
+
+
+@pytest.fixture
+def fitted_model(history_df):
+    m = Prophet(daily_seasonality=True)
+    m.fit(history_df)
+    return model_to_json(m)
+
+
+def test_roundtrip_from_memory(tmp_path, history_df, fitted_model):
+    cache = ModelCache(str(tmp_path))
+    assert cache.get_payload("AAPL", history_df) is None
+
+    cache.put_payload("AAPL", history_df, fitted_model)
+    loaded = model_from_json(cache.get_payload("aapl", history_df))
+
+    future = loaded.make_future_dataframe(periods=3)
+    assert len(loaded.predict(future)) == len(history_df) + 3
+
+
+def test_survives_restart_via_disk(tmp_path, history_df, fitted_model):
+    ModelCache(str(tmp_path)).put_payload("MSFT", history_df, fitted_model)
+
+    # A fresh instance has an empty memory tier and must read from disk
+    assert ModelCache(str(tmp_path)).get_payload("MSFT", history_df) is not None
+
+
+def test_changed_history_misses(tmp_path, history_df, fitted_model):
+    cache = ModelCache(str(tmp_path))
+    cache.put_payload("NVDA", history_df, fitted_model)
+
+    grown = pd.concat([history_df, pd.DataFrame({
+        "ds": [history_df["ds"].iloc[-1] + pd.Timedelta(days=1)],
+        "y": [101.0]
+    })], ignore_index=True)
+
+    assert cache.get_payload("NVDA", grown) is None
+
+
+def test_memory_tier_is_bounded_and_disk_keeps_latest(tmp_path, history_df, fitted_model):
+    cache = ModelCache(str(tmp_path), max_entries=1)
+    cache.put_payload("AAA", history_df, fitted_model)
+    cache.put_payload("BBB", history_df, fitted_model)
+    assert list(cache._entries) == [f"BBB_{ModelCache.fingerprint(history_df)}"]
+
+    # Re-fitting a symbol on new data replaces its old file on disk
+    shifted = history_df.assign(y=history_df["y"] + 1)
+    cache.put_payload("AAA", shifted, fitted_model)
+    aaa_files = [p.name for p in tmp_path.iterdir() if p.name.startswith("AAA_")]
+    assert aaa_files == [f"AAA_{ModelCache.fingerprint(shifted)}.json"]
+
+
+def test_latest_payload_ignores_frame(tmp_path, history_df, fitted_model):
+    ModelCache(str(tmp_path)).put_payload("AMD", history_df, fitted_model)
+
+    # From disk (fresh instance) and for a frame the model wasn't fitted on
+    cache = ModelCache(str(tmp_path))
+    assert cache.get_payload("AMD", history_df.iloc[:-1]) is None
+    assert cache.latest_payload("AMD") is not None
+    assert cache.latest_payload("AM") is None
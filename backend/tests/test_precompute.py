@@ -0,0 +1,95 @@
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+from sqlmodel import select
+
+from app.models import PrecomputedForecast
+from app.schemas import PredictionResponse
+from app.services.compact_history import CompactHistory
+from app.services.precompute import last_market_close, run_precompute, get_fresh_forecast
+
+
+def make_prediction(symbol: str, days: int) -> PredictionResponse:
+    return PredictionResponse(
+        symbol=symbol, company_name=symbol, tv_symbol=f"NASDAQ:{symbol}",
+        current_price=100.0, predicted_price=100.0 + days, forecast_date=date(2024, 1, 10),
+        confidence_score=90.0, explanation="precomputed"
+    )
+
+
+def test_last_market_close():
+    # Tuesday 15:00 NY (20:00 UTC) -> Monday's close (21:00 UTC, EST)
+    assert last_market_close(datetime(2024, 1, 9, 20, 0, tzinfo=timezone.utc)) == datetime(2024, 1, 8, 21, 0)
+    # Tuesday 17:00 NY -> Tuesday's close
+    assert last_market_close(datetime(2024, 1, 9, 22, 0, tzinfo=timezone.utc)) == datetime(2024, 1, 9, 21, 0)
+    # Sunday -> Friday's close
+    assert last_market_close(datetime(2024, 1, 7, 12, 0, tzinfo=timezone.utc)) == datetime(2024, 1, 5, 21, 0)
+
+
+def test_run_precompute_stores_and_serves(session):
+    history = CompactHistory.from_frame(
+        pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=3), "y": [1.0, 2.0, 3.0]})
+    )
+    engine = MagicMock()
+    engine.provider.fetch_history_many.return_value = {"AAPL": (history, "Test"), "MSFT": (history, "Test")}
+    engine.predict_from_history.side_effect = lambda req, df, src: make_prediction(req.symbol, req.days)
+
+    stats = run_precompute(session, engine, symbols=["aapl", "MSFT", "GONE"], horizons=[7, 30])
+    assert stats == {"stored": 4, "failed": 1}
+
+    # Re-running upserts instead of duplicating
+    run_precompute(session, engine, symbols=["AAPL"], horizons=[7])
+    rows = session.exec(select(PrecomputedForecast).where(PrecomputedForecast.symbol == "AAPL")).all()
+    assert sorted(r.days for r in rows) == [7, 30]
+    assert rows[0].as_of == date(2024, 1, 3)
+
+    served = get_fresh_forecast(session, "aapl", 30)
+    assert served is not None and served.predicted_price == 130.0
+    assert get_fresh_forecast(session, "AAPL", 90) is None
+
+
+def test_stale_rows_are_not_served(session):
+    stale = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=4)
+    session.add(PrecomputedForecast(
+        symbol="NVDA", days=7, payload=make_prediction("NVDA", 7).model_dump_json(),
+        as_of=date(2024, 1, 3), computed_at=stale
+    ))
+    session.commit()
+
+    assert get_fresh_forecast(session, "NVDA", 7) is None
+
+
+def test_predict_endpoint_serves_precomputed_row(client, session):
+    session.add(PrecomputedForecast(
+        symbol="AMD", days=7, payload=make_prediction("AMD", 7).model_dump_json(),
+        as_of=date(2024, 1, 3), computed_at=datetime.now(timezone.utc).replace(tzinfo=None)
+    ))
+    session.commit()
+
+    with patch("app.services.engine.PredictionEngine.predict") as live_predict:
+        response = client.post("/predict", json={"symbol": "AMD", "days": 7})
+
+    assert response.status_code == 200
+    assert response.json()["explanation"] == "precomputed"
+    live_predict.assert_not_called()
+
+
+def test_upsert_keeps_one_row_per_symbol_and_horizon(session):
+    import pytest
+    from sqlalchemy.exc import IntegrityError
+    from app.services.precompute import _upsert
+
+    first, later = datetime(2024, 1, 9, 21, 0), datetime(2024, 1, 10, 21, 0)
+    _upsert(session, make_prediction("TSLA", 7), 7, date(2024, 1, 9), first)
+    _upsert(session, make_prediction("TSLA", 7), 7, date(2024, 1, 10), later)
+    session.commit()
+
+    rows = session.exec(select(PrecomputedForecast).where(PrecomputedForecast.symbol == "TSLA")).all()
+    assert [(r.as_of, r.computed_at) for r in rows] == [(date(2024, 1, 10), later)]
+
+    # The table itself rejects a second (symbol, days) row
+    session.add(PrecomputedForecast(symbol="TSLA", days=7, payload="{}", as_of=date(2024, 1, 10), computed_at=later))
+    with pytest.raises(IntegrityError):
+        session.commit()
+    session.rollback()
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import threading
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from app.schemas import WatchlistPerformanceItem
+from app.services.price_hub import PriceHub
+from app.services.price_stream import PriceStream
+
+
+def test_one_publish_fans_out_to_every_interested_subscriber():
+    hub = PriceHub()
+
+    async def scenario():
+        first, second = hub.subscribe(["AAPL", "MSFT"]), hub.subscribe(["aapl"])
+        other = hub.subscribe(["NVDA"])
+
+        # Published from another thread, like the price stream's loop
+        thread = threading.Thread(target=lambda: [hub.publish("AAPL", p) for p in (187.0, 187.5, 187.5)])
+        thread.start()
+        thread.join()
+
+        return await first.next(1), await second.next(1), await other.next(0.05)
+
+    first, second, other = asyncio.run(scenario())
+
+    # Latest price only (a slow client skips intermediate ticks), unchanged ticks aren't republished
+    assert first == second == {"AAPL": 187.5}
+    assert other == {}
+    assert hub.stats()["published"] == 2
+
+
+def test_price_stream_changes_reach_the_hub():
+    stream = PriceStream("ws://unused", stale_after=60)
+    listener = MagicMock()
+    stream.add_listener(listener)
+    stream.track(["AAPL"])
+
+    stream.seed({"AAPL": 187.5})
+    stream._handle(json.dumps([{"T": "t", "S": "AAPL", "p": 187.5}]))  # same price: no change
+    stream._handle(json.dumps([{"T": "t", "S": "AAPL", "p": 188.0}]))
+
+    assert [c.args for c in listener.call_args_list] == [("AAPL", 187.5), ("AAPL", 188.0)]
+
+
+def make_item(id, symbol, target, final_price=None):
+    return WatchlistPerformanceItem(
+        id=id, symbol=symbol, initial_price=100.0, target_price=target, current_price=final_price or 100.0,
+        final_price=final_price, end_date=date.today() + timedelta(days=30), created_at=date.today(),
+        accuracy_score=0.0, status="⏳ PENDING" if final_price is None else "✅ SUCCESS"
+    )
+
+
+def test_watchlist_stream_sends_snapshot_then_only_changed_predictions(monkeypatch):
+    from app import main
+
+    hub = PriceHub()
+    monkeypatch.setattr(main, "price_hub", hub)
+    monkeypatch.setattr(main.settings, "WATCHLIST_PUSH_HEARTBEAT", 0.05)
+    main.price_stream.connected = True  # Updates come from the hub, not a fallback poll
+    request = MagicMock()
+    request.is_disconnected = AsyncMock(side_effect=[False, False, True])
+    snapshot = [make_item(1, "AAPL", 200.0), make_item(2, "MSFT", 400.0, final_price=410.0)]
+
+    async def scenario():
+        subscription = hub.subscribe(["AAPL"])
+        events = main._watchlist_events(request, snapshot, subscription)
+        received = [await events.__anext__()]
+        hub.publish("AAPL", 187.5)
+        received.append(await events.__anext__())
+        hub.publish("MSFT", 420.0)  # Nobody is live on MSFT: its prediction is finalized
+        received += [event async for event in events]
+        return received, hub.stats()["subscribers"]
+
+    (snapshot_event, update_event, heartbeat), subscribers = asyncio.run(scenario())
+
+    assert snapshot_event.startswith("event: snapshot\n")
+    assert len(json.loads(snapshot_event.split("data: ", 1)[1])) == 2
+    assert update_event.startswith("event: update\n")
+    assert json.loads(update_event.split("data: ", 1)[1]) == [
+        {"id": 1, "symbol": "AAPL", "current_price": 187.5, "accuracy_score": 0.0, "status": "⏳ PENDING"}
+    ]
+    assert heartbeat == ": keep-alive\n\n"
+    # The client went away: its subscription is gone
+    assert subscribers == 0
+
+
+def test_watchlist_stream_settles_predictions_finalized_in_the_background(monkeypatch):
+    from app import main
+
+    hub = PriceHub()
+    monkeypatch.setattr(main, "price_hub", hub)
+    monkeypatch.setattr(main.settings, "WATCHLIST_PUSH_HEARTBEAT", 0.05)
+    main.price_stream.connected = True
+    request = MagicMock()
+    request.is_disconnected = AsyncMock(side_effect=[False, False, True])
+    finalizing = make_item(1, "AAPL", 170.0).model_copy(update={"status": "⏳ FINALIZING", "current_price": 180.0})
+
+    async def scenario():
+        subscription = hub.subscribe(["AAPL"])
+        events = main._watchlist_events(request, [finalizing], subscription)
+        received = [await events.__anext__()]
+        # The finalization queue reports from its worker thread
+        thread = threading.Thread(target=hub.publish_finalized, args=({1: ("AAPL", 171.0, date(2024, 3, 8))},))
+        thread.start()
+        thread.join()
+        received.append(await events.__anext__())
+        hub.publish("AAPL", 190.0)  # Settled: live ticks no longer move it
+        received += [event async for event in events]
+        return received
+
+    snapshot_event, finalized_event, heartbeat = asyncio.run(scenario())
+
+    assert snapshot_event.startswith("event: snapshot\n")
+    assert finalized_event.startswith("event: finalized\n")
+    [item] = json.loads(finalized_event.split("data: ", 1)[1])
+    assert (item["final_price"], item["current_price"], item["status"]) == (171.0, 171.0, "✅ SUCCESS")
+    assert item["finalized_date"] == "2024-03-08"
+    assert heartbeat == ": keep-alive\n\n"
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+from websockets.asyncio.server import serve
+
+from app.core.config import settings
+from app.services.price_stream import PriceStream
+
+
+class FakeFeed:
+    """Local stand-in for Alpaca's trade stream: connect -> auth -> subscribe -> trades."""
+
+    def __init__(self):
+        self.subscriptions = []
+        self.connections = 0
+        self.clients = set()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = self._call(self._serve())
+        self.url = f"ws://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    async def _serve(self):
+        return await serve(self._handler, "127.0.0.1", 0)
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout=5)
+
+    async def _handler(self, ws):
+        self.connections += 1
+        await ws.send(json.dumps([{"T": "success", "msg": "connected"}]))
+        auth = json.loads(await ws.recv())
+        if auth.get("key") != "key":
+            await ws.send(json.dumps([{"T": "error", "code": 402, "msg": "auth failed"}]))
+            return
+        await ws.send(json.dumps([{"T": "success", "msg": "authenticated"}]))
+        self.clients.add(ws)
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                self.subscriptions.append(message)
+                await ws.send(json.dumps([{"T": "subscription", "trades": message.get("trades", [])}]))
+        finally:
+            self.clients.discard(ws)
+
+    def trade(self, symbol, price):
+        async def send():
+            for ws in list(self.clients):
+                await ws.send(json.dumps([{"T": "t", "S": symbol, "p": price, "s": 100, "t": "2024-01-02T15:00:00Z"}]))
+        self._call(send())
+
+    def drop_clients(self):
+        async def close():
+            for ws in list(self.clients):
+                await ws.close()
+        self._call(close())
+
+    def close(self):
+        self.server.close()
+        self._call(self.server.wait_closed())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    monkeypatch.setattr(settings, "PRICE_STREAM_RECONNECT_DELAY", 0.01)
+    feed = FakeFeed()
+    yield feed
+    feed.close()
+
+
+def test_streamed_trades_fill_the_last_trade_table(feed):
+    stream = PriceStream(feed.url, stale_after=60)
+    stream.start("key", "secret", ["AAPL", "brk-b"])
+    try:
+        assert wait_for(lambda: feed.subscriptions)
+        assert feed.subscriptions[0] == {"action": "subscribe", "trades": ["AAPL", "BRK.B"]}
+
+        feed.trade("AAPL", 187.5)
+        feed.trade("BRK.B", 410.25)
+        assert wait_for(lambda: stream.prices(["AAPL", "BRK-B"]) == {"AAPL": 187.5, "BRK-B": 410.25})
+
+        # Newly watchlisted symbols are subscribed on the live connection
+        stream.track(["MSFT", "AAPL"])
+        assert wait_for(lambda: len(feed.subscriptions) == 2)
+        assert feed.subscriptions[1] == {"action": "subscribe", "trades": ["MSFT"]}
+    finally:
+        stream.shutdown()
+
+
+def test_reconnects_and_resubscribes_after_the_feed_drops(feed):
+    stream = PriceStream(feed.url, stale_after=60)
+    stream.start("key", "secret", ["AAPL"])
+    try:
+        assert wait_for(lambda: stream.connected and feed.subscriptions)
+        feed.drop_clients()
+
+        assert wait_for(lambda: feed.connections == 2 and len(feed.subscriptions) == 2)
+        assert feed.subscriptions[1] == {"action": "subscribe", "trades": ["AAPL"]}
+        assert stream.reconnects >= 1
+
+        feed.trade("AAPL", 190.0)
+        assert wait_for(lambda: stream.get("AAPL") == 190.0)
+    finally:
+        stream.shutdown()
+
+
+def test_prices_go_stale_only_while_disconnected():
+    stream = PriceStream("ws://unused", stale_after=10)
+    stream.track(["AAPL"])
+    stream.seed({"AAPL": 187.5, "MSFT": 410.0})  # MSFT isn't tracked, so it isn't kept
+
+    assert stream.prices(["AAPL", "MSFT"]) == {"AAPL": 187.5}
+    stream._prices["AAPL"] = (187.5, time.time() - 11)
+    assert stream.get("AAPL") is None
+    stream.connected = True
+    assert stream.get("AAPL") == 187.5
+
+
+def test_live_prices_read_the_stream_before_polling(monkeypatch, price_stream):
+    from app import main
+
+    price_stream.track(["AAPL"])
+    price_stream.seed({"AAPL": 187.5})
+    alpaca = MagicMock()
+    monkeypatch.setattr(main, "alpaca_data", alpaca)
+    main.PRICE_CACHE.clear()
+
+    assert main.get_live_prices(["AAPL"]) == {"AAPL": 187.5}
+    alpaca.get_stock_snapshot.assert_not_called()
+
+    # Watchlisted but not traded yet: polled once and seeded. Anything else is polled, never subscribed.
+    price_stream.track(["NVDA"])
+    alpaca.get_stock_snapshot.return_value = {
+        "MSFT": MagicMock(latest_trade=MagicMock(price=410.0)), "NVDA": MagicMock(latest_trade=MagicMock(price=875.0))
+    }
+    assert main.get_live_prices(["AAPL", "MSFT", "NVDA"]) == {"AAPL": 187.5, "MSFT": 410.0, "NVDA": 875.0}
+    assert price_stream.get("NVDA") == 875.0
+    assert price_stream.get("MSFT") is None
+    assert price_stream.stats()["tracked"] == 2
+
+
+def test_stream_follows_open_watchlist_entries(client, session, monkeypatch, price_stream):
+    from datetime import date
+    from app import main
+    from app.models import Prediction
+
+    for symbol in ("AAPL", "MSFT"):
+        assert client.post("/watchlist", json={"symbol": symbol, "initial_price": 100.0, "target_price": 120.0,
+                                               "end_date": "2024-03-08"}).status_code == 200
+    session.add(Prediction(user_id="other-user", symbol="MSFT", initial_price=100.0, target_price=120.0,
+                           end_date=date.today().replace(year=date.today().year + 1), confidence_score=0.0))
+    session.commit()
+    assert price_stream.stats()["tracked"] == 2
+
+    # Both test-user predictions matured: AAPL has no open prediction left, MSFT still has one
+    monkeypatch.setattr(main, "get_live_prices", lambda symbols: {})
+    closes = pd.DataFrame({"Close": [171.0]}, index=pd.Index(pd.to_datetime(["2024-03-08"]), name="Date"))
+    monkeypatch.setattr(main, "alpaca_data", None)
+    with patch("app.services.providers.yf.download", return_value=pd.concat({"AAPL": closes, "MSFT": closes}, axis=1)):
+        assert client.post("/scheduler/validate").json()["finalized"] == 2
+
+    assert price_stream.prices(["AAPL", "MSFT"]) == {}
+    assert price_stream.stats()["tracked"] == 1
+    assert "MSFT" in price_stream._symbols
+
+
+def test_connected_stream_stops_serving_old_trades(monkeypatch, price_stream):
+    from app import main
+
+    price_stream.max_age = 900
+    price_stream.connected = True
+    price_stream.track(["HALT"])
+    price_stream.seed({"HALT": 50.0})
+    assert price_stream.get("HALT") == 50.0
+
+    # Last trade hours ago (halted): the REST path is consulted and its price re-seeds the table
+    price_stream._prices["HALT"] = (50.0, time.time() - 3600)
+    assert price_stream.get("HALT") is None
+    alpaca = MagicMock()
+    alpaca.get_stock_snapshot.return_value = {"HALT": MagicMock(latest_trade=MagicMock(price=42.0))}
+    monkeypatch.setattr(main, "alpaca_data", alpaca)
+    main.PRICE_CACHE.clear()
+
+    assert main.get_live_prices(["HALT"]) == {"HALT": 42.0}
+    alpaca.get_stock_snapshot.assert_called_once()
+    assert price_stream.get("HALT") == 42.0
@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+from unittest.mock import MagicMock, patch
+
+from app.services.compact_history import CompactHistory
+from app.services.providers import DataProvider
+
+
+def make_alpaca_bars(symbols, periods=3):
+    """
+    Simulates StockBarsRequest(...).df for several symbols: a (symbol, timestamp) MultiIndex.
+    """
+    frames = []
+    for i, sym in enumerate(symbols):
+        # Alpaca stamps daily bars at midnight New York: 05:00Z (04:00Z in summer)
+        ts = pd.date_range(end=pd.Timestamp.now(tz="UTC").normalize(), periods=periods) + pd.Timedelta(hours=5)
+        frames.append(pd.DataFrame({"symbol": sym, "timestamp": ts, "close": [10.0 * (i + 1)] * periods}))
+    return pd.concat(frames).set_index(["symbol", "timestamp"])
+
+
+def test_fetch_history_many_uses_one_alpaca_request():
+    DataProvider._HISTORY_CACHE.clear()
+    alpaca = MagicMock()
+    alpaca.get_stock_bars.return_value.df = make_alpaca_bars(["AAPL", "BRK.B"])
+
+    provider = DataProvider(alpaca)
+    with patch.object(provider, "fetch_history", side_effect=ValueError("no data")) as single, \
+            patch("yfinance.download", return_value=pd.DataFrame()) as yahoo:
+        result = provider.fetch_history_many(["aapl", "BRK-B", "ZZZZ"], days=30)
+
+    assert alpaca.get_stock_bars.call_count == 1
+    req = alpaca.get_stock_bars.call_args.args[0]
+    assert set(req.symbol_or_symbols) == {"AAPL", "BRK.B", "ZZZZ"}
+
+    # Alpaca symbols are mapped back; unknown symbols fall back and are skipped on failure
+    assert set(result) == {"AAPL", "BRK-B"}
+    assert result["BRK-B"][0].closes.tolist() == [20.0, 20.0, 20.0]
+    assert result["AAPL"][0].to_frame()["ds"].dt.tz is None
+    assert yahoo.call_args.args[0] == ["ZZZZ"]
+    single.assert_called_once_with("ZZZZ", days=30)
+
+    # Second call is served from the cache
+    provider.fetch_history_many(["AAPL", "BRK-B"], days=30)
+    assert alpaca.get_stock_bars.call_count == 1
+
+
+def make_yahoo_download(symbols, periods=3):
+    """Simulates yf.download(symbols, group_by='ticker'): (ticker, field) columns."""
+    index = pd.Index(pd.date_range(end=pd.Timestamp.now().normalize(), periods=periods), name="Date")
+    return pd.concat({sym: pd.DataFrame({"Close": 5.0 * (i + 1)}, index=index) for i, sym in enumerate(symbols)},
+                     axis=1)
+
+
+def test_fetch_history_many_chunks_and_bulk_falls_back_to_yahoo(monkeypatch):
+    from app.core.config import settings
+    DataProvider._HISTORY_CACHE.clear()
+    monkeypatch.setattr(settings, "HISTORY_BATCH_CHUNK", 2)
+    alpaca = MagicMock()
+    # Alpaca only knows AAPL and MSFT
+    alpaca.get_stock_bars.side_effect = lambda req: MagicMock(df=make_alpaca_bars(
+        [s for s in req.symbol_or_symbols if s in ("AAPL", "MSFT")]
+    ))
+
+    provider = DataProvider(alpaca)
+    with patch.object(provider, "fetch_history", side_effect=AssertionError("per-symbol fetch")), \
+            patch("yfinance.download", side_effect=lambda syms, **kw: make_yahoo_download(syms)) as yahoo:
+        result = provider.fetch_history_many(["AAPL", "MSFT", "SHOP", "RY"], days=30)
+
+    # Two chunks of two for Alpaca, then ONE Yahoo list download for the two it missed
+    assert alpaca.get_stock_bars.call_count == 2
+    assert yahoo.call_count == 1
+    assert yahoo.call_args.args[0] == ["SHOP", "RY"]
+    assert {sym: src for sym, (_, src) in result.items()} == {
+        "AAPL": "Alpaca (IEX)", "MSFT": "Alpaca (IEX)", "SHOP": "Yahoo", "RY": "Yahoo"
+    }
+    assert result["RY"][0].closes.tolist() == [10.0, 10.0, 10.0]
+    assert DataProvider._HISTORY_CACHE.get("SHOP") is not None
+
+
+def make_bars(start, periods, close=10.0, symbol="AAPL"):
+    ts = pd.date_range(start, periods=periods, tz="UTC") + pd.Timedelta(hours=5)
+    return pd.DataFrame({"symbol": symbol, "timestamp": ts, "close": close}).set_index(["symbol", "timestamp"])
+
+
+def test_refresh_downloads_only_new_bars(history_store):
+    DataProvider._HISTORY_CACHE.clear()
+    today = pd.Timestamp.now().normalize()
+    alpaca = MagicMock()
+    alpaca.get_stock_bars.return_value.df = make_bars(today - pd.Timedelta(days=40), 38)
+
+    provider = DataProvider(alpaca)
+    first, _ = provider.fetch_history("AAPL", days=30)
+
+    # Cache expires; the provider now has three more bars (the overlap bar is unchanged)
+    DataProvider._HISTORY_CACHE.clear()
+    alpaca.get_stock_bars.return_value.df = make_bars(today - pd.Timedelta(days=3), 4)
+    second, source = provider.fetch_history("AAPL", days=30)
+
+    req = alpaca.get_stock_bars.call_args.args[0]
+    assert pd.Timestamp(req.start) == today - pd.Timedelta(days=3)
+    assert second.last_date == today
+    assert second.first_date == first.first_date
+    assert len(second) == len(first) + 3
+    assert source == "Alpaca (IEX)"
+    assert len(history_store._parts("AAPL")) == 2
+
+
+def test_restated_history_refetches_window(history_store):
+    DataProvider._HISTORY_CACHE.clear()
+    today = pd.Timestamp.now().normalize()
+    alpaca = MagicMock()
+    alpaca.get_stock_bars.return_value.df = make_bars(today - pd.Timedelta(days=40), 39)
+
+    provider = DataProvider(alpaca)
+    provider.fetch_history("AAPL", days=30)
+
+    # A 2:1 split halves every close, including the one we already stored
+    DataProvider._HISTORY_CACHE.clear()
+    alpaca.get_stock_bars.return_value.df = make_bars(today - pd.Timedelta(days=40), 41, close=5.0)
+    df, _ = provider.fetch_history("AAPL", days=30)
+
+    assert set(df.closes) == {5.0}
+    assert len(history_store._parts("AAPL")) == 1
+
+
+def test_serves_stored_history_when_providers_fail(history_store):
+    DataProvider._HISTORY_CACHE.clear()
+    today = pd.Timestamp.now().normalize()
+    history_store.replace("AAPL", pd.DataFrame({
+        "ds": pd.date_range(end=today, periods=40), "y": 10.0
+    }), "Yahoo")
+
+    provider = DataProvider()
+    with patch("yfinance.download", side_effect=Exception("offline")):
+        df, source = provider.fetch_history("AAPL", days=30)
+
+    assert source == "Yahoo"
+    assert df.last_date == today
+
+
+def test_provider_switch_replaces_the_stored_series_by_trading_date(history_store):
+    DataProvider._HISTORY_CACHE.clear()
+    today = pd.Timestamp.now().normalize()
+    # Seeded by Yahoo (midnight dates, adjusted closes)
+    history_store.replace("AAPL", pd.DataFrame({"ds": pd.date_range(end=today - pd.Timedelta(days=2), periods=38),
+                                                "y": 9.5}), "Yahoo")
+    alpaca = MagicMock()
+    alpaca.get_stock_bars.return_value.df = make_bars(today - pd.Timedelta(days=39), 40)
+
+    history, source = DataProvider(alpaca).fetch_history("AAPL", days=30)
+
+    # Alpaca's 05:00Z bars land on the same trading dates, and never extend the Yahoo series
+    stored = history_store.read("AAPL")
+    assert source == "Alpaca (IEX)"
+    assert set(stored["source"]) == {"Alpaca (IEX)"}
+    assert (stored["ds"] == stored["ds"].dt.normalize()).all()
+    assert stored["ds"].is_unique
+    assert set(history.closes) == {10.0}
+    assert history.last_date == today
+
+
+def test_legacy_intraday_stamped_bars_are_read_by_date(history_store):
+    DataProvider._HISTORY_CACHE.clear()
+    today = pd.Timestamp.now().normalize()
+    days = pd.date_range(end=today - pd.Timedelta(days=1), periods=38)
+    history_store.replace("AAPL", pd.DataFrame({"ds": days + pd.Timedelta(hours=5), "y": 10.0}), "Alpaca (IEX)")
+    history_store.append("AAPL", pd.DataFrame({"ds": days[-1:], "y": [10.0]}), "Alpaca (IEX)")
+    alpaca = MagicMock()
+    alpaca.get_stock_bars.return_value.df = make_bars(today - pd.Timedelta(days=1), 2)
+
+    history, _ = DataProvider(alpaca).fetch_history("AAPL", days=30)
+
+    assert pd.Timestamp(alpaca.get_stock_bars.call_args.args[0].start) == today - pd.Timedelta(days=1)
+    assert len(np.unique(history.days)) == len(history)
+    assert history.last_date == today
+
+
+def test_history_store_compacts_parts(tmp_path):
+    from app.services.history_store import HistoryStore
+
+    store = HistoryStore(str(tmp_path), max_parts=3)
+    for i in range(5):
+        store.append("MSFT", pd.DataFrame({"ds": [pd.Timestamp("2024-01-01") + pd.Timedelta(days=i)], "y": [float(i)]}), "Yahoo")
+
+    assert len(store._parts("MSFT")) <= 3
+    assert store.read("MSFT")["y"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_one_cache_entry_serves_every_narrower_window():
+    DataProvider._HISTORY_CACHE.clear()
+    today = pd.Timestamp.now().normalize()
+    alpaca = MagicMock()
+    alpaca.get_stock_bars.return_value.df = make_bars(today - pd.Timedelta(days=400), 401)
+
+    provider = DataProvider(alpaca)
+    wide, _ = provider.fetch_history("AAPL", days=365)
+    narrow, _ = provider.fetch_history("AAPL", days=30)
+
+    assert alpaca.get_stock_bars.call_count == 1
+    assert len(DataProvider._HISTORY_CACHE) == 1
+    assert len(narrow) == 30
+    assert narrow.last_date == wide.last_date
+    # Served as a read-only view of the cached arrays, not a copy
+    assert np.shares_memory(narrow.closes, DataProvider._HISTORY_CACHE.get("AAPL")[0].closes)
+    assert not narrow.closes.flags.writeable
+
+    # A wider window is a miss and widens the single entry
+    provider.fetch_history("AAPL", days=390)
+    assert alpaca.get_stock_bars.call_count == 2
+    assert DataProvider._HISTORY_CACHE.get("AAPL")[2] == 390
+
+
+def test_yahoo_fallback_honours_requested_window():
+    DataProvider._HISTORY_CACHE.clear()
+    today = pd.Timestamp.now().normalize()
+    yahoo = pd.DataFrame({"Close": 10.0}, index=pd.Index(pd.date_range(end=today, periods=60), name="Date"))
+
+    with patch("yfinance.download", return_value=yahoo) as download:
+        df, source = DataProvider().fetch_history("MSFT", days=30)
+
+    assert source == "Yahoo"
+    assert download.call_args.kwargs["start"] == (today - pd.Timedelta(days=30)).strftime("%Y-%m-%d")
+    assert len(df) == 30
+
+
+def test_stale_history_is_served_then_refreshed_in_background():
+    import time
+    from app.services.cache import cache_refresher
+
+    DataProvider._HISTORY_CACHE.clear()
+    today = pd.Timestamp.now().normalize()
+    stale = pd.DataFrame({"ds": pd.date_range(end=today - pd.Timedelta(days=1), periods=30), "y": 10.0})
+    DataProvider._HISTORY_CACHE.l1.set("AAPL", (CompactHistory.from_frame(stale), "Yahoo", 30), stored_at=time.time() - DataProvider._CACHE_TTL - 1)
+
+    alpaca = MagicMock()
+    alpaca.get_stock_bars.return_value.df = make_bars(today - pd.Timedelta(days=30), 31, close=11.0)
+    provider = DataProvider(alpaca)
+
+    df, source = provider.fetch_history("AAPL", days=30)
+    assert source == "Yahoo"
+    assert df.last_date == today - pd.Timedelta(days=1)
+
+    assert cache_refresher.wait_idle()
+    df, source = provider.fetch_history("AAPL", days=30)
+    assert source == "Alpaca (IEX)"
+    assert df.last_date == today
+
+
+def test_history_download_runs_on_the_shared_client_loop():
+    import asyncio
+    import threading
+    from app.services.http_client import http_client
+
+    loops = []
+    real_download_async = DataProvider._download_async
+
+    async def download_async(self, symbol, start_dt):
+        loops.append(threading.current_thread())
+        return await real_download_async(self, symbol, start_dt)
+
+    index = pd.date_range(end=pd.Timestamp.now().normalize(), periods=10, name="Date")
+    with patch.object(DataProvider, "_download_async", download_async), \
+            patch("yfinance.download", return_value=pd.DataFrame({"Close": 10.0}, index=index)):
+        DataProvider._HISTORY_CACHE.clear()
+
+        async def from_an_event_loop():
+            return DataProvider(None).fetch_history("AAPL", days=5)
+
+        # Even called with a loop running on this thread, the blocking path uses the one daemon loop
+        _, source = asyncio.run(from_an_event_loop())
+
+    assert source == "Yahoo"
+    assert loops == [http_client._thread]
@@ -0,0 +1,215 @@
+import asyncio
+import time
+
+import pandas as pd
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.config import settings
+from app.services.providers import DataProvider
+from app.services.resilience import CircuitBreaker, Hedger, alpaca_breaker, history_hedger, yahoo_breaker
+
+
+def test_breaker_opens_then_probes_after_cooldown():
+    breaker = CircuitBreaker("Test", failure_threshold=2, cooldown=30)
+
+    with patch("app.services.resilience.time.time", return_value=1000.0):
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+
+    with patch("app.services.resilience.time.time", return_value=1031.0):
+        assert breaker.allow()          # the single half-open probe
+        assert not breaker.allow()      # everyone else still skips
+        breaker.record_failure()        # probe failed -> open again
+        assert breaker.state == "open"
+
+    with patch("app.services.resilience.time.time", return_value=1062.0):
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+
+def test_alpaca_outage_is_skipped_without_blocking():
+    today = pd.Timestamp.now().normalize()
+    yahoo = pd.DataFrame({"Close": 10.0}, index=pd.Index(pd.date_range(end=today, periods=10), name="Date"))
+    alpaca = MagicMock()
+    alpaca.get_stock_bars.side_effect = ConnectionError("Alpaca down")
+    provider = DataProvider(alpaca)
+
+    with patch("app.services.resilience.asyncio.sleep", new=AsyncMock()) as sleep, \
+            patch("time.sleep", side_effect=AssertionError("blocking sleep")), \
+            patch("yfinance.download", return_value=yahoo):
+        # Each request retries with async backoff, but counts as ONE breaker failure
+        for i, symbol in enumerate(["AAPL", "AMD", "NVDA"], start=1):
+            DataProvider._HISTORY_CACHE.clear()
+            _, source = provider.fetch_history(symbol, days=30)
+            assert source == "Yahoo"
+            assert alpaca.get_stock_bars.call_count == 3 * i
+            assert sleep.await_count == 2 * i
+            assert alpaca_breaker.state == ("open" if i == settings.BREAKER_FAILURE_THRESHOLD else "closed")
+
+        # While open, Alpaca costs nothing: no call, no backoff
+        DataProvider._HISTORY_CACHE.clear()
+        _, source = provider.fetch_history("MSFT", days=30)
+        assert source == "Yahoo"
+        assert alpaca.get_stock_bars.call_count == 9
+        assert sleep.await_count == 6
+
+
+def test_empty_yahoo_data_counts_as_a_failure():
+    provider = DataProvider(None)
+
+    with patch("yfinance.download", return_value=pd.DataFrame()):
+        for symbol in ["BAD1", "BAD2", "BAD3"]:
+            DataProvider._HISTORY_CACHE.clear()
+            with pytest.raises(ValueError, match="empty data"):
+                provider.fetch_history(symbol, days=30)
+
+    assert yahoo_breaker.state == "open"
+
+
+def test_backoff_is_jittered_and_capped():
+    from app.services.resilience import backoff
+    import asyncio
+
+    with patch("app.services.resilience.asyncio.sleep", new=AsyncMock()) as sleep:
+        for attempt in range(1, 8):
+            asyncio.run(backoff(attempt, base=0.25, cap=2.0))
+
+    delays = [c.args[0] for c in sleep.await_args_list]
+    assert all(0 <= d <= 2.0 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_hedge_fires_after_delay_and_cancels_the_loser():
+    hedger = Hedger("Test", percentile=95, default_delay=0.02)
+    cancelled = []
+
+    async def slow_primary():
+        try:
+            await asyncio.sleep(5)
+            return "primary"
+        except asyncio.CancelledError:
+            cancelled.append("primary")
+            raise
+
+    async def fast_secondary():
+        return "secondary"
+
+    result, winner = asyncio.run(hedger.run(slow_primary, fast_secondary))
+
+    assert (result, winner) == ("secondary", "secondary")
+    assert cancelled == ["primary"]
+    assert hedger.stats()["fired"] == 1 and hedger.stats()["won"] == 1
+    # The beaten primary still counts, at least as slow as the hedge delay
+    assert hedger.stats()["samples"] == 1
+    assert hedger._latencies[0] >= 0.02
+
+
+def test_slow_primaries_keep_the_delay_at_the_real_percentile():
+    hedger = Hedger("Test", percentile=50, default_delay=0.03, min_samples=4)
+
+    async def primary(latency):
+        await asyncio.sleep(latency)
+        return "primary"
+
+    async def secondary():
+        await asyncio.sleep(0.01)
+        return "secondary"
+
+    # Half the primaries are slower than the hedge: without their samples the median would be ~0
+    for latency in (0.0, 0.0, 0.2, 0.2):
+        asyncio.run(hedger.run(lambda: primary(latency), secondary))
+
+    assert hedger.stats()["samples"] == 4
+    assert hedger.delay() >= 0.03
+
+
+def test_fast_primary_never_hedges_and_sets_the_delay():
+    hedger = Hedger("Test", percentile=50, default_delay=1.0, min_samples=3)
+    secondary = AsyncMock(return_value="secondary")
+
+    async def primary():
+        return "primary"
+
+    for _ in range(3):
+        assert asyncio.run(hedger.run(primary, secondary)) == ("primary", "primary")
+
+    secondary.assert_not_awaited()
+    assert hedger.fired == 0
+    # Enough samples: the delay is now the observed median, not the default
+    assert hedger.delay() < 0.5
+
+
+def test_failed_primary_falls_back_without_counting_a_hedge():
+    hedger = Hedger("Test", percentile=95, default_delay=1.0)
+
+    async def empty_primary():
+        return None
+
+    async def secondary():
+        return "secondary"
+
+    assert asyncio.run(hedger.run(empty_primary, secondary)) == ("secondary", "secondary")
+    assert hedger.fired == 0
+
+
+def test_history_fetch_hedges_a_slow_alpaca_with_yahoo(monkeypatch):
+    today = pd.Timestamp.now().normalize()
+    yahoo = pd.DataFrame({"Close": 10.0}, index=pd.Index(pd.date_range(end=today, periods=10), name="Date"))
+    alpaca = MagicMock()
+    alpaca.get_stock_bars.side_effect = lambda req: time.sleep(0.5) or MagicMock(df=pd.DataFrame())
+    monkeypatch.setattr(settings, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(history_hedger, "default_delay", 0.02)
+    fired, won = history_hedger.fired, history_hedger.won
+
+    with patch("yfinance.download", return_value=yahoo):
+        DataProvider._HISTORY_CACHE.clear()
+        started = time.monotonic()
+        df, source = DataProvider(alpaca).fetch_history("AAPL", days=30)
+
+    assert source == "Yahoo"
+    assert len(df) == 10
+    assert time.monotonic() - started < 0.5
+    assert (history_hedger.fired, history_hedger.won) == (fired + 1, won + 1)
+
+
+def test_live_prices_hedge_a_slow_snapshot_with_yahoo(monkeypatch):
+    from app import main
+    from app.services.resilience import price_hedger
+
+    slow_alpaca = MagicMock()
+    slow_alpaca.get_stock_snapshot.side_effect = lambda req: time.sleep(0.5) or {}
+    closes = pd.DataFrame({"AAPL": [187.5], "MSFT": [410.0]})
+    monkeypatch.setattr(main, "alpaca_data", slow_alpaca)
+    monkeypatch.setattr(settings, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(price_hedger, "default_delay", 0.02)
+    main.PRICE_CACHE.clear()
+
+    with patch("app.main.yf.download", return_value=pd.concat({"Close": closes}, axis=1)) as download:
+        prices = main.get_live_prices(["AAPL", "MSFT"])
+
+    assert prices == {"AAPL": 187.5, "MSFT": 410.0}
+    # Yahoo won the race, so it isn't asked a second time as the plain fallback
+    assert download.call_count == 1
+    assert price_hedger.stats()["won"] >= 1
+
+
+def test_failed_price_race_does_not_ask_yahoo_twice(monkeypatch):
+    from app import main
+    from app.services.resilience import price_hedger
+
+    slow_alpaca = MagicMock()
+    slow_alpaca.get_stock_snapshot.side_effect = lambda req: time.sleep(0.1) or {}
+    monkeypatch.setattr(main, "alpaca_data", slow_alpaca)
+    monkeypatch.setattr(settings, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(price_hedger, "default_delay", 0.02)
+    main.PRICE_CACHE.clear()
+
+    with patch("app.main.yf.download", side_effect=Exception("yahoo down")) as download:
+        assert main._fetch_prices(["AAPL"]) == {}
+
+    assert download.call_count == 1
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+from app.services import technicals
+from app.services.technicals import TechnicalIndicators
+
+
+def _history(closes):
+    return pd.DataFrame({
+        "ds": pd.bdate_range("2023-01-02", periods=len(closes)),
+        "y": np.asarray(closes, dtype=float)
+    })
+
+
+@pytest.fixture
+def long_history():
+    rng = np.random.default_rng(11)
+    return _history(100 * np.exp(np.cumsum(rng.normal(0.0005, 0.015, 400))))
+
+
+def test_matches_rolling_reference(long_history):
+    signals = TechnicalIndicators().compute("aapl", long_history)
+    closes = long_history["y"]
+
+    assert signals.sma_50 == pytest.approx(closes.tail(50).mean(), abs=1e-3)
+    assert signals.sma_200 == pytest.approx(closes.tail(200).mean(), abs=1e-3)
+    mid, std = closes.tail(20).mean(), closes.tail(20).std(ddof=0)
+    assert signals.bollinger_upper == pytest.approx(mid + 2 * std, abs=1e-3)
+    assert signals.bollinger_lower == pytest.approx(mid - 2 * std, abs=1e-3)
+    assert 0 <= signals.rsi <= 100
+
+
+def test_bollinger_bands_use_population_std():
+    # 20 closes 101..120: mean 110.5, population std sqrt(33.25) = 5.766281 (sample std would be 5.916080)
+    signals = TechnicalIndicators().compute("BB", _history(np.arange(101.0, 121.0)))
+
+    assert signals.bollinger_upper == 122.0326
+    assert signals.bollinger_lower == 98.9674
+
+
+def test_incremental_update_equals_full_recompute(long_history):
+    indicators = TechnicalIndicators()
+    indicators.compute("AAPL", long_history.iloc[:-3])
+
+    with patch("app.services.technicals._advance", wraps=technicals._advance) as advance:
+        incremental = indicators.compute("AAPL", long_history)
+        again = indicators.compute("AAPL", long_history)
+
+    # Only the 3 new bars were processed, and the unchanged history was not processed at all
+    assert advance.call_count == 1
+    assert len(advance.call_args.args[2]) == 3
+    assert again == incremental
+    assert incremental == TechnicalIndicators().compute("AAPL", long_history)
+
+
+def test_revised_history_triggers_full_recompute(long_history):
+    indicators = TechnicalIndicators()
+    indicators.compute("AAPL", long_history)
+
+    revised = long_history.copy()
+    revised.loc[revised.index[-1], "y"] *= 1.05
+    assert indicators.compute("AAPL", revised) == TechnicalIndicators().compute("AAPL", revised)
+
+
+def test_signals():
+    rising = TechnicalIndicators().compute("UP", _history(np.linspace(50, 150, 260)))
+    assert rising.rsi == 100
+    assert rising.rsi_signal == "Overbought"
+    assert rising.trend_signal == "Strong Uptrend"
+
+    # Long decline, then a sharp rally that pulls the 50-day back above the 200-day
+    closes = np.r_[np.linspace(200, 100, 250), np.linspace(100, 190, 60)]
+    cross_at = None
+    indicators = TechnicalIndicators()
+    for end in range(240, len(closes) + 1):
+        if indicators.compute("X", _history(closes[:end])).trend_signal == "Golden Cross":
+            cross_at = end
+            break
+    assert cross_at is not None
+
+
+def test_short_history_is_neutral():
+    signals = TechnicalIndicators().compute("NEW", _history([10.0, 10.5, 10.2]))
+    assert signals.sma_200 == 0
+    assert signals.rsi == 50
+    assert signals.bollinger_signal == "Normal"
@@ -0,0 +1,77 @@
+import pandas as pd
+import redis
+from unittest.mock import MagicMock, patch
+
+from app.schemas import MoverItem
+from app.services.cache import LRUCache
+from app.services.providers import DataProvider
+from app.services.tiered_cache import TieredCache, RedisTier, MsgpackCodec
+
+
+def _worker_cache(codec, namespace="history", ttl=60):
+    """One uvicorn worker's view: its own L1 over the shared (fake) Redis."""
+    return TieredCache(LRUCache(max_entries=8, ttl=ttl), namespace=namespace, codec=codec)
+
+
+def test_msgpack_codecs_round_trip():
+    prices = _worker_cache(MsgpackCodec(), namespace="price")
+    movers_codec = MsgpackCodec(dump=lambda items: [i.model_dump() for i in items],
+                                load=lambda rows: [MoverItem(**r) for r in rows])
+    movers_a, movers_b = _worker_cache(movers_codec, "movers"), _worker_cache(movers_codec, "movers")
+
+    prices.set("AAPL", 187.5)
+    prices.l1.clear()
+    assert prices.get("AAPL") == 187.5
+
+    items = [MoverItem(symbol="NVDA", price=150.0, change_pct=5.0, volume="20M")]
+    movers_a.set("movers", items)
+    assert movers_b.get("movers") == items
+
+
+def test_shared_entry_keeps_its_original_age():
+    worker_a, worker_b = _worker_cache(MsgpackCodec(), ttl=10), _worker_cache(MsgpackCodec(), ttl=10)
+
+    with patch("app.services.tiered_cache.time.time", return_value=1000.0):
+        worker_a.set("AAPL", 1.0)
+    with patch("app.services.cache.time.time", return_value=1008.0):
+        assert worker_b.get("AAPL") == 1.0
+    with patch("app.services.cache.time.time", return_value=1011.0):
+        assert worker_b.l1.get("AAPL") is None
+
+
+def test_degrades_to_local_cache_when_redis_is_down():
+    tier = RedisTier("redis://unreachable", retry_after=30)
+    tier._client = MagicMock()
+    tier._client.get.side_effect = redis.ConnectionError("refused")
+    tier._client.set.side_effect = redis.ConnectionError("refused")
+    cache = TieredCache(LRUCache(max_entries=8, ttl=60), namespace="price", codec=MsgpackCodec(), tier=tier)
+
+    cache.set("AAPL", 1.0)          # L2 write fails quietly
+    assert cache.get("AAPL") == 1.0  # L1 still works
+    assert cache.get("MSFT") is None
+
+    # After the first failure Redis is skipped entirely until retry_after passes
+    assert tier._client.set.call_count == 1
+    assert tier._client.get.call_count == 0
+    assert tier.errors == 1
+
+
+def test_history_fetched_by_one_worker_is_reused_by_another():
+    DataProvider._HISTORY_CACHE.clear()
+    alpaca = MagicMock()
+    alpaca.get_stock_bars.return_value.df = pd.DataFrame({
+        "symbol": "AAPL",
+        "timestamp": pd.date_range(end=pd.Timestamp.now(tz="UTC").normalize(), periods=20),
+        "close": 10.0
+    }).set_index(["symbol", "timestamp"])
+
+    provider = DataProvider(alpaca)
+    first, _ = provider.fetch_history("AAPL", days=30)
+
+    # Simulate a different worker process: empty L1, same Redis
+    DataProvider._HISTORY_CACHE.l1.clear()
+    second, source = provider.fetch_history("AAPL", days=30)
+
+    assert alpaca.get_stock_bars.call_count == 1
+    assert source == "Alpaca (IEX)"
+    pd.testing.assert_frame_equal(first.to_frame(), second.to_frame())